@@ -1,16 +1,15 @@
 import streamlit as st
 from app_pages.multipage import MultiPage
-from app_pages import page_summary, page_study, page_prediction, page_model_performance, page_hypothesis
 
 # Initialize the multipage app
 app = MultiPage()
 
-# Add pages to the app
-app.add_page("Project Summary", page_summary.app)
-app.add_page("Data Study", page_study.app)
-app.add_page("Hypothesis and Analysis", page_hypothesis.app)
-app.add_page("Prediction", page_prediction.app)
-app.add_page("Model Performance", page_model_performance.app)
+# Add pages to the app; each page module is imported the first time it is selected
+app.add_page("Project Summary", "app_pages.page_summary")
+app.add_page("Data Study", "app_pages.page_study")
+app.add_page("Hypothesis and Analysis", "app_pages.page_hypothesis")
+app.add_page("Prediction", "app_pages.page_prediction")
+app.add_page("Model Performance", "app_pages.page_model_performance")
 
 
 # Run the app
@@ -1,9 +1,75 @@
+import builtins
+import importlib
+import os
+import sys
+import threading
+import time
+
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from src.instrumentation import page_run, stage
+
+# Set STARTUP_PROFILE=1 to report page import times and time to first paint
+STARTUP_PROFILE = os.environ.get('STARTUP_PROFILE', '0') == '1'
+
+# This module is first imported by the first script run, so this marks the start of the cold start
+_LOADED_AT = time.perf_counter()
+
+# Process-wide, as Streamlit builds a new MultiPage on every rerun
+_startup = {'imports': {}, 'first_paint_seconds': None}
+_import_lock = threading.Lock()
+
+
+class ImportProfiler:
+    """Times every module imported for the first time while active
+
+    Like ``python -X importtime``, each module gets its cumulative import
+    time (including the modules it imports) and its own share of it. The
+    builtin import function is patched while active, so it is meant for
+    profiling runs only.
+    """
+
+    def __init__(self):
+        self.timings = []
+        self._stack = []
+
+    def __enter__(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc_info):
+        builtins.__import__ = self._original_import
+        return False
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level != 0 or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += cumulative
+            self.timings.append({'module': name, 'depth': len(self._stack),
+                                 'self_seconds': cumulative - children, 'cumulative_seconds': cumulative})
+
+    def top(self, count=15):
+        """The `count` slowest top-level imports, slowest first"""
+        return sorted((t for t in self.timings if t['depth'] == 0),
+                      key=lambda t: t['cumulative_seconds'], reverse=True)[:count]
+
 
 # A class to manage multiple Streamlit app pages
 class MultiPage:
-    def __init__(self):
+    def __init__(self, profile=STARTUP_PROFILE):
         self.pages = []
+        self.profile = profile
+        self.startup = _startup
 
     def add_page(self, title, func):
         """Adds a page to the app
@@ -11,13 +77,60 @@ class MultiPage:
         ----------
         title: str
             The title of the page
-        func: function
-            The function that runs the page
+        func: function or str
+            The function that runs the page, or the path of a module with an
+            ``app()`` function (e.g. ``"app_pages.page_study"``), which is
+            only imported when the page is first selected
         """
         self.pages.append({"title": title, "function": func})
 
+    def _load(self, page):
+        """Returns the page's function, importing its module on first use"""
+        if callable(page['function']):
+            return page['function']
+        module_path = page['function']
+        with _import_lock:
+            if module_path in sys.modules:
+                return sys.modules[module_path].app
+            start = time.perf_counter()
+            if self.profile:
+                with ImportProfiler() as profiler:
+                    module = importlib.import_module(module_path)
+                self.startup['imports'][module_path] = {
+                    'seconds': time.perf_counter() - start, 'modules': profiler.top()}
+                print("\n".join(self._import_lines(module_path)), file=sys.stderr)
+            else:
+                module = importlib.import_module(module_path)
+            return module.app
+
     def run(self):
         # Display the dropdown to select the page
         page = st.sidebar.selectbox('Navigation', self.pages, format_func=lambda page: page['title'])
-        # Run the selected page's function
-        page['function']()
+        # Run the selected page's function, timed when PAGE_METRICS=1
+        ctx = get_script_run_ctx()
+        with page_run(page['title'], ctx.session_id if ctx is not None else 'local'):
+            with stage('import page'):
+                function = self._load(page)
+            function()
+
+        if self.profile:
+            if self.startup['first_paint_seconds'] is None:
+                self.startup['first_paint_seconds'] = time.perf_counter() - _LOADED_AT
+                print(f"Time to first paint: {self.startup['first_paint_seconds']:.3f}s", file=sys.stderr)
+            self._report()
+
+    def _import_lines(self, module_path):
+        imported = self.startup['imports'][module_path]
+        lines = [f"Imported {module_path} in {imported['seconds']:.3f}s"]
+        for timing in imported['modules']:
+            lines.append(f"    {timing['module']:<40} {timing['cumulative_seconds']:.3f}s "
+                         f"(self {timing['self_seconds']:.3f}s)")
+        return lines
+
+    def _report(self):
+        """Shows the startup profile in the sidebar"""
+        lines = [f"Time to first paint: {self.startup['first_paint_seconds']:.3f}s"]
+        for module_path in self.startup['imports']:
+            lines.extend(self._import_lines(module_path))
+        with st.sidebar.expander("Startup profile"):
+            st.text("\n".join(lines))
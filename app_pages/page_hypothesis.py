@@ -1,7 +1,39 @@
 import streamlit as st
 import pandas as pd
 import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from src.data_cache import cached_dataset, cached_correlation, dataset_source
+from src.figure_cache import cached_figure
+from src.instrumentation import stage
+
+
+def draw_heatmap(correlation_matrix):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', vmin=-1, vmax=1, ax=ax)
+    ax.set_title("Correlation Matrix of Key Features with Sale Price")
+    return fig
+
+
+def draw_scatter(df, attribute):
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    sns.scatterplot(x=df[attribute], y=df['SalePrice'], ax=ax)
+    ax.set_title(f'{attribute} vs SalePrice')
+    ax.set_xlabel(attribute)
+    ax.set_ylabel('SalePrice')
+    return fig
+
+
+def draw_quality_bar(df):
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    sns.barplot(x=df['OverallQual'], y=df['SalePrice'], errorbar=None, ax=ax)
+    ax.set_title('OverallQual vs SalePrice')
+    ax.set_xlabel('OverallQual')
+    ax.set_ylabel('SalePrice')
+    return fig
+
 
 def app():
     st.title("Hypothesis and Analysis")
@@ -56,63 +88,30 @@ def app():
         "confirming that houses with higher quality ratings consistently command higher prices."
     )
 
-    # Load the dataset
-    df = pd.read_csv('outputs/datasets/collection/HousePricing_cleaned.csv')
+    # Load only the key attributes from the dataset
+    key_attributes = ['GrLivArea', 'TotalSF', 'GarageArea', 'YearBuilt', 'OverallQual', 'SalePrice']
+    with stage('load dataset'):
+        df = cached_dataset('HousePricing_cleaned', columns=key_attributes)
+    files = [dataset_source('HousePricing_cleaned')]
 
     # Plotting the correlation heatmap for the key attributes
     st.write("### Correlation Heatmap")
-    key_attributes = ['GrLivArea', 'TotalSF', 'GarageArea', 'YearBuilt', 'OverallQual', 'SalePrice']
-    correlation_matrix = df[key_attributes].corr()
-
-    plt.figure(figsize=(10, 6))
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', vmin=-1, vmax=1)
-    plt.title("Correlation Matrix of Key Features with Sale Price")
-    st.pyplot(plt.gcf())
-
-    # Scatter plot for GrLivArea vs SalePrice
-    st.write("### GrLivArea vs SalePrice")
-    plt.figure(figsize=(8, 6))
-    sns.scatterplot(x=df['GrLivArea'], y=df['SalePrice'])
-    plt.title('GrLivArea vs SalePrice')
-    plt.xlabel('GrLivArea')
-    plt.ylabel('SalePrice')
-    st.pyplot(plt.gcf())
-
-    # Scatter plot for TotalSF vs SalePrice
-    st.write("### TotalSF vs SalePrice")
-    plt.figure(figsize=(8, 6))
-    sns.scatterplot(x=df['TotalSF'], y=df['SalePrice'])
-    plt.title('TotalSF vs SalePrice')
-    plt.xlabel('TotalSF')
-    plt.ylabel('SalePrice')
-    st.pyplot(plt.gcf())
-
-    # Scatter plot for GarageArea vs SalePrice
-    st.write("### GarageArea vs SalePrice")
-    plt.figure(figsize=(8, 6))
-    sns.scatterplot(x=df['GarageArea'], y=df['SalePrice'])
-    plt.title('GarageArea vs SalePrice')
-    plt.xlabel('GarageArea')
-    plt.ylabel('SalePrice')
-    st.pyplot(plt.gcf())
-
-    # Scatter plot for YearBuilt vs SalePrice
-    st.write("### YearBuilt vs SalePrice")
-    plt.figure(figsize=(8, 6))
-    sns.scatterplot(x=df['YearBuilt'], y=df['SalePrice'])
-    plt.title('YearBuilt vs SalePrice')
-    plt.xlabel('YearBuilt')
-    plt.ylabel('SalePrice')
-    st.pyplot(plt.gcf())
+    with stage('corr'):
+        correlation_matrix = cached_correlation('HousePricing_cleaned', columns=key_attributes)
+    with stage('draw heatmap'):
+        st.image(cached_figure('hypothesis_heatmap', files, lambda: draw_heatmap(correlation_matrix)), use_column_width=True)
+
+    # Scatter plots of each area and age attribute vs SalePrice
+    for attribute in ['GrLivArea', 'TotalSF', 'GarageArea', 'YearBuilt']:
+        st.write(f"### {attribute} vs SalePrice")
+        with stage(f'draw {attribute} scatter'):
+            image = cached_figure(('hypothesis_scatter', attribute), files, lambda: draw_scatter(df, attribute))
+            st.image(image, use_column_width=True)
 
     # Bar plot for OverallQual vs SalePrice
     st.write("### OverallQual vs SalePrice")
-    plt.figure(figsize=(8, 6))
-    sns.barplot(x=df['OverallQual'], y=df['SalePrice'], errorbar=None)
-    plt.title('OverallQual vs SalePrice')
-    plt.xlabel('OverallQual')
-    plt.ylabel('SalePrice')
-    st.pyplot(plt.gcf())
+    with stage('draw quality bar'):
+        st.image(cached_figure('hypothesis_quality_bar', files, lambda: draw_quality_bar(df)), use_column_width=True)
 
     st.write("---")
 
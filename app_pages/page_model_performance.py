@@ -1,13 +1,131 @@
 import streamlit as st
 import pandas as pd
-import requests
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from src.api_client import api_url, get_client
+from src.data_cache import cached_performance_summary
+from src.figure_cache import cached_figure
+from src.instrumentation import stage
+from src.performance_summary import summary_path
+from src.prediction import PREDICTION_BACKEND
+
+
+def draw_density(split, dataset_type):
+    """Plot binned actual vs predicted counts with the perfect-prediction diagonal."""
+    edges = split['density_edges']
+    density = np.ma.masked_equal(split['density'].T, 0)
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    mesh = ax.pcolormesh(edges, edges, density, norm=LogNorm(), cmap='viridis')
+    ax.plot([edges[0], edges[-1]], [edges[0], edges[-1]], color='red', lw=2)
+    fig.colorbar(mesh, ax=ax, label='Number of houses')
+    ax.set_title(f'Actual vs Predicted Sale Prices ({dataset_type} Data)')
+    ax.set_xlabel('Actual Sale Prices')
+    ax.set_ylabel('Predicted Sale Prices')
+    return fig
+
+
+def draw_residuals(split, dataset_type):
+    """Plot the histogram of residuals (predicted minus actual)."""
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+    ax.stairs(split['residual_counts'], split['residual_edges'], fill=True)
+    ax.axvline(0, color='red', lw=2)
+    ax.set_title(f'Residuals ({dataset_type} Data)')
+    ax.set_xlabel('Predicted - Actual Sale Price')
+    ax.set_ylabel('Number of houses')
+    return fig
+
+
+def decile_table(split):
+    """Tabulate the error per decile of the actual sale price."""
+    edges = split['decile_edges']
+    return pd.DataFrame({
+        'Sale Price Range': [f"${edges[i]:,.0f} - ${edges[i + 1]:,.0f}" for i in range(len(edges) - 1)],
+        'Houses': split['decile_counts'],
+        'MAE': split['decile_mae'].round(0),
+        'MAPE (%)': (split['decile_mape'] * 100).round(1),
+        'Mean Residual': split['decile_bias'].round(0),
+    })
+
+
+def render_summary(summary, files):
+    """Render metrics and aggregates from the precomputed performance summary."""
+    for split_name, dataset_type in (('train', 'Training'), ('test', 'Testing')):
+        metrics = summary[split_name]['metrics']
+        st.write(f"### Model Performance on {dataset_type} Data")
+        st.write(f"R² Score ({dataset_type}): {metrics['r2']:.2f}")
+        st.write(f"Mean Squared Error ({dataset_type}): {metrics['mse']:.2f}")
+        st.write(f"Root Mean Squared Error ({dataset_type}): {metrics['rmse']:,.2f}")
+        st.write(f"Mean Absolute Error ({dataset_type}): {metrics['mae']:,.2f}")
+        st.write(f"Mean Absolute Percentage Error ({dataset_type}): {metrics['mape'] * 100:.1f}%")
+
+    for split_name, dataset_type in (('train', 'Training'), ('test', 'Testing')):
+        st.write(f"### Actual vs Predicted - {dataset_type} Data")
+        split = summary[split_name]
+        with stage(f'draw {split_name} plots'):
+            st.image(cached_figure(('performance_density', split_name), files,
+                                   lambda: draw_density(split, dataset_type)), use_column_width=True)
+            st.image(cached_figure(('performance_residuals', split_name), files,
+                                   lambda: draw_residuals(split, dataset_type)), use_column_width=True)
+        st.write(f"#### Error by Sale Price Decile - {dataset_type} Data")
+        st.write(decile_table(summary[split_name]))
+
+
+def render_from_api(api_url):
+    """Fetch raw predictions from the Flask API and plot them."""
+    # Fetch model performance data from the API
+    try:
+        with stage('api call'):
+            data = get_client().get_json(api_url)
+
+        # Extract metrics and predictions
+        train_r2 = data['train_r2']
+        train_mse = data['train_mse']
+        test_r2 = data['test_r2']
+        test_mse = data['test_mse']
+        y_train_pred = data['y_train_pred']
+        y_test_pred = data['y_test_pred']
+        y_train = data['y_train']
+        y_test = data['y_test']
+
+        # Display performance metrics
+        st.write("### Model Performance on Training Data")
+        st.write(f"R² Score (Training): {train_r2:.2f}")
+        st.write(f"Mean Squared Error (Training): {train_mse:.2f}")
+        
+        st.write("### Model Performance on Testing Data")
+        st.write(f"R² Score (Testing): {test_r2:.2f}")
+        st.write(f"Mean Squared Error (Testing): {test_mse:.2f}")
+
+        # Function to plot actual vs predicted values
+        def plot_actual_vs_predicted(y_actual, y_pred, dataset_type=""):
+            fig, ax = plt.subplots(figsize=(8, 6))
+            ax.scatter(y_actual, y_pred, alpha=0.5)
+            ax.plot([min(y_actual), max(y_actual)], [min(y_actual), max(y_actual)], color='red', lw=2)
+            ax.set_title(f'Actual vs Predicted Sale Prices ({dataset_type} Data)')
+            ax.set_xlabel('Actual Sale Prices')
+            ax.set_ylabel('Predicted Sale Prices')
+            st.pyplot(fig)
+            plt.close(fig)
+
+        # Plot for training data
+        st.write("### Actual vs Predicted - Training Data")
+        plot_actual_vs_predicted(y_train, y_train_pred, "Training")
+
+        # Plot for testing data
+        st.write("### Actual vs Predicted - Testing Data")
+        plot_actual_vs_predicted(y_test, y_test_pred, "Testing")
+
+    except Exception as e:
+        st.write(f"Error: {str(e)}")
+
 
 def app():
     st.title("Model Performance Evaluation")
 
-    # Flask API URL for model performance
-    API_URL = 'https://housingmodel-api-6a6b8e797fa2.herokuapp.com/model_performance'
 
     st.write(
         """
@@ -16,61 +134,23 @@ def app():
         """
     )
 
-    # Fetch model performance data from the API
-    try:
-        response = requests.get(API_URL)
-        if response.status_code == 200:
-            data = response.json()
-
-            # Extract metrics and predictions
-            train_r2 = data['train_r2']
-            train_mse = data['train_mse']
-            test_r2 = data['test_r2']
-            test_mse = data['test_mse']
-            y_train_pred = data['y_train_pred']
-            y_test_pred = data['y_test_pred']
-            y_train = data['y_train']
-            y_test = data['y_test']
-
-            # Display performance metrics
-            st.write("### Model Performance on Training Data")
-            st.write(f"R² Score (Training): {train_r2:.2f}")
-            st.write(f"Mean Squared Error (Training): {train_mse:.2f}")
-            
-            st.write("### Model Performance on Testing Data")
-            st.write(f"R² Score (Testing): {test_r2:.2f}")
-            st.write(f"Mean Squared Error (Testing): {test_mse:.2f}")
-
-            # Function to plot actual vs predicted values
-            def plot_actual_vs_predicted(y_actual, y_pred, dataset_type=""):
-                plt.figure(figsize=(8, 6))
-                plt.scatter(y_actual, y_pred, alpha=0.5)
-                plt.plot([min(y_actual), max(y_actual)], [min(y_actual), max(y_actual)], color='red', lw=2)
-                plt.title(f'Actual vs Predicted Sale Prices ({dataset_type} Data)')
-                plt.xlabel('Actual Sale Prices')
-                plt.ylabel('Predicted Sale Prices')
-                st.pyplot(plt.gcf())
-
-            # Plot for training data
-            st.write("### Actual vs Predicted - Training Data")
-            plot_actual_vs_predicted(y_train, y_train_pred, "Training")
-
-            # Plot for testing data
-            st.write("### Actual vs Predicted - Testing Data")
-            plot_actual_vs_predicted(y_test, y_test_pred, "Testing")
-
-        else:
-            st.write(f"Error: {response.status_code}. Failed to get model performance data from API.")
-
-    except Exception as e:
-        st.write(f"Error: {str(e)}")
+    # The local summary is used unless predictions are configured to always come from the API
+    summary = None
+    if PREDICTION_BACKEND != 'remote':
+        with stage('load summary'):
+            summary = cached_performance_summary('xgb_model')
+    if summary is not None:
+        render_summary(summary, ['outputs/models/xgb_model.pkl', summary_path('xgb_model')])
+    else:
+        render_from_api(api_url('/model_performance'))
 
     st.write(
         """
         ## Insights:
         - The **R² score** for the training data indicates how well the model fits the training set. A higher value (closer to 1) means the model explains a large proportion of the variance in sale prices.
         - The **Mean Squared Error (MSE)** gives an idea of the average squared difference between actual and predicted sale prices. A lower MSE indicates better performance.
-        - The **scatter plots** for the training and testing data show how closely the predicted sale prices align with the actual prices. Ideally, the points should lie along the red diagonal line, indicating perfect predictions.
+        - The **actual vs predicted plots** for the training and testing data show how closely the predicted sale prices align with the actual prices. Ideally, the houses should lie along the red diagonal line, indicating perfect predictions.
+        - The **residual histograms** and **decile tables** show where the model over- or under-predicts, for example on the most expensive houses.
         """
     )
 
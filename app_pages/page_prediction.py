@@ -1,13 +1,14 @@
 import streamlit as st
 import pandas as pd
-import requests
+from src.api_client import get_client
+from src.comparables import COMPARABLE_FEATURES, comparable_sales
+from src.data_cache import cached_comparables, cached_inherited_predictions
+from src.instrumentation import stage
+from src.prediction_cache import predict_form
 
 def app():
     st.title("House Price Prediction")
 
-    
-    API_URL = 'https://housingmodel-api-6a6b8e797fa2.herokuapp.com/predict'
-
     st.write(
         """
         ### Predict House Sale Prices
@@ -40,42 +41,50 @@ def app():
     st.write("#### Your Inputted House Features")
     st.write(pd.DataFrame([input_data]))
 
-    # Predict the sale price using the API
+    # Start the inherited houses' batch now, so it overlaps the form prediction
+    inherited_future = get_client().run(cached_inherited_predictions)
+
+    # Predict the sale price in-process (falls back to the Flask API), memoized per model version
     if st.button("Predict Sale Price"):
         try:
-            # Send the request to the Flask API and get the response
-            response = requests.post(API_URL, json=input_data)
-            if response.status_code == 200:
-                prediction = response.json()['prediction']
-                st.write(f"### Predicted Sale Price: ${prediction:,.2f}")
-            else:
-                st.write(f"Error: {response.status_code}. Failed to get prediction from API.")
+            with stage('predict'):
+                prediction = predict_form(input_data)
+            st.write(f"### Predicted Sale Price: ${prediction:,.2f}")
         except Exception as e:
             st.write(f"Error: {str(e)}")
 
+        # The most similar past sales, from the persisted nearest-neighbour index
+        try:
+            with stage('comparable sales'):
+                index, sales = cached_comparables()
+                comparables = comparable_sales(index, sales, [input_data])[0]
+            st.write("#### Comparable Sales")
+            st.write(comparables[COMPARABLE_FEATURES + ['SalePrice']])
+        except Exception as e:
+            st.write(f"Error: Comparable sales are unavailable: {str(e)}")
+
     st.write("---")
     st.write("### Predicted Prices for Inherited Houses")
 
-    # Load the inherited houses dataset
-    inherited_houses = pd.read_csv('outputs/datasets/collection/inherited_houses_cleaned.csv')
-
-    # Align columns with expected API input
-    X_train = pd.read_csv('outputs/datasets/collection/X_train.csv')
-    inherited_houses_data = inherited_houses.reindex(columns=X_train.columns, fill_value=0)
-
-    # Prepare the input data for the API (as a list of dictionaries)
-    inherited_houses_json = inherited_houses_data.to_dict(orient='records')
-
-    # Send the request to the Flask API for the inherited houses predictions
+    # Predict all inherited houses in a single batch, once per model and dataset version
     try:
-        response = requests.post(API_URL, json=inherited_houses_json)
-        if response.status_code == 200:
-            predictions = response.json()['predictions']
-            inherited_houses['Predicted_SalePrice'] = predictions
-
-            # Display the inherited houses with their predicted sale prices
-            st.write(inherited_houses[['GrLivArea', 'TotalSF', 'GarageArea', 'YearBuilt', 'OverallQual', 'Predicted_SalePrice']])
-        else:
-            st.write(f"Error: {response.status_code}. Failed to get predictions from API for inherited houses.")
+        with stage('predict inherited houses'):
+            inherited_houses = get_client().wait(inherited_future, description='the inherited houses')
     except Exception as e:
         st.write(f"Error: {str(e)}")
+        return
+
+    columns = ['GrLivArea', 'TotalSF', 'GarageArea', 'YearBuilt', 'OverallQual', 'Predicted_SalePrice']
+    # Median price of each house's five closest past sales, in one batched query
+    try:
+        with stage('comparable sales'):
+            index, sales = cached_comparables()
+            comparables = comparable_sales(index, sales, inherited_houses)
+            inherited_houses = inherited_houses.assign(
+                Comparables_Median_SalePrice=[houses['SalePrice'].median() for houses in comparables])
+        columns.append('Comparables_Median_SalePrice')
+    except Exception as e:
+        st.write(f"Error: Comparable sales are unavailable: {str(e)}")
+
+    # Display the inherited houses with their predicted sale prices
+    st.write(inherited_houses[columns])
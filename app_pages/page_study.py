@@ -1,15 +1,65 @@
 import streamlit as st
 import pandas as pd
 import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from src.data_cache import cached_dataset, cached_describe, cached_correlation, cached_range_index, dataset_source
+from src.figure_cache import cached_figure, cached_interactive_figure
+from src.instrumentation import stage
+
+# Above these sizes the YearBuilt explorer summarises and samples instead of showing every house
+TABLE_ROW_BUDGET = 5000
+POINT_BUDGET = 5000
+
+
+def draw_heatmap(corr_matrix):
+    fig = Figure(figsize=(15, 10))
+    ax = fig.subplots()
+    sns.heatmap(corr_matrix, annot=True, cmap="coolwarm", ax=ax)
+    return fig
+
+
+def draw_scatter_grid(df, cleaned_data):
+    fig = Figure(figsize=(15, 12))
+    axes = fig.subplots(2, 2).ravel()
+    for ax, attribute in zip(axes, ['GrLivArea', 'TotalSF', 'GarageArea', 'YearBuilt']):
+        sns.scatterplot(x=cleaned_data[attribute], y=df['SalePrice'], ax=ax)
+        ax.set_title(f'SalePrice vs {attribute}')
+        ax.set_xlabel(attribute)
+        ax.set_ylabel('SalePrice')
+    fig.tight_layout()
+    return fig
+
+
+def draw_quality_bar(df):
+    fig = Figure(figsize=(15, 12))
+    ax = fig.subplots()
+    sns.barplot(x=df['OverallQual'], y=df['SalePrice'], errorbar=None, ax=ax)
+    ax.set_title('SalePrice vs OverallQual')
+    ax.set_xlabel('OverallQual')
+    ax.set_ylabel('SalePrice')
+    return fig
+
+
+def draw_year_explorer(year_index, low, high):
+    sample = year_index.sample(low, high, POINT_BUDGET)
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    alpha = 1.0 if len(sample) == year_index.count(low, high) else 0.4
+    sns.scatterplot(x=sample['YearBuilt'], y=sample['SalePrice'], alpha=alpha, ax=ax)
+    ax.set_title('SalePrice vs YearBuilt (Filtered)')
+    ax.set_xlabel('YearBuilt')
+    ax.set_ylabel('SalePrice')
+    return fig
+
 
 def app():
     st.title("Data Study")
 
-    # Load the datasets
-    df = pd.read_csv('outputs/datasets/collection/HousePricing.csv')
-    inherited_houses = pd.read_csv('outputs/datasets/collection/InheritedHouses.csv')
-    cleaned_data = pd.read_csv('outputs/datasets/collection/HousePricing_cleaned.csv')
+    # Load the datasets (shared across sessions, treat as read-only)
+    with stage('load datasets'):
+        df = cached_dataset('HousePricing')
+        inherited_houses = cached_dataset('InheritedHouses')
+        cleaned_data = cached_dataset('HousePricing_cleaned')
 
     st.write("### Dataset Overview")
     st.write("This page provides a detailed study of the housing dataset, exploring key attributes and their relationships with the sale price.")
@@ -33,7 +83,8 @@ def app():
 
     st.write("### Summary Statistics")
     st.write("Let's look at the summary statistics of the dataset to understand its key features and distributions.")
-    st.write(df.describe())
+    with stage('describe'):
+        st.write(cached_describe('HousePricing'))
 
     # Correlation Matrix
     st.write("### Correlation Matrix")
@@ -43,10 +94,11 @@ def app():
         "A negative correlation suggests the opposite relationship."
     )
     
-    corr_matrix = cleaned_data.corr()
-    plt.figure(figsize=(15, 10))
-    sns.heatmap(corr_matrix, annot=True, cmap="coolwarm")
-    st.pyplot(plt.gcf())
+    with stage('corr'):
+        corr_matrix = cached_correlation('HousePricing_cleaned')
+    with stage('draw heatmap'):
+        image = cached_figure('study_heatmap', [dataset_source('HousePricing_cleaned')], lambda: draw_heatmap(corr_matrix))
+        st.image(image, use_column_width=True)
 
     st.write(
         """
@@ -61,31 +113,16 @@ def app():
     st.write("### Key Attribute Visualizations")
     st.write("Below, we explore how some key features relate to the `SalePrice` using scatter plots and bar charts.")
 
-    key_attributes = ['GrLivArea', 'TotalSF', 'GarageArea', 'YearBuilt']
-    plt.figure(figsize=(15, 12))
-
-    for i, attribute in enumerate(key_attributes, 1):
-        plt.subplot(2, 2, i)
-        sns.scatterplot(x=cleaned_data[attribute], y=df['SalePrice'])
-        plt.title(f'SalePrice vs {attribute}')
-        plt.xlabel(attribute)
-        plt.ylabel('SalePrice')
-        
-
-    plt.tight_layout()
-    st.pyplot(plt.gcf())
+    files = [dataset_source('HousePricing'), dataset_source('HousePricing_cleaned')]
+    with stage('draw scatter grid'):
+        image = cached_figure('study_scatter_grid', files, lambda: draw_scatter_grid(df, cleaned_data))
+        st.image(image, use_column_width=True)
 
     # Add the bar chart for OverallQual
     st.write("### Bar Chart: Sale Price vs Overall Quality")
-    plt.figure(figsize=(15, 12))
-
-    # Plot bar chart for OverallQual
-    sns.barplot(x=df['OverallQual'], y=df['SalePrice'], errorbar=None)
-    plt.title('SalePrice vs OverallQual')
-    plt.xlabel('OverallQual')
-    plt.ylabel('SalePrice')
-
-    st.pyplot(plt)
+    with stage('draw quality bar'):
+        image = cached_figure('study_quality_bar', [dataset_source('HousePricing')], lambda: draw_quality_bar(df))
+        st.image(image, use_column_width=True)
 
     st.write(
     """
@@ -102,18 +139,25 @@ def app():
     st.write("### Interactive Data Exploration")
     st.write("Use the filters below to explore how `SalePrice` changes with `YearBuilt`.")
 
-    year_range = st.slider("Select Year Range", int(df["YearBuilt"].min()), int(df["YearBuilt"].max()), (1900, 2020))
-    filtered_df = df[(df["YearBuilt"] >= year_range[0]) & (df["YearBuilt"] <= year_range[1])]
+    with stage('year index'):
+        year_index = cached_range_index('HousePricing', 'YearBuilt', 'SalePrice')
+    year_range = st.slider("Select Year Range", int(year_index.min_key), int(year_index.max_key), (1900, 2020))
+    low, high = year_range
+    house_count = year_index.count(low, high)
 
     st.write(f"Displaying houses built between {year_range[0]} and {year_range[1]}.")
-    st.write(filtered_df[['YearBuilt', 'SalePrice']])
-
-    plt.figure(figsize=(10, 6))
-    sns.scatterplot(x=filtered_df['YearBuilt'], y=filtered_df['SalePrice'])
-    plt.title('SalePrice vs YearBuilt (Filtered)')
-    plt.xlabel('YearBuilt')
-    plt.ylabel('SalePrice')
-    st.pyplot(plt.gcf())
+    if house_count <= TABLE_ROW_BUDGET:
+        st.write(year_index.select(low, high))
+    else:
+        st.write(f"{house_count:,} houses match, so they are summarised per year built.")
+        st.write(year_index.aggregates(low, high))
+
+    with stage('draw year explorer'):
+        image = cached_interactive_figure(('study_year_explorer', low, high), [dataset_source('HousePricing')],
+                                          lambda: draw_year_explorer(year_index, low, high))
+        st.image(image, use_column_width=True)
+    if house_count > POINT_BUDGET:
+        st.caption(f"Showing a sample of about {POINT_BUDGET:,} of {house_count:,} houses, stratified by year built.")
 
     st.write(
         "The filtered scatter plot allows you to observe how the sale price of houses changes "
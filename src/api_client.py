@@ -0,0 +1,265 @@
+# src/api_client.py
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from urllib.parse import urlsplit
+
+# The Flask API; point API_BASE_URL at python -m src.serving to run offline
+DEFAULT_API_BASE_URL = 'https://housingmodel-api-6a6b8e797fa2.herokuapp.com'
+
+# Seconds to wait for a connection and for each response
+API_CONNECT_TIMEOUT = float(os.environ.get('API_CONNECT_TIMEOUT', 3.05))
+API_READ_TIMEOUT = float(os.environ.get('API_READ_TIMEOUT', 10))
+# Retries after the first attempt, for connection errors, timeouts and 5xx responses
+API_RETRIES = int(os.environ.get('API_RETRIES', 2))
+API_BACKOFF = float(os.environ.get('API_BACKOFF', 0.5))
+API_POOL_SIZE = int(os.environ.get('API_POOL_SIZE', 16))
+# Longest a page waits for a task started with ApiClient.run
+API_TASK_TIMEOUT = float(os.environ.get('API_TASK_TIMEOUT', 60))
+
+RETRY_STATUSES = {500, 502, 503, 504}
+
+
+class ApiError(RuntimeError):
+    """An API call failed; status is the HTTP status code, or None when no response arrived."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(ApiError):
+    """The upstream failed repeatedly, so calls fail fast until it has had time to recover."""
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast after failure_threshold consecutive failures. After
+    reset_timeout seconds one trial call is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ApiClient:
+    """
+    Shared HTTP client for the Flask API.
+    - One requests.Session with a connection pool, so connections are kept alive.
+    - Every call has connect and read timeouts, and connection errors,
+      timeouts and 5xx responses are retried with exponential backoff and jitter.
+    - A circuit breaker per host fails calls fast while the upstream is down.
+    - Calls run on a thread pool: identical calls already in flight share one
+      upstream request, and independent calls can be issued concurrently.
+      Tasks started with run() get a pool of their own, so a task that makes
+      calls never waits on a request queued behind other tasks.
+    """
+
+    def __init__(self, timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT), retries=API_RETRIES,
+                 backoff=API_BACKOFF, pool_size=API_POOL_SIZE, failure_threshold=5, reset_timeout=30.0):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.calls = 0
+        self.deduplicated = 0
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='api-client')
+        self._task_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='api-client-task')
+        # Longest a call can take: every attempt timing out, plus the longest backoffs
+        attempt_timeout = sum(timeout) if isinstance(timeout, tuple) else timeout
+        self.call_timeout = attempt_timeout * (retries + 1) + backoff * 1.5 * (2 ** retries - 1)
+        self._in_flight = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def _request(self, method, url, payload):
+        import requests
+
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{urlsplit(url).netloc} is unavailable after repeated failures; try again shortly.")
+        # Every call the breaker allowed ends in record_success or record_failure, so a half-open trial always ends
+        responded = False
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    time.sleep(self.backoff * 2 ** (attempt - 1) * (0.5 + random.random()))
+                try:
+                    response = self.session.request(method, url, json=payload, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    # The page prefixes "Error:", so the exception's class name is left out
+                    reason = 'timed out' if isinstance(e, requests.Timeout) else 'could not connect'
+                    error = ApiError(f"API call to {url} {reason}.")
+                    continue
+                except requests.RequestException as e:
+                    # e.g. a malformed response or too many redirects, which a retry would not fix
+                    raise ApiError(f"API call to {url} failed: {e}") from e
+                if response.status_code in RETRY_STATUSES:
+                    error = ApiError(f"{response.status_code}. API call to {url} failed.", response.status_code)
+                    continue
+                # A 4xx is the request's fault, not the upstream's, so it does not trip the breaker
+                responded = True
+                if response.status_code != 200:
+                    raise ApiError(f"{response.status_code}. API call to {url} failed.", response.status_code)
+                try:
+                    return response.json()
+                except ValueError as e:
+                    raise ApiError(f"API call to {url} returned invalid JSON.", response.status_code) from e
+            raise error
+        finally:
+            if responded:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+    def submit(self, method, url, payload=None):
+        """
+        Start a call on the client's thread pool. An identical call already
+        in flight is shared rather than sent again.
+        :param method: str, 'GET' or 'POST'
+        :param url: str
+        :param payload: JSON-serializable request body
+        :return: concurrent.futures.Future resolving to the decoded JSON response
+        """
+        key = (method, url, json.dumps(payload, sort_keys=True, default=str))
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            self.calls += 1
+            future = self._executor.submit(self._request, method, url, payload)
+            self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def wait(self, future, timeout=API_TASK_TIMEOUT, description='the task'):
+        """
+        Wait for a call or a task started with run().
+        :param future: concurrent.futures.Future
+        :param timeout: float, seconds
+        :param description: str, what is waited for, for the error message
+        :return: the future's result
+        :raises ApiError: when it is not done within timeout
+        """
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            raise ApiError(f"Timed out waiting for {description}.") from None
+
+    def get_json(self, url):
+        """
+        :return: decoded JSON response
+        :raises ApiError: on failure, after retries
+        """
+        # Twice the longest call, allowing for a call queued behind a full pool
+        return self.wait(self.submit('GET', url), 2 * self.call_timeout, url)
+
+    def post_json(self, url, payload):
+        """
+        :return: decoded JSON response
+        :raises ApiError: on failure, after retries
+        """
+        return self.wait(self.submit('POST', url, payload), 2 * self.call_timeout, url)
+
+    def run(self, function, *args):
+        """
+        Run any function on the client's task pool, e.g. to overlap a
+        cached lookup that may call the API with another call.
+        :return: concurrent.futures.Future, to pass to wait()
+        """
+        return self._task_executor.submit(function, *args)
+
+    def stats(self):
+        """
+        :return: dict with calls, deduplicated calls, in-flight calls and breaker states
+        """
+        with self._lock:
+            return {'calls': self.calls, 'deduplicated': self.deduplicated, 'in_flight': len(self._in_flight),
+                    'breakers': {host: breaker.state for host, breaker in self._breakers.items()}}
+
+
+def api_url(path):
+    """
+    The URL of an API endpoint under API_BASE_URL, read when called so a
+    test harness can set it after import.
+    :param path: str, e.g. '/predict'
+    :return: str
+    """
+    return os.environ.get('API_BASE_URL', DEFAULT_API_BASE_URL).rstrip('/') + path
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the process-wide client, shared by every Streamlit session.
+    :return: ApiClient
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ApiClient()
+    return _client
@@ -0,0 +1,121 @@
+# src/batch_predict.py
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.data_management import clean_data, scan_imputation_statistics
+from src.model_evaluation import load_model, load_preprocessor
+from src.sinks import open_sink
+
+# Model and imputation statistics set once per worker process by _init_worker
+_model = None
+_statistics = None
+
+
+def _init_worker(model_name, statistics):
+    global _model, _statistics
+    _model = load_model(model_name)
+    _statistics = statistics
+
+
+def predict_chunk(chunk):
+    """
+    Clean a chunk of raw records and predict their sale prices.
+    Missing values are imputed with the statistics the worker was started
+    with, so predictions do not depend on how the input is chunked.
+    :param chunk: pd.DataFrame, raw records
+    :return: pd.DataFrame, cleaned records with a 'Predicted_SalePrice' column
+    """
+    cleaned = clean_data(chunk, statistics=_statistics)
+    features = cleaned.reindex(columns=_model.feature_names_in_, fill_value=0)
+    cleaned['Predicted_SalePrice'] = _model.predict(features)
+    return cleaned
+
+
+def batch_predict(input_path, output_path, model_name='xgb_model', chunksize=100_000, workers=None, verbose=True,
+                  statistics='model'):
+    """
+    Stream a raw CSV through clean_data and the saved model in a process pool,
+    writing predictions incrementally. At most two chunks per worker are in
+    flight, so memory stays bounded regardless of input size.
+    Missing values are imputed with one set of statistics for the whole file:
+    - 'model': the training set's, from the preprocessor saved with the
+      model, as the app predicts single houses. Models saved without one
+      fall back to 'input'.
+    - 'input': the input file's, from a first streaming pass over it
+      (see data_management.scan_imputation_statistics).
+    :param input_path: str, raw CSV laid out like house_prices_records.csv
+    :param output_path: str, destination .csv or .parquet file
+    :param model_name: str, name of the model file
+    :param chunksize: int, rows per chunk
+    :param workers: int, number of worker processes (default: all cores)
+    :param verbose: bool, print progress after each chunk
+    :param statistics: str, 'model' or 'input'
+    :return: dict with rows, seconds and rows_per_second
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    start = time.perf_counter()
+    preprocessor = load_preprocessor(model_name) if statistics == 'model' else None
+    dtypes = None
+    if preprocessor is not None:
+        fill_values = preprocessor.statistics
+        # The imputed columns are float in every chunk, so a fractional fill value (e.g. the LotFrontage
+        # median) never lands in a column an earlier chunk wrote as int
+        dtypes = {column: 'float64' for column in fill_values}
+    else:
+        # The scan also gives the whole file's dtypes, so every chunk is parsed alike
+        fill_values, dtypes = scan_imputation_statistics(input_path, chunksize)
+    sink = open_sink(output_path)
+    rows = 0
+
+    def drain(pending):
+        nonlocal rows
+        result = pending.popleft().result()
+        sink.write(result)
+        rows += len(result)
+        if verbose:
+            elapsed = time.perf_counter() - start
+            print(f"{rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_name, fill_values)) as pool:
+            pending = deque()
+            for chunk in pd.read_csv(input_path, dtype=dtypes, chunksize=chunksize):
+                pending.append(pool.submit(predict_chunk, chunk))
+                if len(pending) >= max_in_flight:
+                    drain(pending)
+            while pending:
+                drain(pending)
+    finally:
+        sink.close()
+
+    seconds = time.perf_counter() - start
+    return {'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict sale prices for a raw housing CSV.")
+    parser.add_argument('input', help="raw CSV laid out like house_prices_records.csv")
+    parser.add_argument('output', help="output .csv or .parquet file")
+    parser.add_argument('--model', default='xgb_model', help="model name in outputs/models")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="rows per chunk")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--statistics', choices=['model', 'input'], default='model',
+                        help="impute with the training set's statistics saved with the model, or the input file's")
+    args = parser.parse_args(argv)
+
+    summary = batch_predict(args.input, args.output, args.model, args.chunksize, args.workers,
+                            statistics=args.statistics)
+    print(f"Done: {summary['rows']:,} rows in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+# src/benchmark.py
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.data_management import DATASET_DIR, clean_data, load_data
+
+RAW_DATA = os.path.join(DATASET_DIR, 'HousePricing.csv')
+BENCHMARK_DIR = 'outputs/benchmarks'
+DEFAULT_SCALES = [1, 10, 100, 1000]
+DEFAULT_THRESHOLD = 0.25
+PAGES = ['page_summary', 'page_study', 'page_hypothesis', 'page_prediction', 'page_model_performance']
+
+# Statistics compared against the baseline, when a benchmark records them
+COMPARED_STATS = ['seconds', 'p99_seconds']
+# A p99 from fewer calls is mostly noise, so only the median of such benchmarks is compared
+MIN_P99_REPEAT = 100
+# Warm page renders take milliseconds, so enough are timed for a meaningful p99
+PAGE_WARM_REPEAT = 200
+# Statistics this long, timed at least this many times, are compared as a ratio. Shorter or
+# less sampled ones are dominated by timer and scheduler jitter, so they are compared with an
+# absolute tolerance instead.
+MIN_RELATIVE_SECONDS = 0.005
+MIN_RELATIVE_REPEAT = 3
+DEFAULT_ABSOLUTE_TOLERANCE = 0.002
+# Timings are only comparable between runs on matching hardware and interpreter
+MATCHED_ENVIRONMENT = ['machine', 'cpu_count', 'python']
+
+
+def time_call(func, setup=None, repeat=5):
+    """
+    Time repeated calls of a function.
+    :param func: callable taking the values returned by setup
+    :param setup: callable returning a tuple of arguments, run untimed before each call
+    :param repeat: int, number of timed calls
+    :return: dict with the median (seconds), min, p50 and p99 call time in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings)
+    return {
+        'seconds': float(np.median(timings)),
+        'min_seconds': float(timings.min()),
+        'p50_seconds': float(np.percentile(timings, 50)),
+        'p99_seconds': float(np.percentile(timings, 99)),
+        'repeat': repeat,
+    }
+
+
+def scaled_raw_data(scale):
+    """
+    The raw Ames data repeated `scale` times.
+    :param scale: int
+    :return: pd.DataFrame
+    """
+    df = pd.read_csv(RAW_DATA)
+    return pd.concat([df] * scale, ignore_index=True) if scale > 1 else df
+
+
+class StreamlitStub:
+    """
+    Stand-in for the streamlit module so a page's app() can be timed without
+    a Streamlit runtime. Output calls do nothing and widgets return their
+    default values.
+    """
+
+    def __init__(self):
+        self.sidebar = self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def slider(self, label, min_value=None, max_value=None, value=None, *args, **kwargs):
+        return value if value is not None else min_value
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, *args, **kwargs):
+        return value if value is not None else min_value
+
+    def selectbox(self, label, options, index=0, *args, **kwargs):
+        return list(options)[index]
+
+    def checkbox(self, label, value=False, *args, **kwargs):
+        return value
+
+    def button(self, *args, **kwargs):
+        return False
+
+    def columns(self, spec, *args, **kwargs):
+        return [self] * (spec if isinstance(spec, int) else len(spec))
+
+    def tabs(self, labels):
+        return [self] * len(labels)
+
+    def expander(self, *args, **kwargs):
+        return self
+
+    def container(self, *args, **kwargs):
+        return self
+
+    def spinner(self, *args, **kwargs):
+        return self
+
+
+def benchmark_scale(scale, engine, repeat):
+    """
+    Time load_data, clean_data, evaluate_model and batch prediction on the
+    raw data repeated `scale` times.
+    :return: dict of benchmark name -> timing dict
+    """
+    from src.model_evaluation import evaluate_model
+
+    raw = scaled_raw_data(scale)
+    rows = len(raw)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'houses.csv')
+        raw.to_csv(csv_path, index=False)
+        results[f'load_data[{scale}x]'] = time_call(lambda: load_data(csv_path), repeat=repeat)
+        results[f'load_data_compact[{scale}x]'] = time_call(lambda: load_data(csv_path, compact=True),
+                                                            repeat=repeat)
+
+    # clean_data modifies its input, so every call gets a fresh copy
+    results[f'clean_data[{scale}x]'] = time_call(clean_data, setup=lambda: (raw.copy(),), repeat=repeat)
+
+    cleaned = clean_data(raw)
+    X = cleaned.reindex(columns=engine.feature_names, fill_value=0)
+    y = cleaned['SalePrice']
+    results[f'evaluate_model[{scale}x]'] = time_call(lambda: evaluate_model(engine.model, X, y), repeat=repeat)
+    results[f'predict_many[{scale}x]'] = time_call(lambda: engine.predict_many(X), repeat=repeat)
+    for name in list(results):
+        results[name]['rows'] = rows
+    return results
+
+
+def benchmark_latency(engine, single_calls=200, batch_calls=100, batch_size=100):
+    """
+    Per-call latency of the prediction path for single houses and batches.
+    :return: dict of benchmark name -> timing dict
+    """
+    records = load_data(os.path.join(DATASET_DIR, 'X_test.csv')).to_dict(orient='records')
+    batch = (records * (batch_size // len(records) + 1))[:batch_size]
+    engine.predict_one(records[0])
+    return {
+        'predict_one': time_call(engine.predict_one, setup=lambda: (records[np.random.randint(len(records))],),
+                                 repeat=single_calls),
+        f'predict_many[{batch_size} rows]': time_call(lambda: engine.predict_many(batch), repeat=batch_calls),
+    }
+
+
+def benchmark_pages(repeat, warm_repeat=PAGE_WARM_REPEAT):
+    """
+    Render time of each page's app() with Streamlit stubbed out: the first
+    render of a fresh process cache (cold) and later renders (warm).
+    :param repeat: int, cold renders per page
+    :param warm_repeat: int, warm renders per page
+    :return: dict of benchmark name -> timing dict
+    """
+    from src.data_cache import get_cache
+
+    results = {}
+    for page_name in PAGES:
+        page = importlib.import_module(f'app_pages.{page_name}')
+        streamlit = page.st
+        page.st = StreamlitStub()
+        try:
+            results[f'render[{page_name}, cold]'] = time_call(page.app, setup=lambda: get_cache().clear() or (),
+                                                              repeat=repeat)
+            results[f'render[{page_name}, warm]'] = time_call(page.app, repeat=warm_repeat)
+        finally:
+            page.st = streamlit
+    return results
+
+
+def run_benchmarks(scales=None, repeat=3, model_name='xgb_model', verbose=True):
+    """
+    Run the full benchmark suite.
+    :param scales: list of int, multiples of the Ames data to benchmark (default: DEFAULT_SCALES)
+    :param repeat: int, timed calls per benchmark
+    :param model_name: str, model used for evaluation and prediction
+    :param verbose: bool, print each result as it finishes
+    :return: dict with 'environment', 'created' and 'benchmarks'
+    """
+    from src.prediction import PredictionEngine
+
+    import sklearn
+    import xgboost
+
+    engine = PredictionEngine(model_name)
+    groups = [lambda: benchmark_latency(engine), lambda: benchmark_pages(repeat)]
+    groups += [lambda scale=scale: benchmark_scale(scale, engine, repeat) for scale in scales or DEFAULT_SCALES]
+
+    benchmarks = {}
+    for group in groups:
+        for name, timing in group().items():
+            benchmarks[name] = timing
+            if verbose:
+                print(f"{name:<45} {timing['seconds'] * 1000:>11.2f} ms  (p99 {timing['p99_seconds'] * 1000:.2f} ms)")
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'xgboost': xgboost.__version__,
+        },
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'benchmarks': benchmarks,
+    }
+
+
+def environment_mismatch(results, baseline):
+    """
+    The environment fields on which two runs differ, so their timings are not comparable.
+    :param results: dict returned by run_benchmarks
+    :param baseline: dict returned by an earlier run_benchmarks
+    :return: dict of field -> (baseline value, current value), empty when they match
+    """
+    current, reference = results.get('environment', {}), baseline.get('environment', {})
+    return {key: (reference.get(key), current.get(key)) for key in MATCHED_ENVIRONMENT
+            if reference.get(key) != current.get(key)}
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD, absolute_tolerance=DEFAULT_ABSOLUTE_TOLERANCE):
+    """
+    Compare benchmark results with a baseline run from the same environment.
+    :param results: dict returned by run_benchmarks
+    :param baseline: dict returned by an earlier run_benchmarks
+    :param threshold: float, allowed slowdown as a fraction (0.25 = 25% slower)
+    :param absolute_tolerance: float, allowed slowdown in seconds for statistics
+        shorter than MIN_RELATIVE_SECONDS or timed fewer than MIN_RELATIVE_REPEAT times
+    :return: pd.DataFrame with baseline, current and ratio per benchmark statistic,
+        and a 'regression' column flagging slowdowns beyond the allowed one. p99 is
+        only compared for benchmarks timed at least MIN_P99_REPEAT times in both runs.
+    :raises ValueError: when the runs come from different environments
+    """
+    mismatch = environment_mismatch(results, baseline)
+    if mismatch:
+        details = ', '.join(f"{key} {before} -> {after}" for key, (before, after) in mismatch.items())
+        raise ValueError(f"The baseline was recorded in another environment ({details}).")
+    rows = []
+    for name, timing in results['benchmarks'].items():
+        reference = baseline['benchmarks'].get(name)
+        if reference is None:
+            continue
+        repeat = min(timing.get('repeat', 0), reference.get('repeat', 0))
+        for stat in COMPARED_STATS:
+            if stat == 'p99_seconds' and repeat < MIN_P99_REPEAT:
+                continue
+            if stat in timing and reference.get(stat):
+                relative = reference[stat] >= MIN_RELATIVE_SECONDS and repeat >= MIN_RELATIVE_REPEAT
+                rows.append({'benchmark': name, 'stat': stat, 'baseline': reference[stat],
+                             'current': timing[stat], 'ratio': timing[stat] / reference[stat],
+                             'relative': relative})
+    comparison = pd.DataFrame(rows, columns=['benchmark', 'stat', 'baseline', 'current', 'ratio', 'relative'])
+    comparison['regression'] = comparison['ratio'].gt(1 + threshold).where(
+        comparison['relative'], comparison['current'] - comparison['baseline'] > absolute_tolerance).astype(bool)
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the data, training and inference hot paths.')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help='multiples of the Ames data to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='timed calls per benchmark')
+    parser.add_argument('--model', default='xgb_model', help='model used for evaluation and prediction')
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'latest.json'), help='results file')
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARK_DIR, 'baseline.json'),
+                        help='baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown before failing, as a fraction')
+    parser.add_argument('--absolute-tolerance', type=float, default=DEFAULT_ABSOLUTE_TOLERANCE,
+                        help='allowed slowdown in seconds for short or rarely sampled benchmarks')
+    parser.add_argument('--save-baseline', action='store_true', help='also save the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.scales, args.repeat, args.model)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; rerun with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    try:
+        comparison = compare_to_baseline(results, baseline, args.threshold, args.absolute_tolerance)
+    except ValueError as e:
+        print(f"{e} Not compared; rerun with --save-baseline to record a baseline here")
+        return 0
+    regressions = comparison[comparison['regression']]
+    pd.set_option('display.width', 200)
+    print(comparison.to_string(index=False))
+    if not regressions.empty:
+        print(f"{len(regressions)} benchmark statistics are slower than the baseline beyond the allowed slowdown")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,275 @@
+# src/comparables.py
+
+import argparse
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.data_management import DATASET_DIR, dataset_path, load_dataset
+
+# The Prediction page form's inputs, so a form submission can be matched against past sales
+COMPARABLE_FEATURES = ['GrLivArea', 'TotalSF', 'GarageArea', 'YearBuilt', 'OverallQual']
+
+DEFAULT_DATASET = 'HousePricing_cleaned'
+
+# Appended rows are searched by brute force until they outnumber this share of the tree
+REBUILD_FRACTION = 0.1
+REBUILD_MIN_ROWS = 1024
+
+
+class ComparablesIndex:
+    """
+    Nearest-neighbour index over standardized features of a dataset's rows.
+    Rows are held in a scikit-learn KD-tree, so a top-k query visits a few
+    leaves instead of scanning every sale. Rows appended after the build go
+    to a small buffer that is searched by brute force and merged into a
+    rebuilt tree once it outgrows REBUILD_FRACTION of the tree. The
+    standardization is kept from the first build, so appending never
+    changes the distances between rows already indexed.
+    """
+
+    def __init__(self, X, features=None, leaf_size=40):
+        """
+        :param X: pd.DataFrame with the features, or an array in features order
+        :param features: list of str (default: COMPARABLE_FEATURES)
+        :param leaf_size: int, KD-tree leaf size
+        """
+        self.features = list(features or COMPARABLE_FEATURES)
+        X = self._array(X)
+        self.mean = X.mean(axis=0)
+        std = X.std(axis=0)
+        self.scale = np.where(std > 0, std, 1.0)
+        self.leaf_size = leaf_size
+        self.data = self.standardize(X)
+        self._build_tree(len(self.data))
+
+    def _array(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.features].to_numpy(dtype=np.float64)
+        return np.atleast_2d(np.asarray(X, dtype=np.float64))
+
+    def _build_tree(self, rows):
+        from sklearn.neighbors import KDTree
+
+        self.tree = KDTree(self.data[:rows], leaf_size=self.leaf_size)
+        self.tree_rows = rows
+
+    def standardize(self, X):
+        return (self._array(X) - self.mean) / self.scale
+
+    @property
+    def rows(self):
+        return len(self.data)
+
+    @property
+    def pending_rows(self):
+        return self.rows - self.tree_rows
+
+    def append(self, X):
+        """
+        Index rows appended to the dataset, in order.
+        :param X: pd.DataFrame with the features, or an array in features order
+        :return: bool, whether the tree was rebuilt
+        """
+        self.data = np.concatenate([self.data, self.standardize(X)])
+        if self.pending_rows > max(REBUILD_MIN_ROWS, REBUILD_FRACTION * self.tree_rows):
+            self._build_tree(self.rows)
+            return True
+        return False
+
+    def matches_prefix(self, X):
+        """
+        Whether the first rows of X are the rows this index was built from,
+        i.e. X only has rows appended since.
+        :param X: pd.DataFrame with the features, or an array in features order
+        """
+        return len(X) >= self.rows and np.allclose(self.standardize(self._array(X)[:self.rows]), self.data)
+
+    def query(self, X, k=5):
+        """
+        The k nearest indexed rows of each query row, in one batched call.
+        :param X: pd.DataFrame with the features, or an array in features order
+        :param k: int, neighbours per query row
+        :return: (distances, row positions), arrays of shape (queries, k), nearest first
+        """
+        Z = self.standardize(X)
+        k = min(k, self.rows)
+        distances, positions = self.tree.query(Z, k=min(k, self.tree_rows))
+        if self.pending_rows:
+            pending = self.data[self.tree_rows:]
+            pending_distances = np.sqrt(((Z[:, None, :] - pending[None, :, :]) ** 2).sum(axis=2))
+            distances = np.concatenate([distances, pending_distances], axis=1)
+            positions = np.concatenate([positions, np.broadcast_to(np.arange(self.tree_rows, self.rows),
+                                                                   pending_distances.shape)], axis=1)
+            order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+            distances = np.take_along_axis(distances, order, axis=1)
+            positions = np.take_along_axis(positions, order, axis=1)
+        return distances, positions
+
+    def save(self, path, **metadata):
+        """
+        Persist the index, tree included, so loading it does no rebuild.
+        :param path: str, destination file
+        :param metadata: extra values to store, e.g. source file signature
+        """
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        joblib.dump({'index': self, 'metadata': metadata}, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: str, file written by save()
+        :return: (ComparablesIndex, dict of metadata)
+        """
+        state = joblib.load(path)
+        return state['index'], state['metadata']
+
+
+def comparables_path(name=DEFAULT_DATASET, directory=DATASET_DIR):
+    return os.path.join(directory, f'{name}.comparables.joblib')
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+
+def build_comparables_index(name=DEFAULT_DATASET, directory=DATASET_DIR, features=None):
+    """
+    Index every row of {name}.csv and persist the index.
+    :param name: str, dataset name
+    :param directory: str, dataset directory
+    :param features: list of str (default: COMPARABLE_FEATURES)
+    :return: ComparablesIndex
+    """
+    features = features or COMPARABLE_FEATURES
+    index = ComparablesIndex(load_dataset(name, features, directory), features)
+    index.save(comparables_path(name, directory), **_source_signature(dataset_path(name, directory, 'csv')))
+    return index
+
+
+def load_comparables_index(name=DEFAULT_DATASET, directory=DATASET_DIR):
+    """
+    Load a dataset's persisted index, bringing it up to date first: rows
+    appended to the CSV since it was saved are added incrementally, and any
+    other change rebuilds it.
+    :param name: str, dataset name
+    :param directory: str, dataset directory
+    :return: ComparablesIndex
+    """
+    path = comparables_path(name, directory)
+    csv_path = dataset_path(name, directory, 'csv')
+    if not os.path.exists(path):
+        return build_comparables_index(name, directory)
+    index, metadata = ComparablesIndex.load(path)
+    if metadata == _source_signature(csv_path):
+        return index
+    X = load_dataset(name, index.features, directory)
+    if not index.matches_prefix(X):
+        return build_comparables_index(name, directory, index.features)
+    index.append(X.iloc[index.rows:])
+    index.save(path, **_source_signature(csv_path))
+    return index
+
+
+def append_sales(name, new_rows, directory=DATASET_DIR):
+    """
+    Append sales to {name}.csv, updating its persisted statistics and
+    comparables index with only the new rows.
+    :param name: str, dataset name
+    :param new_rows: pd.DataFrame, rows with the dataset's columns
+    :param directory: str, dataset directory
+    :return: ComparablesIndex
+    """
+    from src.online_stats import append_to_dataset
+
+    index = load_comparables_index(name, directory)
+    append_to_dataset(name, new_rows, directory)
+    index.append(new_rows)
+    index.save(comparables_path(name, directory), **_source_signature(dataset_path(name, directory, 'csv')))
+    return index
+
+
+def comparable_sales(index, sales, records, k=5):
+    """
+    The k most similar past sales of each record.
+    :param index: ComparablesIndex over sales
+    :param sales: pd.DataFrame, the indexed dataset
+    :param records: list of dicts or pd.DataFrame with the index's features
+    :param k: int, sales per record
+    :return: list of pd.DataFrame, one per record, nearest first, with a 'Distance' column
+    """
+    if not hasattr(records, 'columns'):
+        records = pd.DataFrame(records)
+    distances, positions = index.query(records, k)
+    results = []
+    for row_distances, row_positions in zip(distances, positions):
+        comparables = sales.iloc[row_positions].reset_index(drop=True)
+        comparables['Distance'] = row_distances
+        results.append(comparables)
+    return results
+
+
+def _scaled_features(X, rows, rng):
+    # Resample the real houses with a little noise, so larger sets keep the same shape without exact duplicates
+    sample = X[rng.integers(0, len(X), rows)]
+    return sample + rng.normal(0, 0.02, sample.shape) * X.std(axis=0)
+
+
+def benchmark_comparables(sizes=(1_000, 10_000, 100_000, 1_000_000), batch_size=100, k=5, repeat=5):
+    """
+    Build time and query latency of the index against dataset size,
+    compared with a brute-force scan.
+    :return: pd.DataFrame with one row per dataset size
+    """
+    from src.benchmark import time_call
+
+    rng = np.random.default_rng(42)
+    X = load_dataset(DEFAULT_DATASET, COMPARABLE_FEATURES).to_numpy(dtype=np.float64)
+    # Import scikit-learn's tree before anything is timed
+    ComparablesIndex(X)
+    rows = []
+    for size in sizes:
+        data = _scaled_features(X, size, rng)
+        queries = _scaled_features(X, batch_size, rng)
+        build = time_call(lambda: ComparablesIndex(data), repeat=1)
+        index = ComparablesIndex(data)
+        batch = time_call(lambda: index.query(queries, k), repeat=repeat)
+        single = time_call(lambda: index.query(queries[:1], k), repeat=repeat * 20)
+
+        def brute_force():
+            Z = index.standardize(queries)
+            distances = ((Z ** 2).sum(axis=1)[:, None] - 2 * Z @ index.data.T + (index.data ** 2).sum(axis=1))
+            return np.argpartition(distances, k, axis=1)[:, :k]
+
+        brute = time_call(brute_force, repeat=repeat)
+        rows.append({
+            'rows': size,
+            'build_seconds': build['seconds'],
+            'single_query_ms': single['seconds'] * 1000,
+            'batch_ms_per_house': batch['seconds'] * 1000 / batch_size,
+            'brute_force_ms_per_house': brute['seconds'] * 1000 / batch_size,
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Comparable-sales nearest-neighbour index.')
+    parser.add_argument('--dataset', default=DEFAULT_DATASET)
+    parser.add_argument('--benchmark', action='store_true', help='time queries against dataset size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        pd.set_option('display.width', 200)
+        print(benchmark_comparables(args.sizes).to_string(index=False, float_format=lambda x: f'{x:.4f}'))
+        return
+    index = build_comparables_index(args.dataset)
+    print(f"Wrote {comparables_path(args.dataset)}: {index.rows:,} rows over {', '.join(index.features)}")
+
+
+if __name__ == '__main__':
+    main()
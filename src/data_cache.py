@@ -0,0 +1,261 @@
+# src/data_cache.py
+
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.data_management import DATASET_DIR, dataset_columns, dataset_path, load_dataset
+from src.online_stats import load_dataset_stats, stats_path
+
+DEFAULT_MAX_BYTES = int(os.environ.get('DATA_CACHE_MAX_MB', 256)) * 2**20
+
+
+def estimate_size(value):
+    """
+    Estimate the memory held by a cached value.
+    :param value: object to measure
+    :return: int, bytes
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, bytes):
+        return len(value)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+class DataCache:
+    """
+    Process-wide LRU cache shared by all Streamlit sessions.
+    Entries are keyed by the content hashes of the files they were computed
+    from, so editing a file invalidates everything derived from it. Cached
+    values are shared and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._hashes = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def file_hash(self, path):
+        """
+        Content hash of a file, recomputed only when its mtime or size changes.
+        :param path: str, file path
+        :return: str, hex digest ('' if the file does not exist)
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return ''
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''):
+                digest.update(block)
+        self._hashes[path] = (signature, digest.hexdigest())
+        return self._hashes[path][1]
+
+    def memoize(self, key, files, compute):
+        """
+        Return a cached value, computing it on a miss.
+        :param key: hashable, identifies the computation and its parameters
+        :param files: list of str, files the value is derived from
+        :param compute: callable with no arguments producing the value
+        :return: cached or freshly computed value
+        """
+        full_key = (key, tuple(self.file_hash(path) for path in files))
+        with self._lock:
+            if full_key in self._entries:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return self._entries[full_key][0]
+            key_lock = self._key_locks.setdefault(full_key, threading.Lock())
+
+        # Only one session computes a given entry; the others wait for it
+        with key_lock:
+            with self._lock:
+                if full_key in self._entries:
+                    self._entries.move_to_end(full_key)
+                    self.hits += 1
+                    return self._entries[full_key][0]
+            try:
+                value = compute()
+            except BaseException:
+                # Let the next caller retry, rather than leave the key's lock behind
+                with self._lock:
+                    self._key_locks.pop(full_key, None)
+                raise
+            size = estimate_size(value)
+            with self._lock:
+                self.misses += 1
+                self._key_locks.pop(full_key, None)
+                if size <= self.max_bytes:
+                    self._entries[full_key] = (value, size)
+                    self.total_bytes += size
+                    self._evict()
+        return value
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.total_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """
+        :return: dict with entries, bytes, max_bytes, hits and misses
+        """
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+_cache = DataCache()
+
+
+def get_cache():
+    return _cache
+
+
+def dataset_source(name, directory=DATASET_DIR):
+    """
+    The file a dataset's contents come from: its CSV, or the store file when
+    there is no CSV.
+    :param name: str, dataset name
+    :param directory: str, store directory
+    :return: str, file path
+    """
+    csv_path = dataset_path(name, directory, 'csv')
+    return csv_path if os.path.exists(csv_path) else dataset_path(name, directory)
+
+
+def cached_dataset(name, columns=None):
+    """
+    Load a dataset once per process; see data_management.load_dataset.
+    :param name: str, dataset name
+    :param columns: list of str, columns to read (default: all)
+    :return: pd.DataFrame, shared and read-only
+    """
+    key = ('dataset', name, tuple(columns) if columns is not None else None)
+    return _cache.memoize(key, [dataset_source(name)], lambda: load_dataset(name, columns))
+
+
+def cached_describe(name):
+    """
+    Summary statistics (df.describe()) of a dataset, read from its persisted
+    online statistics when they are up to date.
+    :param name: str, dataset name
+    :return: pd.DataFrame, shared and read-only
+    """
+    def compute():
+        stats = load_dataset_stats(name)
+        return stats.describe() if stats is not None else cached_dataset(name).describe()
+
+    return _cache.memoize(('describe', name), [dataset_source(name), stats_path(name)], compute)
+
+
+def cached_correlation(name, columns=None):
+    """
+    Correlation matrix of a dataset, or of some of its columns, read from its
+    persisted online statistics when they are up to date.
+    :param name: str, dataset name
+    :param columns: list of str, columns to correlate (default: all)
+    :return: pd.DataFrame, shared and read-only
+    """
+    def compute():
+        stats = load_dataset_stats(name)
+        if stats is not None:
+            return stats.correlation(columns)
+        return cached_dataset(name, columns).corr()
+
+    key = ('corr', name, tuple(columns) if columns is not None else None)
+    return _cache.memoize(key, [dataset_source(name), stats_path(name)], compute)
+
+
+def cached_range_index(name, key, value):
+    """
+    Sorted range index over one column of a dataset; see range_index.
+    :param name: str, dataset name
+    :param key: str, column to range-query, e.g. 'YearBuilt'
+    :param value: str, column carried along, e.g. 'SalePrice'
+    :return: SortedRangeIndex, shared and read-only
+    """
+    from src.range_index import SortedRangeIndex
+
+    return _cache.memoize(('range_index', name, key, value), [dataset_source(name)],
+                          lambda: SortedRangeIndex(cached_dataset(name, [key, value]), key, value))
+
+
+def cached_comparables(name='HousePricing_cleaned'):
+    """
+    A dataset's comparable-sales index and the sales it indexes.
+    The persisted index is loaded, and brought up to date if needed, once
+    per dataset version.
+    :param name: str, dataset name
+    :return: (ComparablesIndex, pd.DataFrame), shared and read-only
+    """
+    from src.comparables import comparables_path, load_comparables_index
+
+    return _cache.memoize(('comparables', name), [dataset_source(name), comparables_path(name)],
+                          lambda: (load_comparables_index(name), cached_dataset(name)))
+
+
+def cached_inherited_predictions():
+    """
+    Cleaned inherited houses with a 'Predicted_SalePrice' column.
+    :return: pd.DataFrame, shared and read-only
+    """
+    from src.model_registry import manifest_path
+    from src.prediction import DEFAULT_MODEL_NAME, predict_prices
+
+    def compute():
+        inherited_houses = load_dataset('inherited_houses_cleaned')
+        features = inherited_houses.reindex(columns=dataset_columns('X_train'), fill_value=0)
+        inherited_houses['Predicted_SalePrice'] = predict_prices(features.to_dict(orient='records'))
+        return inherited_houses
+
+    files = [dataset_source('inherited_houses_cleaned'), dataset_source('X_train'),
+             f'outputs/models/{DEFAULT_MODEL_NAME}.pkl']
+    # A newly pinned registry version changes which manifest is served
+    registered = manifest_path(DEFAULT_MODEL_NAME)
+    if registered is not None:
+        files.append(registered)
+    return _cache.memoize('inherited_predictions', files, compute)
+
+
+def cached_performance_summary(model_name='xgb_model'):
+    """
+    A model's precomputed performance summary; see performance_summary.
+    :param model_name: str, name of the model file
+    :return: dict, shared and read-only, or None when unavailable
+    """
+    from src.performance_summary import load_performance_summary, summary_path
+
+    files = [f'outputs/models/{model_name}.pkl', summary_path(model_name)]
+    return _cache.memoize(('performance_summary', model_name), files,
+                          lambda: load_performance_summary(model_name))
@@ -1,49 +1,290 @@
 # src/data_management.py
 
+import glob
+import json
+import os
+import threading
+import tracemalloc
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+from src.sinks import open_sink
+
+# Compact dtypes used when reading raw or cleaned data with compact=True.
+# Areas are float32 so they can hold NaN, years are int16 and ratings int8.
+COMPACT_READ_DTYPES = {
+    '1stFlrSF': 'float32', '2ndFlrSF': 'float32', 'BedroomAbvGr': 'float32',
+    'BsmtFinSF1': 'float32', 'BsmtUnfSF': 'float32', 'EnclosedPorch': 'float32',
+    'GarageArea': 'float32', 'GarageYrBlt': 'float32', 'GrLivArea': 'float32',
+    'LotArea': 'float32', 'LotFrontage': 'float32', 'MasVnrArea': 'float32',
+    'OpenPorchSF': 'float32', 'TotalBsmtSF': 'float32', 'WoodDeckSF': 'float32',
+    'TotalSF': 'float32', 'OverallCond': 'int8', 'OverallQual': 'int8',
+    'YearBuilt': 'int16', 'YearRemodAdd': 'int16', 'SalePrice': 'float32',
+}
+
+# Dtypes of the columns clean_data(compact=True) can narrow once missing values are filled
+COMPACT_CLEAN_DTYPES = {
+    'BedroomAbvGr': 'int8', 'GarageYrBlt': 'int16', 'SalePrice': 'int32',
+    'BsmtExposure': 'int8', 'BsmtFinType1': 'int8', 'GarageFinish': 'int8', 'KitchenQual': 'int8',
+}
+
+DATASET_DIR = 'outputs/datasets/collection'
+
+BSMT_EXPOSURE_MAPPING = {'No': 0, 'Mn': 1, 'Av': 2, 'Gd': 3, 'No Exposure': 4}
+BSMT_FIN_TYPE_MAPPING = {'No Basement': 0, 'Unf': 1, 'LwQ': 2, 'Rec': 3, 'BLQ': 4, 'ALQ': 5, 'GLQ': 6}
+GARAGE_FINISH_MAPPING = {'No Garage': 0, 'Unf': 1, 'RFn': 2, 'Fin': 3}
+KITCHEN_QUAL_MAPPING = {'Fa': 0, 'TA': 1, 'Gd': 2, 'Ex': 3}
+ORDINAL_MAPPINGS = {
+    'BsmtExposure': BSMT_EXPOSURE_MAPPING,
+    'BsmtFinType1': BSMT_FIN_TYPE_MAPPING,
+    'GarageFinish': GARAGE_FINISH_MAPPING,
+    'KitchenQual': KITCHEN_QUAL_MAPPING,
+}
+
+TARGET = 'SalePrice'
+# Missing means the house has none of it
+ZERO_FILLED_COLUMNS = ['EnclosedPorch', 'WoodDeckSF', 'GarageYrBlt', '2ndFlrSF', 'MasVnrArea']
+MISSING_LABELS = {'GarageFinish': 'No Garage', 'BsmtFinType1': 'No Basement', 'BsmtExposure': 'No Exposure'}
+TOTAL_SF_PARTS = ['1stFlrSF', '2ndFlrSF', 'TotalBsmtSF']
 
-def load_data(file_path):
+
+def load_data(file_path, compact=False, chunksize=100_000):
     """
     Load the data from a given CSV file path.
     :param file_path: str, path to the dataset CSV file
+    :param compact: bool, read numerics with COMPACT_READ_DTYPES and text as category
+    :param chunksize: int, rows parsed at a time when compact is True
     :return: pd.DataFrame
     """
-    return pd.read_csv(file_path)
+    if not compact:
+        return pd.read_csv(file_path)
+
+    # Parse in chunks so the parser's wide buffers never cover the whole file. Each chunk's text is
+    # made categorical as it is read, and the pieces are joined one column at a time, so the peak is
+    # the compact frame plus one column rather than twice the frame.
+    pieces = {}
+    for chunk in pd.read_csv(file_path, dtype=COMPACT_READ_DTYPES, chunksize=chunksize):
+        for column in chunk.columns:
+            values = chunk[column]
+            # A copy, as a view would keep the chunk's whole block alive until every column sharing it is joined
+            pieces.setdefault(column, []).append(values.astype('category') if values.dtype == object
+                                                 else values.copy())
+        del chunk, values
+    df = None
+    for column in list(pieces):
+        parts = pieces.pop(column)
+        if any(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            # A chunk where a text column is all missing parses as float
+            parts = [part if isinstance(part.dtype, pd.CategoricalDtype) else part.astype(object).astype('category')
+                     for part in parts]
+            values = pd.Series(union_categoricals(parts), name=column)
+        else:
+            values = parts[0].reset_index(drop=True) if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+        del parts
+        # Columns outside the schema, such as ordinal codes in a cleaned file
+        if values.dtype == 'int64':
+            values = pd.to_numeric(values, downcast='integer')
+        # Added one column at a time, as building the frame from all of them at once would copy them together
+        if df is None:
+            df = values.to_frame()
+        else:
+            df[column] = values
+        del values
+    return df if df is not None else pd.read_csv(file_path)
+
+
+def _encode(series, mapping):
+    # Map labels to ordinal codes without materialising an object column
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        lookup = np.array([mapping.get(label, np.nan) for label in series.cat.categories] + [np.nan])
+        # Missing values have code -1, which picks the trailing NaN
+        return pd.Series(lookup[series.cat.codes.to_numpy()], index=series.index)
+    return series.map(mapping)
+
+
+def _fill_label(series, label):
+    if isinstance(series.dtype, pd.CategoricalDtype) and label not in series.cat.categories:
+        series = series.cat.add_categories([label])
+    return series.fillna(label)
 
 
-def clean_data(df):
+def imputation_statistics(df):
     """
-    Clean the dataset: Handle missing values and engineer necessary features.
+    The statistics clean_data imputes with: the LotFrontage median and the
+    BedroomAbvGr mode.
     :param df: pd.DataFrame, raw dataset
-    :return: pd.DataFrame, cleaned dataset
+    :return: dict of column -> fill value
+    """
+    mode = df['BedroomAbvGr'].mode()
+    # An all-missing column has no mode, and is left missing like its median
+    return {'LotFrontage': df['LotFrontage'].median(), 'BedroomAbvGr': mode[0] if len(mode) else np.nan}
+
+
+class Preprocessor:
+    """
+    clean_data split into a fit step and a transform step. fit learns the
+    imputation values from a raw dataset, and the preprocessor also holds
+    the ordinal maps and the model's feature order. It is saved with the
+    model, so single records are served with the training set's statistics
+    rather than statistics of the record itself.
+    transform cleans a DataFrame exactly as clean_data does. transform_record
+    turns one dict of raw or cleaned fields straight into a feature vector
+    without building a DataFrame: missing values are imputed, labels are
+    encoded, TotalSF is computed from its parts when they are given, and
+    absent features are 0, as the prediction engine fills them.
     """
-    # Fill missing values for numerical columns
-    df['EnclosedPorch'].fillna(0, inplace=True)
-    df['WoodDeckSF'].fillna(0, inplace=True)
-    df['LotFrontage'].fillna(df['LotFrontage'].median(), inplace=True)
-    df['GarageFinish'].fillna('No Garage', inplace=True)
-    df['GarageYrBlt'].fillna(0, inplace=True)
-    df['BsmtFinType1'].fillna('No Basement', inplace=True)
-    df['BsmtExposure'].fillna('No Exposure', inplace=True)
-    df['BedroomAbvGr'].fillna(df['BedroomAbvGr'].mode()[0], inplace=True)
-    df['2ndFlrSF'].fillna(0, inplace=True)
-    df['MasVnrArea'].fillna(0, inplace=True)
 
-    # Feature engineering: Create 'TotalSF'
-    df['TotalSF'] = df['1stFlrSF'] + df['2ndFlrSF'] + df['TotalBsmtSF']
+    def __init__(self, statistics=None, feature_names=None, mappings=None):
+        """
+        :param statistics: dict returned by imputation_statistics
+        :param feature_names: list of str, the model's features in order
+        :param mappings: dict of column -> label -> ordinal code (default: ORDINAL_MAPPINGS)
+        """
+        self.statistics = statistics
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.mappings = mappings or ORDINAL_MAPPINGS
+        self._plan = None
+
+    def fit(self, df):
+        """
+        Learn the imputation values and feature order from a raw dataset.
+        :param df: pd.DataFrame, raw dataset (left unchanged)
+        :return: self
+        """
+        self.statistics = imputation_statistics(df)
+        self.feature_names = [column for column in df.columns if column != TARGET]
+        if 'TotalSF' not in self.feature_names:
+            self.feature_names.append('TotalSF')
+        self._plan = None
+        return self
+
+    @property
+    def fill_values(self):
+        """
+        :return: dict of column -> value its missing entries are cleaned to
+        """
+        fills = {column: 0 for column in ZERO_FILLED_COLUMNS}
+        fills.update(self.statistics)
+        for column, label in MISSING_LABELS.items():
+            fills[column] = self.mappings[column].get(label, np.nan)
+        return fills
+
+    def transform(self, df, compact=False):
+        """
+        Clean a raw dataset in place with the fitted statistics.
+        :param df: pd.DataFrame, raw dataset
+        :param compact: bool, narrow the cleaned columns to small int / float32 dtypes
+        :return: pd.DataFrame, cleaned dataset
+        """
+        # Fill missing values for numerical columns
+        for column in ZERO_FILLED_COLUMNS:
+            df[column] = df[column].fillna(0)
+        for column, value in self.statistics.items():
+            df[column] = df[column].fillna(value)
+        # Missing categorical values mean the house has no garage or basement
+        for column, label in MISSING_LABELS.items():
+            df[column] = _fill_label(df[column], label)
+
+        # Feature engineering: Create 'TotalSF'
+        df['TotalSF'] = df['1stFlrSF'] + df['2ndFlrSF'] + df['TotalBsmtSF']
+
+        # Encode categorical variables
+        for column, mapping in self.mappings.items():
+            df[column] = _encode(df[column], mapping)
+
+        if compact:
+            for column, dtype in {**COMPACT_READ_DTYPES, **COMPACT_CLEAN_DTYPES}.items():
+                if column not in df.columns:
+                    continue
+                # Columns that still hold NaN (e.g. unknown labels) stay float32
+                if np.dtype(dtype).kind in 'iu' and df[column].isna().any():
+                    dtype = 'float32'
+                df[column] = df[column].astype(dtype)
 
-    # Encode categorical variables
-    bsmt_exposure_mapping = {'No': 0, 'Mn': 1, 'Av': 2, 'Gd': 3, 'No Exposure': 4}
-    bsmt_fin_type_mapping = {'No Basement': 0, 'Unf': 1, 'LwQ': 2, 'Rec': 3, 'BLQ': 4, 'ALQ': 5, 'GLQ': 6}
-    garage_finish_mapping = {'No Garage': 0, 'Unf': 1, 'RFn': 2, 'Fin': 3}
-    kitchen_qual_mapping = {'Fa': 0, 'TA': 1, 'Gd': 2, 'Ex': 3}
+        return df
 
-    df['BsmtExposure'] = df['BsmtExposure'].map(bsmt_exposure_mapping)
-    df['BsmtFinType1'] = df['BsmtFinType1'].map(bsmt_fin_type_mapping)
-    df['GarageFinish'] = df['GarageFinish'].map(garage_finish_mapping)
-    df['KitchenQual'] = df['KitchenQual'].map(kitchen_qual_mapping)
+    def _compile(self):
+        # One (feature, fill value, ordinal map) entry per feature, in model order
+        fills = self.fill_values
+        self._plan = [(name, fills.get(name, np.nan), self.mappings.get(name)) for name in self.feature_names]
+        self._fills = fills
+        self._total_sf = self.feature_names.index('TotalSF') if 'TotalSF' in self.feature_names else None
 
-    return df
+    def _field(self, record, name):
+        value = record[name]
+        if value is None or value != value:
+            return self._fills.get(name, np.nan)
+        mapping = self.mappings.get(name)
+        if mapping is not None and isinstance(value, str):
+            return mapping.get(value, np.nan)
+        return value
+
+    def transform_record(self, record):
+        """
+        :param record: dict of raw or cleaned house attributes
+        :return: np.ndarray of float64, the features in feature_names order
+        """
+        if self._plan is None:
+            self._compile()
+        vector = np.empty(len(self._plan))
+        for i, (name, fill, mapping) in enumerate(self._plan):
+            if name not in record:
+                vector[i] = 0.0
+                continue
+            value = record[name]
+            if value is None or value != value:
+                value = fill
+            elif mapping is not None and isinstance(value, str):
+                value = mapping.get(value, np.nan)
+            vector[i] = value
+        if self._total_sf is not None and all(part in record for part in TOTAL_SF_PARTS):
+            vector[self._total_sf] = sum(self._field(record, part) for part in TOTAL_SF_PARTS)
+        return vector
+
+    def transform_records(self, records):
+        """
+        :param records: list of dicts of house attributes
+        :return: np.ndarray of shape (len(records), len(feature_names))
+        """
+        return np.vstack([self.transform_record(record) for record in records])
+
+    def save(self, path):
+        """
+        Persist the fitted preprocessor as JSON.
+        :param path: str, destination file
+        """
+        state = {'statistics': {column: float(value) for column, value in self.statistics.items()},
+                 'feature_names': self.feature_names, 'mappings': self.mappings}
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: str, file written by save()
+        :return: Preprocessor
+        """
+        with open(path) as f:
+            state = json.load(f)
+        return cls(state['statistics'], state['feature_names'], state['mappings'])
+
+
+def clean_data(df, compact=False, statistics=None):
+    """
+    Clean the dataset: Handle missing values and engineer necessary features.
+    The frame is cleaned in place and returned.
+    :param df: pd.DataFrame, raw dataset
+    :param compact: bool, narrow the cleaned columns to small int / float32 dtypes
+    :param statistics: dict returned by imputation_statistics (default: computed from df)
+    :return: pd.DataFrame, cleaned dataset
+    """
+    if statistics is None:
+        statistics = imputation_statistics(df)
+    return Preprocessor(statistics).transform(df, compact)
 
 
 def get_training_and_test_data(df):
@@ -54,9 +295,267 @@ def get_training_and_test_data(df):
     """
     from sklearn.model_selection import train_test_split
 
-    X = df.drop(columns=['SalePrice'])
-    y = df['SalePrice']
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Split row positions rather than the frame, so each split is copied once
+    train_rows, test_rows = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+    feature_columns = [i for i, column in enumerate(df.columns) if column != 'SalePrice']
+    target_column = df.columns.get_loc('SalePrice')
+
+    X_train = df.iloc[train_rows, feature_columns]
+    X_test = df.iloc[test_rows, feature_columns]
+    y_train = df.iloc[train_rows, target_column]
+    y_test = df.iloc[test_rows, target_column]
 
     return X_train, X_test, y_train, y_test
+
+
+def _widest_dtype(a, b):
+    # The dtype pandas infers for a whole column whose chunks were inferred as a and b
+    if a is None or a == b:
+        return b
+    if {a.kind, b.kind} <= set('iuf'):
+        return np.dtype('float64')
+    return np.dtype(object)
+
+
+def scan_imputation_statistics(file_path, chunksize=100_000, exact=True, max_centroids=2048):
+    """
+    First pass of streaming cleaning: compute the imputation statistics, and
+    the dtypes pandas would infer reading the whole file, one chunk at a time.
+    The BedroomAbvGr mode is counted exactly. The LotFrontage median is exact
+    when exact is True, holding one count per distinct value; otherwise it
+    comes from a quantile sketch of at most max_centroids centroids.
+    :param file_path: str, path to a raw dataset CSV file
+    :param chunksize: int, rows read at a time
+    :param exact: bool, compute the median exactly
+    :param max_centroids: int, sketch size when exact is False
+    :return: (dict returned by imputation_statistics, dict of column -> dtype)
+    """
+    from src.online_stats import QuantileSketch
+
+    sketch = QuantileSketch(np.iinfo(np.int64).max if exact else max_centroids)
+    bedroom_counts = pd.Series(dtype='float64')
+    dtypes = {}
+    for chunk in pd.read_csv(file_path, chunksize=chunksize):
+        for column, dtype in chunk.dtypes.items():
+            dtypes[column] = _widest_dtype(dtypes.get(column), dtype)
+        sketch.update(chunk['LotFrontage'])
+        bedroom_counts = bedroom_counts.add(chunk['BedroomAbvGr'].value_counts(), fill_value=0)
+    # Like Series.mode, the smallest of equally common values
+    bedroom_counts = bedroom_counts.sort_index()
+    statistics = {'LotFrontage': sketch.quantile(0.5),
+                  'BedroomAbvGr': bedroom_counts.idxmax() if len(bedroom_counts) else np.nan}
+    return statistics, dtypes
+
+
+def clean_data_streaming(file_path, chunksize=100_000, exact=True, max_centroids=2048):
+    """
+    Clean a raw CSV file of any size in two passes: the first computes the
+    imputation statistics over the whole file, the second cleans it chunk by
+    chunk with them. With exact=True the chunks concatenate to what
+    clean_data(load_data(file_path)) returns, while memory stays bounded by
+    the chunk size.
+    :param file_path: str, path to a raw dataset CSV file
+    :param chunksize: int, rows per chunk
+    :param exact: bool, impute with the exact median rather than a sketch estimate
+    :param max_centroids: int, sketch size when exact is False
+    :return: generator of cleaned pd.DataFrame chunks
+    """
+    statistics, dtypes = scan_imputation_statistics(file_path, chunksize, exact, max_centroids)
+    # Read with the whole file's dtypes, so every chunk is parsed as the in-memory path parses it
+    for chunk in pd.read_csv(file_path, dtype=dtypes, chunksize=chunksize):
+        yield clean_data(chunk, statistics=statistics)
+
+
+def clean_csv_streaming(input_path, output_path, chunksize=100_000, exact=True, max_centroids=2048):
+    """
+    Stream a raw CSV file through clean_data_streaming into a CSV or Parquet file.
+    :param input_path: str, path to a raw dataset CSV file
+    :param output_path: str, destination .csv or .parquet file
+    :return: int, rows written
+    """
+    rows = 0
+    sink = open_sink(output_path)
+    try:
+        for chunk in clean_data_streaming(input_path, chunksize, exact, max_centroids):
+            sink.write(chunk)
+            rows += len(chunk)
+    finally:
+        sink.close()
+    return rows
+
+
+def measure_peak_memory(func, *args, **kwargs):
+    """
+    Run a function and measure the peak memory it allocates.
+    :param func: callable to run
+    :return: (result, peak bytes allocated during the call)
+    """
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def pipeline_memory_report(file_path, compact=False):
+    """
+    Measure peak memory of load_data -> clean_data -> get_training_and_test_data.
+    :param file_path: str, path to a raw dataset CSV file with SalePrice
+    :param compact: bool, use the compact dtypes
+    :return: dict with peak bytes and the in-memory size of the cleaned frame
+    """
+    # Import sklearn up front so its module allocations are not counted
+    import sklearn.model_selection  # noqa: F401
+
+    def pipeline():
+        df = clean_data(load_data(file_path, compact=compact), compact=compact)
+        return df, get_training_and_test_data(df)
+
+    (df, _), peak = measure_peak_memory(pipeline)
+    return {
+        'compact': compact,
+        'rows': len(df),
+        'peak_bytes': peak,
+        'cleaned_bytes': int(df.memory_usage(deep=True).sum()),
+    }
+
+
+def dataset_path(name, directory=DATASET_DIR, extension='arrow'):
+    return os.path.join(directory, f'{name}.{extension}')
+
+
+def save_dataset(df, name, directory=DATASET_DIR):
+    """
+    Save a dataset to the columnar store as an uncompressed Arrow IPC
+    (Feather v2) file, so it can be memory-mapped when read.
+    :param df: pd.DataFrame, dataset to save (the index is not stored)
+    :param name: str, dataset name, e.g. 'HousePricing_cleaned'
+    :param directory: str, store directory
+    :return: str, path of the written file
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    path = dataset_path(name, directory)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Write to a private file and rename, so concurrent readers never see a partial file
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return path
+
+
+def import_csv(name, directory=DATASET_DIR):
+    """
+    Import {name}.csv into the columnar store.
+    :param name: str, dataset name
+    :param directory: str, store directory
+    :return: str, path of the written file
+    """
+    return save_dataset(pd.read_csv(dataset_path(name, directory, 'csv')), name, directory)
+
+
+def export_csv(name, directory=DATASET_DIR):
+    """
+    Export a dataset from the columnar store to {name}.csv.
+    :param name: str, dataset name
+    :param directory: str, store directory
+    :return: str, path of the written file
+    """
+    path = dataset_path(name, directory, 'csv')
+    load_dataset(name, directory=directory).to_csv(path, index=False)
+    return path
+
+
+def _needs_import(name, directory):
+    arrow_path = dataset_path(name, directory)
+    csv_path = dataset_path(name, directory, 'csv')
+    if not os.path.exists(arrow_path):
+        return True
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(arrow_path)
+
+
+def load_dataset(name, columns=None, directory=DATASET_DIR):
+    """
+    Load a dataset from the columnar store, reading only the requested columns
+    from a memory-mapped file. The store is refreshed from {name}.csv when the
+    CSV is newer, and the CSV is read directly if the store cannot be written.
+    :param name: str, dataset name, e.g. 'HousePricing_cleaned'
+    :param columns: list of str, columns to read (default: all)
+    :param directory: str, store directory
+    :return: pd.DataFrame
+    """
+    try:
+        import pyarrow.feather as feather
+
+        if _needs_import(name, directory):
+            import_csv(name, directory)
+    except (ImportError, OSError):
+        df = pd.read_csv(dataset_path(name, directory, 'csv'), usecols=columns)
+        return df if columns is None else df[columns]
+
+    table = feather.read_table(dataset_path(name, directory), columns=columns, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def dataset_columns(name, directory=DATASET_DIR):
+    """
+    Return a dataset's column names without reading any rows.
+    :param name: str, dataset name
+    :param directory: str, store directory
+    :return: list of str
+    """
+    try:
+        import pyarrow as pa
+
+        if _needs_import(name, directory):
+            import_csv(name, directory)
+    except (ImportError, OSError):
+        return list(pd.read_csv(dataset_path(name, directory, 'csv'), nrows=0).columns)
+
+    with pa.memory_map(dataset_path(name, directory)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def import_all_csv(directory=DATASET_DIR):
+    """
+    Import every CSV in a directory into the columnar store.
+    :param directory: str, store directory
+    :return: list of str, paths of the written files
+    """
+    names = sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(directory, '*.csv')))
+    return [import_csv(name, directory) for name in names]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Dataset utilities.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    memory_parser = commands.add_parser('memory', help="report peak memory of the cleaning pipeline")
+    memory_parser.add_argument('path', nargs='?', default=dataset_path('HousePricing', extension='csv'))
+    convert_parser = commands.add_parser('convert', help="import CSVs into the columnar store")
+    convert_parser.add_argument('directory', nargs='?', default=DATASET_DIR)
+    clean_parser = commands.add_parser('clean', help="clean a raw CSV of any size in bounded memory")
+    clean_parser.add_argument('input')
+    clean_parser.add_argument('output', help=".csv or .parquet")
+    clean_parser.add_argument('--chunksize', type=int, default=100_000)
+    clean_parser.add_argument('--sketch', action='store_true',
+                              help="estimate the LotFrontage median with a fixed-size sketch")
+    args = parser.parse_args()
+
+    if args.command == 'memory':
+        for compact in (False, True):
+            report = pipeline_memory_report(args.path, compact)
+            print(f"compact={report['compact']}: {report['rows']:,} rows, "
+                  f"peak {report['peak_bytes'] / 2**20:.2f} MiB, "
+                  f"cleaned frame {report['cleaned_bytes'] / 2**20:.2f} MiB")
+    elif args.command == 'clean':
+        rows, peak = measure_peak_memory(clean_csv_streaming, args.input, args.output, args.chunksize,
+                                         exact=not args.sketch)
+        print(f"Wrote {args.output}: {rows:,} rows, peak {peak / 2**20:.2f} MiB")
+    else:
+        for path in import_all_csv(args.directory):
+            print(f"Wrote {path}")
@@ -0,0 +1,55 @@
+# src/figure_cache.py
+
+import io
+import os
+
+from src.data_cache import DataCache, get_cache
+
+# Same rendering settings as st.pyplot
+FIGURE_FORMAT = 'png'
+FIGURE_DPI = 200
+
+# Streamlit downscales and re-encodes images wider than this on every render
+MAX_IMAGE_WIDTH = 1460
+
+# Figures drawn per widget value (e.g. a slider range) get a small cache of their own,
+# so browsing a widget never evicts datasets or the pages' fixed figures
+INTERACTIVE_FIGURE_MAX_BYTES = int(os.environ.get('INTERACTIVE_FIGURE_MAX_MB', 16)) * 2**20
+_interactive_cache = DataCache(INTERACTIVE_FIGURE_MAX_BYTES)
+
+
+def figure_to_bytes(fig, image_format=FIGURE_FORMAT):
+    """
+    Render a matplotlib figure to image bytes.
+    :param fig: matplotlib.figure.Figure
+    :param image_format: str, 'png' or 'svg'
+    :return: bytes
+    """
+    buffer = io.BytesIO()
+    dpi = min(FIGURE_DPI, (MAX_IMAGE_WIDTH - 1) // fig.get_figwidth())
+    fig.savefig(buffer, format=image_format, dpi=dpi, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def cached_figure(spec, files, draw, image_format=FIGURE_FORMAT):
+    """
+    Render a figure once and serve the image bytes from the shared cache.
+    draw should build a matplotlib.figure.Figure directly rather than through
+    pyplot, so no global figure state is created or leaked.
+    :param spec: hashable, identifies the plot and its parameters
+    :param files: list of str, data files the figure is drawn from
+    :param draw: callable with no arguments returning a Figure
+    :param image_format: str, 'png' or 'svg'
+    :return: bytes, rendered image
+    """
+    return get_cache().memoize(('figure', spec, image_format), files,
+                               lambda: figure_to_bytes(draw(), image_format))
+
+
+def cached_interactive_figure(spec, files, draw, image_format=FIGURE_FORMAT):
+    """
+    cached_figure for figures that depend on widget values, held in a
+    separate cache of INTERACTIVE_FIGURE_MAX_BYTES with its own LRU order.
+    """
+    return _interactive_cache.memoize(('figure', spec, image_format), files,
+                                      lambda: figure_to_bytes(draw(), image_format))
@@ -0,0 +1,285 @@
+# src/hyperparameter_search.py
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.model_registry import training_data_hash
+
+DEFAULT_LOG_PATH = 'outputs/models/xgb_search_trials.jsonl'
+
+# Parameter -> ('uniform' | 'loguniform' | 'int', low, high), or a list of choices
+XGBOOST_SEARCH_SPACE = {
+    'learning_rate': ('loguniform', 0.01, 0.3),
+    'max_depth': ('int', 3, 10),
+    'min_child_weight': ('loguniform', 1, 20),
+    'subsample': ('uniform', 0.5, 1.0),
+    'colsample_bytree': ('uniform', 0.5, 1.0),
+    'reg_lambda': ('loguniform', 0.1, 10),
+    'gamma': [0, 0.1, 1],
+}
+
+
+def sample_config(space, rng):
+    """
+    Draw one configuration from a search space.
+    :param space: dict of parameter -> distribution, see XGBOOST_SEARCH_SPACE
+    :param rng: np.random.Generator
+    :return: dict of parameter -> value
+    """
+    config = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            value = spec[rng.integers(len(spec))]
+        elif spec[0] == 'int':
+            value = int(rng.integers(spec[1], spec[2] + 1))
+        elif spec[0] == 'loguniform':
+            value = float(np.exp(rng.uniform(np.log(spec[1]), np.log(spec[2]))))
+        else:
+            value = float(rng.uniform(spec[1], spec[2]))
+        config[name] = value.item() if isinstance(value, np.generic) else value
+    return config
+
+
+def config_key(config):
+    """
+    Stable identifier of a configuration, used to find it in the trial log.
+    """
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def search_fingerprint(X, y, validation_size, early_stopping_rounds, random_state):
+    """
+    Identifier of everything besides the configuration and rounds that a
+    trial's result depends on: the training data, the validation split and
+    early stopping.
+    :return: str, hex digest
+    """
+    settings = {'data': training_data_hash(X, y), 'validation_size': validation_size,
+                'early_stopping_rounds': early_stopping_rounds, 'random_state': random_state}
+    return hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+class TrialLog:
+    """
+    Append-only JSON Lines log of finished trials, keyed by the search
+    fingerprint, configuration and rounds. A search that is interrupted and
+    rerun with the same log, data, settings and seed replays the logged
+    trials instead of training them again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._trials = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        trial = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by an interrupted write
+                        continue
+                    self._trials[(trial['data'], trial['config_id'], trial['rounds'])] = trial
+
+    def get(self, data, config_id, rounds):
+        return self._trials.get((data, config_id, rounds))
+
+    def append(self, trial):
+        with self._lock:
+            self._trials[(trial['data'], trial['config_id'], trial['rounds'])] = trial
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(trial) + '\n')
+
+
+class Budget:
+    """
+    Wall-clock and/or boosting-round budget shared by all trials of a search.
+    """
+
+    def __init__(self, seconds=None, rounds=None):
+        self.seconds = seconds
+        self.rounds = rounds
+        self.rounds_used = 0
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def exhausted(self):
+        if self.seconds is not None and self.elapsed >= self.seconds:
+            return True
+        return self.rounds is not None and self.rounds_used >= self.rounds
+
+    def charge(self, rounds):
+        with self._lock:
+            self.rounds_used += rounds
+
+
+def hyperband_brackets(max_rounds, min_rounds, eta=3):
+    """
+    Successive-halving brackets of one Hyperband iteration.
+    Each bracket starts n configurations on r rounds and keeps the best
+    1/eta at each rung while multiplying their rounds by eta.
+    :param max_rounds: int, most boosting rounds a configuration can get
+    :param min_rounds: int, fewest rounds a configuration is trained with
+    :param eta: int, elimination factor
+    :return: list of (n_configs, [rounds per rung])
+    """
+    s_max = int(math.floor(math.log(max_rounds / min_rounds, eta) + 1e-9))
+    brackets = []
+    for s in range(s_max, -1, -1):
+        n = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        rungs = [int(round(max_rounds * eta ** (i - s))) for i in range(s + 1)]
+        brackets.append((n, rungs))
+    return brackets
+
+
+def _fit_trial(config, rounds, data, nthread, early_stopping_rounds, random_state):
+    from xgboost import XGBRegressor
+
+    X_train, y_train, X_valid, y_valid = data
+    model = XGBRegressor(n_estimators=rounds, early_stopping_rounds=early_stopping_rounds,
+                         random_state=random_state, n_jobs=nthread, **config)
+    start = time.perf_counter()
+    model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], verbose=False)
+    return {
+        'rmse': float(model.best_score),
+        'best_iteration': int(model.best_iteration) + 1,
+        'rounds_trained': int(model.get_booster().num_boosted_rounds()),
+        'fit_seconds': time.perf_counter() - start,
+    }
+
+
+def hyperband_search(X, y, space=None, max_rounds=1000, min_rounds=30, eta=3, time_budget=None,
+                     round_budget=None, n_jobs=None, log_path=DEFAULT_LOG_PATH, validation_size=0.2,
+                     early_stopping_rounds=20, random_state=42, verbose=False):
+    """
+    Tune XGBoost with Hyperband: random configurations are trained on few
+    boosting rounds, and only the best ones earn more. Every trial early-stops
+    on a validation split of the training data, trials within a rung run in
+    parallel threads, and every finished trial is appended to a log from
+    which an interrupted search resumes.
+    Without a budget one Hyperband iteration runs; with a time or round
+    budget, iterations with fresh configurations repeat until it runs out.
+    :param X: pd.DataFrame, training features
+    :param y: pd.Series, training target
+    :param space: dict, search space (default: XGBOOST_SEARCH_SPACE)
+    :param max_rounds: int, most boosting rounds a configuration can get
+    :param min_rounds: int, rounds given to configurations in the first rung
+    :param eta: int, keep the best 1/eta configurations at each rung
+    :param time_budget: float, wall-clock seconds to search for
+    :param round_budget: int, total boosting rounds to train across trials
+    :param n_jobs: int, parallel trials (default: all cores)
+    :param log_path: str, JSON Lines trial log (None to keep trials in memory)
+    :param validation_size: float, fraction of X held out for early stopping
+    :param early_stopping_rounds: int, rounds without improvement before a trial stops
+    :param random_state: int, seed for the validation split and the sampled configurations
+    :param verbose: bool, print each finished rung
+    :return: (dict with the best params, n_estimators and validation rmse, pd.DataFrame of all trials)
+    """
+    from sklearn.model_selection import train_test_split
+
+    space = space or XGBOOST_SEARCH_SPACE
+    n_jobs = n_jobs or os.cpu_count() or 1
+    nthread = max(1, (os.cpu_count() or 1) // n_jobs)
+    X_train, X_valid, y_train, y_valid = train_test_split(X, y, test_size=validation_size,
+                                                          random_state=random_state)
+    data = (X_train, y_train, X_valid, y_valid)
+    fingerprint = search_fingerprint(X, y, validation_size, early_stopping_rounds, random_state)
+    log = TrialLog(log_path)
+    budget = Budget(time_budget, round_budget)
+    rng = np.random.default_rng(random_state)
+    trials = []
+
+    def run(config, rounds, bracket, rung):
+        config_id = config_key(config)
+        trial = log.get(fingerprint, config_id, rounds)
+        if trial is None:
+            if budget.exhausted():
+                return None
+            result = _fit_trial(config, rounds, data, nthread, early_stopping_rounds, random_state)
+            budget.charge(result['rounds_trained'])
+            trial = {'data': fingerprint, 'config_id': config_id, 'rounds': rounds, 'params': config, **result}
+            log.append(trial)
+        trial = {**trial, 'bracket': bracket, 'rung': rung}
+        trials.append(trial)
+        return trial
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        iteration = 0
+        while not budget.exhausted():
+            for bracket, (n_configs, rungs) in enumerate(hyperband_brackets(max_rounds, min_rounds, eta)):
+                configs = [sample_config(space, rng) for _ in range(n_configs)]
+                for rung, rounds in enumerate(rungs):
+                    results = list(pool.map(lambda config: run(config, rounds, bracket, rung), configs))
+                    finished = sorted((r for r in results if r is not None), key=lambda r: r['rmse'])
+                    if verbose and finished:
+                        print(f"iteration {iteration} bracket {bracket} rung {rung}: {len(finished)} trials "
+                              f"x {rounds} rounds, best rmse {finished[0]['rmse']:.1f} "
+                              f"({budget.elapsed:.0f}s, {budget.rounds_used} rounds trained)")
+                    if len(finished) < len(results):
+                        break
+                    configs = [r['params'] for r in finished[:max(1, len(finished) // eta)]]
+            iteration += 1
+            if time_budget is None and round_budget is None:
+                break
+
+    results = pd.DataFrame(trials)
+    if results.empty:
+        raise RuntimeError('The budget ran out before any trial finished')
+    best = results.loc[results['rmse'].idxmin()]
+    return {'params': dict(best['params']), 'n_estimators': int(best['best_iteration']),
+            'rmse': float(best['rmse'])}, results
+
+
+if __name__ == '__main__':
+    from src.data_management import DATASET_DIR, Preprocessor, dataset_path, load_data, load_dataset
+    from src.model_evaluation import evaluate_model, save_model, train_xgboost
+    from src.model_registry import register_saved_model
+    from src.pipeline import PIPELINE_MODELS
+
+    parser = argparse.ArgumentParser(description='Budget-aware Hyperband search over XGBoost hyperparameters.')
+    parser.add_argument('--time-budget', type=float, help='wall-clock seconds to search for')
+    parser.add_argument('--round-budget', type=int, help='total boosting rounds to train across trials')
+    parser.add_argument('--max-rounds', type=int, default=1000, help='most boosting rounds per configuration')
+    parser.add_argument('--min-rounds', type=int, default=30, help='rounds per configuration in the first rung')
+    parser.add_argument('--eta', type=int, default=3, help='keep the best 1/eta configurations at each rung')
+    parser.add_argument('--jobs', type=int, help='parallel trials (default: all cores)')
+    parser.add_argument('--log', default=DEFAULT_LOG_PATH, help='trial log to resume from and append to')
+    parser.add_argument('--save-model', metavar='NAME',
+                        help='retrain on X_train with the best parameters, then save and register it as NAME')
+    parser.add_argument('--pin', action='store_true', help='pin the registered version of the saved model')
+    args = parser.parse_args()
+    if args.save_model in PIPELINE_MODELS:
+        # The pipeline would not notice the overwrite, and would restore its own model on its next run
+        parser.error(f"{args.save_model} is built by src.pipeline; save the tuned model under another name")
+
+    X_train = load_dataset('X_train')
+    y_train = load_dataset('y_train')['SalePrice']
+    best, trials = hyperband_search(X_train, y_train, max_rounds=args.max_rounds, min_rounds=args.min_rounds,
+                                    eta=args.eta, time_budget=args.time_budget, round_budget=args.round_budget,
+                                    n_jobs=args.jobs, log_path=args.log, verbose=True)
+    print(f"{len(trials)} trials, best validation RMSE {best['rmse']:.1f} "
+          f"with n_estimators={best['n_estimators']} and {best['params']}")
+
+    if args.save_model:
+        model = train_xgboost(X_train, y_train, n_estimators=best['n_estimators'], **best['params'])
+        r2, mse = evaluate_model(model, load_dataset('X_test'), load_dataset('y_test')['SalePrice'])
+        print(f"Test R²: {r2:.3f}, MSE: {mse:.0f}")
+        # Saved and registered as the pipeline saves its models, so the app serves it the same way
+        house_pricing = load_data(dataset_path('HousePricing', DATASET_DIR, 'csv'))
+        save_model(model, args.save_model, Preprocessor().fit(house_pricing))
+        version, _ = register_saved_model(args.save_model, pin=args.pin, compile_trees=True)
+        print(f"Saved outputs/models/{args.save_model}.pkl and registered it as version {version}")
@@ -0,0 +1,233 @@
+# src/instrumentation.py
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# PAGE_METRICS=1 turns timing on; when off, stage() and page_run() return a shared no-op context
+PAGE_METRICS = os.environ.get('PAGE_METRICS', '0') == '1'
+# Serve Prometheus text metrics on this port, e.g. 9100
+METRICS_PORT = os.environ.get('METRICS_PORT')
+# Append one JSON record per rerun to this file, rotated at METRICS_LOG_MAX_MB
+METRICS_LOG = os.environ.get('METRICS_LOG')
+METRICS_LOG_MAX_MB = float(os.environ.get('METRICS_LOG_MAX_MB', 10))
+# Per-session totals are dropped once a session has had no rerun for this long
+METRICS_SESSION_IDLE_SECONDS = float(os.environ.get('METRICS_SESSION_IDLE_SECONDS', 1800))
+
+# Prometheus' default histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram of observed durations, as Prometheus exposes them.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+class PageMetrics:
+    """
+    Wall and CPU time per page rerun and per named stage within it.
+    Streamlit runs each session's reruns on its own thread, so the rerun in
+    progress is tracked per thread and stages attach to it. CPU time is the
+    thread's own (time.thread_time), not the whole server's. Sessions idle
+    for longer than session_idle_seconds are evicted, so a session that
+    comes back starts counting its reruns again.
+    """
+
+    def __init__(self, log_path=None, log_max_bytes=int(METRICS_LOG_MAX_MB * 2**20),
+                 session_idle_seconds=METRICS_SESSION_IDLE_SECONDS):
+        self.histograms = {}
+        self.reruns = {}
+        self.sessions = {}
+        self.session_idle_seconds = session_idle_seconds
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._logger = None
+        if log_path:
+            self._logger = logging.getLogger(f'{__name__}.{log_path}')
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=log_max_bytes, backupCount=3)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+
+    def _observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms.setdefault(key, Histogram())
+        histogram.observe(value)
+
+    def _evict_idle_sessions(self, now):
+        # Called with the lock held
+        idle = [session for session, totals in self.sessions.items()
+                if now - totals['last_seen'] > self.session_idle_seconds]
+        for session in idle:
+            del self.sessions[session]
+
+    @contextmanager
+    def page_run(self, page, session='local'):
+        """
+        Time one rerun of a page, collecting the stages run inside it.
+        :param page: str, page title
+        :param session: str, Streamlit session id
+        """
+        record = {'page': page, 'session': session, 'started': time.time(), 'stages': []}
+        self._local.run = record
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.thread_time() - cpu
+            self._local.run = None
+            now = time.monotonic()
+            with self._lock:
+                self._evict_idle_sessions(now)
+                session_totals = self.sessions.setdefault(session, {'reruns': 0, 'wall_seconds': 0.0,
+                                                                    'cpu_seconds': 0.0})
+                session_totals['last_seen'] = now
+                session_totals['reruns'] += 1
+                session_totals['wall_seconds'] += record['wall_seconds']
+                session_totals['cpu_seconds'] += record['cpu_seconds']
+                record['rerun'] = session_totals['reruns']
+                self.reruns[page] = self.reruns.get(page, 0) + 1
+                self._observe('page_render_seconds', {'page': page}, record['wall_seconds'])
+                self._observe('page_render_cpu_seconds', {'page': page}, record['cpu_seconds'])
+                for stage_record in record['stages']:
+                    labels = {'page': page, 'stage': stage_record['stage']}
+                    self._observe('page_stage_seconds', labels, stage_record['wall_seconds'])
+                    self._observe('page_stage_cpu_seconds', labels, stage_record['cpu_seconds'])
+            if self._logger is not None:
+                self._logger.info(json.dumps(record))
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a named stage of the current rerun (or of no rerun, as page 'none').
+        :param name: str, e.g. 'read_csv', 'corr' or 'draw heatmap'
+        """
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            stage_record = {'stage': name, 'wall_seconds': time.perf_counter() - wall,
+                            'cpu_seconds': time.thread_time() - cpu}
+            run = getattr(self._local, 'run', None)
+            if run is not None:
+                run['stages'].append(stage_record)
+            else:
+                with self._lock:
+                    labels = {'page': 'none', 'stage': name}
+                    self._observe('page_stage_seconds', labels, stage_record['wall_seconds'])
+                    self._observe('page_stage_cpu_seconds', labels, stage_record['cpu_seconds'])
+
+    def prometheus_text(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        :return: str
+        """
+        help_text = {
+            'page_render_seconds': 'Wall time of a page rerun',
+            'page_render_cpu_seconds': 'CPU time of a page rerun',
+            'page_stage_seconds': 'Wall time of a named stage within a page rerun',
+            'page_stage_cpu_seconds': 'CPU time of a named stage within a page rerun',
+        }
+        lines = []
+        with self._lock:
+            self._evict_idle_sessions(time.monotonic())
+            for name in help_text:
+                series = [(labels, histogram) for (metric, labels), histogram in sorted(self.histograms.items())
+                          if metric == name]
+                if not series:
+                    continue
+                lines += [f'# HELP {name} {help_text[name]}', f'# TYPE {name} histogram']
+                for labels, histogram in series:
+                    label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{label_text}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+            lines += ['# HELP page_reruns_total Page reruns', '# TYPE page_reruns_total counter']
+            lines += [f'page_reruns_total{{page="{_escape(page)}"}} {count}'
+                      for page, count in sorted(self.reruns.items())]
+            lines += ['# HELP page_sessions Sessions with a rerun within the idle timeout', '# TYPE page_sessions gauge',
+                      f'page_sessions {len(self.sessions)}']
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def serve_metrics(metrics, port, host='0.0.0.0'):
+    """
+    Serve metrics.prometheus_text() at /metrics from a daemon thread.
+    :param metrics: PageMetrics
+    :param port: int
+    :return: ThreadingHTTPServer
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics-server').start()
+    return server
+
+
+_metrics = PageMetrics(METRICS_LOG) if PAGE_METRICS else None
+_server = serve_metrics(_metrics, int(METRICS_PORT)) if _metrics is not None and METRICS_PORT else None
+
+
+def get_metrics():
+    """
+    :return: PageMetrics, or None when PAGE_METRICS is off
+    """
+    return _metrics
+
+
+def page_run(page, session='local'):
+    """
+    Time one rerun of a page; a no-op unless PAGE_METRICS=1.
+    """
+    return _metrics.page_run(page, session) if _metrics is not None else _NOOP
+
+
+def stage(name):
+    """
+    Time a named stage inside a page's app(); a no-op unless PAGE_METRICS=1.
+    """
+    return _metrics.stage(name) if _metrics is not None else _NOOP
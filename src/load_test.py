@@ -0,0 +1,282 @@
+# src/load_test.py
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+from src.benchmark import PAGES, StreamlitStub
+
+PERCENTILES = (50, 95, 99)
+
+# A render taking longer than this counts as an error, and a session stuck in one is abandoned
+DEFAULT_RENDER_TIMEOUT = 60.0
+
+
+class SessionStub(StreamlitStub):
+    """
+    Streamlit stand-in shared by the simulated sessions. Each session runs on
+    its own thread, as Streamlit runs each session's reruns, so the random
+    form inputs and the errors a page shows are kept per thread. Buttons are
+    always pressed, so the prediction path runs on every render.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def start_session(self, seed):
+        self._local.random = random.Random(seed)
+        self._local.errors = []
+
+    @property
+    def errors(self):
+        return self._local.errors
+
+    def _vary(self, value, min_value=None, max_value=None):
+        # Within 10% of the default, so related inputs stay consistent (e.g. living area below total area)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return value
+        varied = value * self._local.random.uniform(0.9, 1.1)
+        if min_value is not None:
+            varied = max(varied, min_value)
+        if max_value is not None:
+            varied = min(varied, max_value)
+        return int(round(varied)) if isinstance(value, int) else varied
+
+    def slider(self, label, min_value=None, max_value=None, value=None, *args, **kwargs):
+        return self._vary(value if value is not None else min_value, min_value, max_value)
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, *args, **kwargs):
+        return self._vary(value if value is not None else min_value, min_value, max_value)
+
+    def button(self, *args, **kwargs):
+        return True
+
+    def write(self, *args, **kwargs):
+        # Pages report failures as st.write(f"Error: ...")
+        if args and isinstance(args[0], str) and args[0].startswith('Error:'):
+            self._local.errors.append(args[0])
+
+    def error(self, body, *args, **kwargs):
+        self._local.errors.append(str(body))
+
+
+def _free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def start_stand_in(host='127.0.0.1', port=None, timeout=60.0, **server_options):
+    """
+    Serve the Flask API's endpoints from the local model on a daemon thread,
+    with its own event loop.
+    :param host: str, interface to bind
+    :param port: int, port to bind (default: a free port)
+    :param timeout: float, seconds to wait for the server to accept connections
+    :param server_options: InferenceServer arguments, e.g. latency and error_rate
+    :return: (InferenceServer, str base URL)
+    """
+    from src.serving import InferenceServer
+
+    port = port or _free_port(host)
+    server = InferenceServer(**server_options)
+    threading.Thread(target=asyncio.run, args=(server.serve(host, port),), daemon=True,
+                     name='api-stand-in').start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return server, f'http://{host}:{port}'
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Stand-in API did not start on {host}:{port}.")
+            time.sleep(0.05)
+
+
+def _run_session(pages, stub, session, renders, deadline, render_timeout, seed, results, current, stop):
+    stub.start_session(seed)
+    round_number = 0
+    while (renders is None or round_number < renders) and (deadline is None or time.monotonic() < deadline):
+        round_number += 1
+        for page_name, page in pages:
+            if stop.is_set():
+                return
+            del stub.errors[:]
+            current[session] = (page_name, time.monotonic())
+            start = time.perf_counter()
+            try:
+                page.app()
+                error = stub.errors[0] if stub.errors else None
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+            seconds = time.perf_counter() - start
+            current.pop(session, None)
+            if error is None and seconds > render_timeout:
+                error = f"Render took longer than {render_timeout:g}s."
+            results.append({'session': session, 'page': page_name, 'seconds': seconds, 'error': error})
+
+
+def _join_sessions(threads, current, render_timeout, stop):
+    """
+    Wait for the sessions to finish. A session stuck in one render for
+    longer than render_timeout is abandoned on its daemon thread, since a
+    thread cannot be stopped, and its render is recorded as an error.
+    :return: list of result dicts for the abandoned renders
+    """
+    hung = {}
+    while True:
+        waiting = [session for session, thread in enumerate(threads) if thread.is_alive() and session not in hung]
+        if not waiting:
+            break
+        for session in waiting:
+            render = current.get(session)
+            if render is not None and time.monotonic() - render[1] > render_timeout:
+                hung[session] = render
+        threads[waiting[0]].join(0.1)
+    stop.set()
+    return [{'session': session, 'page': page_name, 'seconds': time.monotonic() - started,
+             'error': f"Render did not finish within {render_timeout:g}s."}
+            for session, (page_name, started) in hung.items()]
+
+
+def summarize_renders(results, wall_seconds):
+    """
+    Latency percentiles, throughput and error rate per page and overall.
+    :param results: list of dicts with page, seconds and error
+    :param wall_seconds: float, duration of the run
+    :return: dict of page name (and 'all') -> statistics
+    """
+    summary = {}
+    for page_name in sorted({result['page'] for result in results}) + ['all']:
+        selected = [result for result in results if page_name in ('all', result['page'])]
+        seconds = np.array([result['seconds'] for result in selected])
+        errors = sum(result['error'] is not None for result in selected)
+        summary[page_name] = {
+            'renders': len(selected),
+            **{f'p{q}_ms': float(np.percentile(seconds, q) * 1000) for q in PERCENTILES},
+            'max_ms': float(seconds.max() * 1000),
+            'renders_per_second': len(selected) / wall_seconds,
+            'error_rate': errors / len(selected),
+        }
+    return summary
+
+
+def run_load_test(sessions=20, renders=5, duration=None, pages=None, api_url=None, latency=0.0, error_rate=0.0,
+                  render_timeout=DEFAULT_RENDER_TIMEOUT, seed=42):
+    """
+    Drive concurrent simulated Streamlit sessions through the app's pages
+    against a stand-in for the Flask API, entirely offline. Each session
+    renders every page in turn with its own random form inputs, pressing
+    every button. The pages run with PREDICTION_BACKEND=remote, so every
+    prediction and the model performance come from the API; it is read
+    when src.prediction is imported, so this must run before that.
+    :param sessions: int, concurrent sessions
+    :param renders: int, rounds of every page per session (None: until duration)
+    :param duration: float, seconds to run for (None: until renders)
+    :param pages: list of page module names (default: every page)
+    :param api_url: str, API base URL to use instead of starting the stand-in
+    :param latency: float, seconds the stand-in adds to every request
+    :param error_rate: float, share of stand-in requests answered 503
+    :param render_timeout: float, seconds after which a render counts as an error
+    :param seed: int
+    :return: dict with the per-page summary, API client stats and stand-in stats
+    """
+    if 'src.prediction' in sys.modules and sys.modules['src.prediction'].PREDICTION_BACKEND != 'remote':
+        raise RuntimeError("src.prediction was imported without PREDICTION_BACKEND=remote.")
+    os.environ['PREDICTION_BACKEND'] = 'remote'
+    server = None
+    if api_url is None:
+        server, api_url = start_stand_in(latency=latency, error_rate=error_rate, seed=seed)
+    os.environ['API_BASE_URL'] = api_url
+
+    from src.api_client import get_client
+
+    stub = SessionStub()
+    modules = [(page_name, importlib.import_module(f'app_pages.{page_name}')) for page_name in pages or PAGES]
+    streamlits = [page.st for _, page in modules]
+    for _, page in modules:
+        page.st = stub
+    results = []
+    current = {}
+    stop = threading.Event()
+    deadline = time.monotonic() + duration if duration is not None else None
+    threads = [threading.Thread(target=_run_session, name=f'session-{session}', daemon=True,
+                                args=(modules, stub, session, renders, deadline, render_timeout, seed + session,
+                                      results, current, stop))
+               for session in range(sessions)]
+    abandoned = []
+    start = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        abandoned = _join_sessions(threads, current, render_timeout, stop)
+        # Abandoned sessions may still append, so the results are taken now
+        results = list(results) + abandoned
+    finally:
+        # An abandoned session is still rendering, so its pages keep the stub
+        if not abandoned:
+            for (_, page), streamlit in zip(modules, streamlits):
+                page.st = streamlit
+    wall_seconds = time.perf_counter() - start
+
+    report = {'sessions': sessions, 'wall_seconds': wall_seconds, 'api_url': api_url,
+              'pages': summarize_renders(results, wall_seconds), 'api_client': get_client().stats()}
+    errors = {}
+    for result in results:
+        if result['error'] is not None:
+            errors[result['error']] = errors.get(result['error'], 0) + 1
+    report['errors'] = dict(sorted(errors.items(), key=lambda item: -item[1])[:10])
+    if server is not None:
+        report['stand_in'] = {'requests': server.requests, 'injected_errors': server.injected_errors,
+                              'batches': server.batcher.batches, 'batched_rows': server.batcher.rows}
+    return report
+
+
+def format_report(report):
+    lines = [f"{report['sessions']} sessions in {report['wall_seconds']:.1f}s against {report['api_url']}",
+             f"{'page':<24}{'renders':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'renders/s':>11}{'errors':>9}"]
+    for page_name, stats in report['pages'].items():
+        lines.append(f"{page_name:<24}{stats['renders']:>9}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+                     f"{stats['p99_ms']:>10.1f}{stats['renders_per_second']:>11.1f}{stats['error_rate']:>9.1%}")
+    lines.append(f"API client: {report['api_client']}")
+    if 'stand_in' in report:
+        lines.append(f"Stand-in API: {report['stand_in']}")
+    lines += [f"{count:>6} x {error}" for error, count in report['errors'].items()]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app's pages against a local stand-in API.")
+    parser.add_argument('--sessions', type=int, default=20, help="concurrent simulated sessions")
+    parser.add_argument('--renders', type=int, default=5, help="rounds of every page per session")
+    parser.add_argument('--duration', type=float, help="run for this many seconds instead of --renders rounds")
+    parser.add_argument('--pages', nargs='+', choices=PAGES, help="pages to render (default: all)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="delay the stand-in adds to every request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of stand-in requests answered 503")
+    parser.add_argument('--api-url', help="use this API instead of starting the stand-in")
+    parser.add_argument('--render-timeout', type=float, default=DEFAULT_RENDER_TIMEOUT,
+                        help="seconds after which a render counts as an error")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args.sessions, None if args.duration else args.renders, args.duration, args.pages,
+                           args.api_url, args.latency_ms / 1000, args.error_rate, args.render_timeout, args.seed)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,13 @@
 # src/model_evaluation.py
 
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
 import joblib
-from sklearn.metrics import r2_score, mean_squared_error
+import numpy as np
 import pandas as pd
 
 def train_linear_regression(X_train, y_train):
@@ -32,41 +38,163 @@ def train_random_forest(X_train, y_train):
     return rf_model
 
 
-def train_xgboost(X_train, y_train):
+def train_xgboost(X_train, y_train, **params):
     """
     Train an XGBoost regression model.
     :param X_train: pd.DataFrame, training features
     :param y_train: pd.Series, training target
+    :param params: XGBRegressor parameters, e.g. the best found by hyperparameter_search
     :return: trained XGBoost model
     """
     from xgboost import XGBRegressor
     
-    xgb_model = XGBRegressor(n_estimators=100, random_state=42)
+    xgb_model = XGBRegressor(**{'n_estimators': 100, 'random_state': 42, **params})
     xgb_model.fit(X_train, y_train)
     return xgb_model
 
 
-def evaluate_model(model, X_test, y_test):
+def regression_metrics(y_true, y_pred):
+    """
+    Compute regression metrics for a set of predictions.
+    :param y_true: array-like, actual values
+    :param y_pred: array-like, predicted values
+    :return: dict with r2, mse, mae, rmse and mape
+    """
+    from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error, mean_absolute_percentage_error
+
+    mse = mean_squared_error(y_true, y_pred)
+    return {
+        'r2': r2_score(y_true, y_pred),
+        'mse': mse,
+        'mae': mean_absolute_error(y_true, y_pred),
+        'rmse': float(np.sqrt(mse)),
+        'mape': mean_absolute_percentage_error(y_true, y_pred),
+    }
+
+
+def evaluate_model(model, X_test, y_test, all_metrics=False):
     """
     Evaluate a trained model using R² and MSE.
     :param model: trained model
     :param X_test: pd.DataFrame, test features
     :param y_test: pd.Series, test target
-    :return: R² and MSE
+    :param all_metrics: bool, return the full regression_metrics dict instead
+    :return: R² and MSE, or a dict of metrics when all_metrics is True
     """
     y_pred = model.predict(X_test)
-    r2 = r2_score(y_test, y_pred)
-    mse = mean_squared_error(y_test, y_pred)
-    return r2, mse
+    metrics = regression_metrics(y_test, y_pred)
+    if all_metrics:
+        return metrics
+    return metrics['r2'], metrics['mse']
+
+
+CANDIDATE_MODELS = {
+    'Linear Regression': train_linear_regression,
+    'Random Forest': train_random_forest,
+    'XGBoost': train_xgboost,
+}
+
+# Shared, memory-mapped tournament data, opened once per worker process
+_tournament_data = None
+
+
+def _init_tournament_worker(data_dir, threads):
+    global _tournament_data
+    from threadpoolctl import threadpool_limits
+
+    # Load xgboost first so its OpenMP runtime is covered by the limit
+    import xgboost  # noqa: F401
+    threadpool_limits(limits=threads)
+    _tournament_data = {
+        'X': np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r'),
+        'y': np.load(os.path.join(data_dir, 'y.npy'), mmap_mode='r'),
+        'folds': np.load(os.path.join(data_dir, 'folds.npy'), mmap_mode='r'),
+        'columns': list(np.load(os.path.join(data_dir, 'columns.npy'))),
+    }
+
+
+def _run_tournament_task(model_name, train_function, fold):
+    X, y, folds = _tournament_data['X'], _tournament_data['y'], _tournament_data['folds']
+    columns = _tournament_data['columns']
+    test_mask = np.asarray(folds == fold)
+    X_train = pd.DataFrame(X[~test_mask], columns=columns)
+    X_test = pd.DataFrame(X[test_mask], columns=columns)
+
+    start = time.perf_counter()
+    model = train_function(X_train, y[~test_mask])
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    return {'model': model_name, 'fold': fold, **regression_metrics(y[test_mask], y_pred),
+            'fit_seconds': fit_seconds, 'predict_seconds': predict_seconds}
 
 
-def save_model(model, model_name):
+def run_tournament(X, y, models=None, n_splits=5, n_jobs=None, random_state=42):
+    """
+    Train and evaluate candidate models across k folds in a process pool.
+    Fold assignments are computed once and, with the data, written to
+    memory-mapped files that every worker shares.
+    :param X: pd.DataFrame, features
+    :param y: pd.Series, target
+    :param models: dict of name -> train function (default: CANDIDATE_MODELS)
+    :param n_splits: int, number of folds
+    :param n_jobs: int, worker processes (default: all cores)
+    :param random_state: int, seed for the fold shuffle
+    :return: pd.DataFrame with one row per model and fold: metrics, fit_seconds, predict_seconds
+    """
+    from sklearn.model_selection import KFold
+
+    models = models or CANDIDATE_MODELS
+    n_jobs = n_jobs or os.cpu_count() or 1
+    tasks = [(name, function, fold) for fold in range(n_splits) for name, function in models.items()]
+    workers = min(n_jobs, len(tasks))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    folds = np.empty(len(X), dtype=np.int16)
+    for fold, (_, test_rows) in enumerate(KFold(n_splits, shuffle=True, random_state=random_state).split(X)):
+        folds[test_rows] = fold
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        np.save(os.path.join(data_dir, 'X.npy'), np.ascontiguousarray(X.to_numpy(dtype=np.float64)))
+        np.save(os.path.join(data_dir, 'y.npy'), np.asarray(y, dtype=np.float64))
+        np.save(os.path.join(data_dir, 'folds.npy'), folds)
+        np.save(os.path.join(data_dir, 'columns.npy'), np.array(X.columns, dtype=str))
+
+        # spawn, not fork: forking after OpenMP has started can deadlock the workers
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                 initializer=_init_tournament_worker, initargs=(data_dir, threads)) as pool:
+            futures = [pool.submit(_run_tournament_task, *task) for task in tasks]
+            results = [future.result() for future in futures]
+
+    return pd.DataFrame(results)
+
+
+def summarize_tournament(results):
+    """
+    Average a tournament's per-fold results for each model, best test R² first.
+    :param results: pd.DataFrame returned by run_tournament
+    :return: pd.DataFrame with the mean and standard deviation of each column per model
+    """
+    summary = results.drop(columns='fold').groupby('model').agg(['mean', 'std'])
+    return summary.sort_values(('r2', 'mean'), ascending=False)
+
+
+def preprocessor_path(model_name):
+    return f'outputs/models/{model_name}_preprocessor.json'
+
+
+def save_model(model, model_name, preprocessor=None):
     """
     Save the trained model to a file.
     :param model: trained model
     :param model_name: str, name for the model file
+    :param preprocessor: fitted data_management.Preprocessor, saved alongside the model
     """
     joblib.dump(model, f'outputs/models/{model_name}.pkl')
+    if preprocessor is not None:
+        preprocessor.save(preprocessor_path(model_name))
 
 
 def load_model(model_name):
@@ -77,3 +205,22 @@ def load_model(model_name):
     """
     return joblib.load(f'outputs/models/{model_name}.pkl')
 
+
+def load_preprocessor(model_name):
+    """
+    Load the preprocessor saved with a model.
+    :param model_name: str, name of the model file
+    :return: data_management.Preprocessor, or None if the model was saved without one
+    """
+    from src.data_management import Preprocessor
+
+    path = preprocessor_path(model_name)
+    return Preprocessor.load(path) if os.path.exists(path) else None
+
+
+if __name__ == '__main__':
+    data = pd.read_csv('outputs/datasets/collection/HousePricing_cleaned.csv')
+    results = run_tournament(data.drop(columns=['SalePrice']), data['SalePrice'])
+    pd.set_option('display.width', 200)
+    print(summarize_tournament(results)[[('r2', 'mean'), ('r2', 'std'), ('rmse', 'mean'),
+                                         ('fit_seconds', 'mean'), ('predict_seconds', 'mean')]])
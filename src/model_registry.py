@@ -0,0 +1,415 @@
+# src/model_registry.py
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+REGISTRY_DIR = 'outputs/models/registry'
+MANIFEST_FILE = 'manifest.json'
+PIN_FILE = 'PINNED'
+PREPROCESSOR_FILE = 'preprocessor.json'
+
+# 'auto' serves a version's compiled NumPy trees (see tree_compiler) when they exist,
+# 'native' always loads the model's own library
+MODEL_RUNTIME = os.environ.get('MODEL_RUNTIME', 'auto')
+
+
+def training_data_hash(X, y):
+    """
+    Content hash of a training set: column names and order, values and target.
+    :param X: pd.DataFrame, features
+    :param y: array-like, target
+    :return: str, hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(list(map(str, X.columns))).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def model_dir(name, directory=REGISTRY_DIR):
+    return os.path.join(directory, name)
+
+
+def version_dir(name, version, directory=REGISTRY_DIR):
+    return os.path.join(directory, name, str(version))
+
+
+def list_versions(name, directory=REGISTRY_DIR):
+    """
+    :return: sorted list of int, registered versions of a model
+    """
+    path = model_dir(name, directory)
+    if not os.path.isdir(path):
+        return []
+    return sorted(int(entry) for entry in os.listdir(path)
+                  if entry.isdigit() and os.path.exists(os.path.join(path, entry, MANIFEST_FILE)))
+
+
+def pinned_version(name, directory=REGISTRY_DIR):
+    """
+    :return: int, the pinned version of a model, or None
+    """
+    try:
+        with open(os.path.join(model_dir(name, directory), PIN_FILE)) as f:
+            return int(f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def pin_version(name, version, directory=REGISTRY_DIR):
+    """
+    Pin the version of a model that load_registered_model serves by default.
+    :param name: str, model name
+    :param version: int, a registered version
+    """
+    if int(version) not in list_versions(name, directory):
+        raise ValueError(f"{name} has no version {version}")
+    path = os.path.join(model_dir(name, directory), PIN_FILE)
+    with open(f'{path}.tmp', 'w') as f:
+        f.write(f'{int(version)}\n')
+    os.replace(f'{path}.tmp', path)
+
+
+def resolve_version(name, version=None, directory=REGISTRY_DIR):
+    """
+    The version to serve: the one asked for, else the pinned one, else the latest.
+    :return: int, or None when the model is not registered
+    """
+    if version is not None:
+        return int(version)
+    pinned = pinned_version(name, directory)
+    if pinned is not None:
+        return pinned
+    versions = list_versions(name, directory)
+    return versions[-1] if versions else None
+
+
+def manifest_path(name, version=None, directory=REGISTRY_DIR):
+    """
+    Manifest of the version that would be served, or None if the model is not
+    registered. Its content changes whenever a different version is served.
+    """
+    version = resolve_version(name, version, directory)
+    return os.path.join(version_dir(name, version, directory), MANIFEST_FILE) if version is not None else None
+
+
+def read_manifest(name, version=None, directory=REGISTRY_DIR):
+    """
+    :return: dict, the manifest of a registered model version
+    """
+    path = manifest_path(name, version, directory)
+    if path is None or not os.path.exists(path):
+        raise FileNotFoundError(f"{name} version {version} is not registered in {directory}")
+    with open(path) as f:
+        return json.load(f)
+
+
+def register_model(model, name, X_train, y_train, metrics=None, directory=REGISTRY_DIR, pin=False,
+                   preprocessor=None, source_hash=None):
+    """
+    Store a trained model as a new version. XGBoost models are saved in
+    XGBoost's native UBJSON format, which loads without unpickling and across
+    library versions; other models fall back to joblib. A manifest records the
+    feature list and order, a hash of the training data, metrics and the
+    creation time.
+    :param model: trained model with feature_names_in_
+    :param name: str, model name
+    :param X_train: pd.DataFrame, training features
+    :param y_train: array-like, training target
+    :param metrics: dict, evaluation metrics to record
+    :param directory: str, registry directory
+    :param pin: bool, pin the new version
+    :param preprocessor: fitted data_management.Preprocessor, stored with the model
+    :param source_hash: str, sha256 of the outputs/models/{name}.pkl the model was loaded from
+    :return: int, the new version
+    """
+    versions = list_versions(name, directory)
+    version = versions[-1] + 1 if versions else 1
+    path = version_dir(name, version, directory)
+    os.makedirs(path)
+
+    if type(model).__module__.startswith('xgboost'):
+        import xgboost
+
+        artifact, artifact_format = 'model.ubj', 'xgboost-ubj'
+        model.save_model(os.path.join(path, artifact))
+        library_version = xgboost.__version__
+    else:
+        import joblib
+        import sklearn
+
+        artifact, artifact_format = 'model.joblib', 'joblib'
+        joblib.dump(model, os.path.join(path, artifact))
+        library_version = sklearn.__version__
+
+    with open(os.path.join(path, artifact), 'rb') as f:
+        artifact_hash = hashlib.sha256(f.read()).hexdigest()
+    manifest = {
+        'name': name,
+        'version': version,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'model_class': f'{type(model).__module__}.{type(model).__name__}',
+        'format': artifact_format,
+        'artifact': artifact,
+        'artifact_sha256': artifact_hash,
+        'library_version': library_version,
+        'python_version': platform.python_version(),
+        'features': [str(column) for column in X_train.columns],
+        'training_rows': len(X_train),
+        'training_data_hash': training_data_hash(X_train, y_train),
+        'metrics': {key: float(value) for key, value in (metrics or {}).items()},
+    }
+    if preprocessor is not None:
+        preprocessor.save(os.path.join(path, PREPROCESSOR_FILE))
+        manifest['preprocessor'] = PREPROCESSOR_FILE
+    if source_hash is not None:
+        manifest['source_sha256'] = source_hash
+    # The manifest is written last, so a half-written version is never listed
+    with open(os.path.join(path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    if pin:
+        pin_version(name, version, directory)
+    return version
+
+
+def find_version(name, source_hash, directory=REGISTRY_DIR):
+    """
+    :param source_hash: str, sha256 of a saved outputs/models/{name}.pkl
+    :return: int, the latest version registered from that file, or None
+    """
+    for version in reversed(list_versions(name, directory)):
+        if read_manifest(name, version, directory).get('source_sha256') == source_hash:
+            return version
+    return None
+
+
+def register_saved_model(name, pin=False, compile_trees=False, directory=REGISTRY_DIR):
+    """
+    Register outputs/models/{name}.pkl with its saved preprocessor and its
+    metrics on the saved test split, unless that file is already registered.
+    The pinned version and the pkl the performance summary is built from
+    then hold the same model.
+    :param name: str, model name
+    :param pin: bool, pin the version
+    :param compile_trees: bool, also store the version's compiled trees (see tree_compiler), when it has none
+    :param directory: str, registry directory
+    :return: (int version, bool whether it was newly registered)
+    """
+    from src.data_management import load_dataset
+    from src.model_evaluation import evaluate_model, load_model, load_preprocessor
+    from src.performance_summary import model_file_hash
+
+    source_hash = model_file_hash(name)
+    version = find_version(name, source_hash, directory)
+    registered = version is None
+    if registered:
+        model = load_model(name)
+        X_train, y_train = load_dataset('X_train'), load_dataset('y_train')['SalePrice']
+        metrics = evaluate_model(model, load_dataset('X_test'), load_dataset('y_test')['SalePrice'],
+                                 all_metrics=True)
+        version = register_model(model, name, X_train, y_train, metrics, directory,
+                                 preprocessor=load_preprocessor(name), source_hash=source_hash)
+    if compile_trees:
+        from src.tree_compiler import COMPILED_FILE, compile_model
+
+        compiled_path = os.path.join(version_dir(name, version, directory), COMPILED_FILE)
+        if not os.path.exists(compiled_path):
+            try:
+                compile_model(load_registered_model(name, version, directory).native_model).save(compiled_path)
+            except ValueError:
+                # Models tree_compiler cannot flatten are served natively
+                pass
+    if pin:
+        pin_version(name, version, directory)
+    return version, registered
+
+
+def _load_artifact(path, manifest, runtime='native'):
+    from src.tree_compiler import COMPILED_FILE, CompiledEnsemble
+
+    compiled_path = os.path.join(path, COMPILED_FILE)
+    if runtime == 'auto' and os.path.exists(compiled_path):
+        return CompiledEnsemble.load(compiled_path)
+    if manifest['format'] == 'xgboost-ubj':
+        from xgboost import XGBRegressor
+
+        model = XGBRegressor()
+        model.load_model(os.path.join(path, manifest['artifact']))
+        return model
+    import joblib
+
+    return joblib.load(os.path.join(path, manifest['artifact']))
+
+
+class RegisteredModel:
+    """
+    A registered model version that loads its artifact on first use.
+    The manifest is read up front, so the feature order and metrics are
+    available without importing the model's library.
+    """
+
+    def __init__(self, name, version=None, directory=REGISTRY_DIR, runtime=None):
+        self.manifest = read_manifest(name, version, directory)
+        self.name = name
+        self.version = self.manifest['version']
+        self.path = version_dir(name, self.version, directory)
+        self.feature_names_in_ = np.array(self.manifest['features'], dtype=object)
+        self.runtime = runtime or MODEL_RUNTIME
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = _load_artifact(self.path, self.manifest, self.runtime)
+        return self._model
+
+    @property
+    def native_model(self):
+        """
+        The model as saved, loaded with its own library regardless of runtime.
+        """
+        if self.runtime == 'native':
+            return self.model
+        return _load_artifact(self.path, self.manifest, 'native')
+
+    @property
+    def preprocessor(self):
+        """
+        The preprocessor stored with this version, or None.
+        """
+        if 'preprocessor' not in self.manifest:
+            return None
+        from src.data_management import Preprocessor
+
+        return Preprocessor.load(os.path.join(self.path, self.manifest['preprocessor']))
+
+    def predict(self, X):
+        """
+        :param X: pd.DataFrame with the columns in self.feature_names_in_, or an array in that order
+        :return: np.ndarray, predictions
+        """
+        return self.model.predict(X)
+
+
+def load_registered_model(name, version=None, directory=REGISTRY_DIR, runtime=None):
+    """
+    A lazily loaded registered model: the requested version, else the pinned
+    one, else the latest.
+    :param runtime: str, 'auto' or 'native' (default: MODEL_RUNTIME)
+    :return: RegisteredModel
+    """
+    return RegisteredModel(name, version, directory, runtime)
+
+
+def is_registered(name, directory=REGISTRY_DIR):
+    return resolve_version(name, directory=directory) is not None
+
+
+_COLD_START_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import pandas as pd
+mode, name, version, X_path = sys.argv[1:5]
+if mode == 'pickle':
+    import joblib
+    imported = time.perf_counter()
+    model = joblib.load(f'outputs/models/{name}.pkl')
+else:
+    from src.model_registry import load_registered_model
+    imported = time.perf_counter()
+    runtime = 'native' if mode == 'registry' else 'auto'
+    model = load_registered_model(name, None if version == 'None' else int(version), runtime=runtime)
+loaded = time.perf_counter()
+X = pd.read_csv(X_path, nrows=1)[list(model.feature_names_in_)]
+model.predict(X)
+first = time.perf_counter()
+print(json.dumps({'import_seconds': imported - start, 'load_seconds': loaded - imported,
+                  'first_prediction_seconds': first - loaded, 'in_process_seconds': first - start}))
+'''
+
+
+def measure_cold_start(name, version=None, mode='registry', repeat=3,
+                       features_path='outputs/datasets/collection/X_test.csv'):
+    """
+    Time from starting a fresh Python process to its first prediction.
+    :param name: str, model name
+    :param version: int, registry version (default: pinned or latest)
+    :param mode: str, 'pickle' (outputs/models/{name}.pkl via joblib), 'registry' (the native
+        artifact) or 'compiled' (the version's compiled NumPy trees)
+    :param repeat: int, processes started; the median of each timing is reported
+    :param features_path: str, CSV whose first row is predicted
+    :return: dict of median seconds: process, import, load, first_prediction and in_process
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', _COLD_START_SCRIPT, mode, name, str(version), features_path],
+                                capture_output=True, text=True, check=True).stdout
+        timings = json.loads(output.strip().splitlines()[-1])
+        timings['process_seconds'] = time.perf_counter() - start
+        runs.append(timings)
+    return {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Versioned model registry.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    register = commands.add_parser('register', help='register outputs/models/NAME.pkl as a new version')
+    register.add_argument('name')
+    register.add_argument('--pin', action='store_true', help='pin the new version')
+    listing = commands.add_parser('list', help='list the registered versions of a model')
+    listing.add_argument('name')
+    pin = commands.add_parser('pin', help='pin the version served by default')
+    pin.add_argument('name')
+    pin.add_argument('version', type=int)
+    cold_start = commands.add_parser('coldstart', help='time a fresh process to its first prediction')
+    cold_start.add_argument('name')
+    cold_start.add_argument('--version', type=int)
+    cold_start.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == 'register':
+        version, registered = register_saved_model(args.name, pin=args.pin)
+        action = 'Registered' if registered else 'Already registered as'
+        print(f"{action} {args.name} version {version} in {version_dir(args.name, version)}")
+    elif args.command == 'list':
+        pinned = pinned_version(args.name)
+        for version in list_versions(args.name):
+            manifest = read_manifest(args.name, version)
+            marker = ' (pinned)' if version == pinned else ''
+            print(f"{version}{marker}  {manifest['created']}  {manifest['format']}  "
+                  f"r2={manifest['metrics'].get('r2', float('nan')):.3f}  data={manifest['training_data_hash'][:12]}")
+    elif args.command == 'pin':
+        pin_version(args.name, args.version)
+        print(f"Pinned {args.name} version {args.version}")
+    elif args.command == 'coldstart':
+        modes = ['pickle', 'registry']
+        if os.path.exists(os.path.join(version_dir(args.name, resolve_version(args.name, args.version)), 'trees.npz')):
+            modes.append('compiled')
+        for mode in modes:
+            timings = measure_cold_start(args.name, args.version, mode, args.repeat)
+            print(f"{mode:<9} process {timings['process_seconds']:.3f}s: import {timings['import_seconds']:.3f}s, "
+                  f"load {timings['load_seconds']:.3f}s, first prediction {timings['first_prediction_seconds']:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+# src/online_stats.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.data_management import DATASET_DIR, dataset_path
+
+DESCRIBE_PERCENTILES = [0.25, 0.5, 0.75]
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch over (value, weight) centroids.
+    Values are counted exactly until there are more than max_centroids
+    distinct values; after that, neighbouring values are merged into
+    centroids sized by a t-digest style scale function, which keeps the
+    tails more precise than the middle.
+    """
+
+    def __init__(self, max_centroids=2048):
+        self.max_centroids = max_centroids
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.exact = True
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        """
+        Add a batch of values; NaNs are ignored.
+        :param values: array-like of floats
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        unique, counts = np.unique(values, return_counts=True)
+        self._add(unique, counts.astype(np.float64))
+
+    def merge(self, other):
+        """
+        Add all values summarised by another sketch.
+        :param other: QuantileSketch
+        """
+        self.exact = self.exact and other.exact
+        self._add(other.means, other.weights)
+
+    def _add(self, means, weights):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        if self.exact:
+            # Combine equal values so exact counts stay compact
+            means, inverse = np.unique(means, return_inverse=True)
+            weights = np.bincount(inverse, weights=weights)
+        if len(means) > self.max_centroids:
+            means, weights = self._compress(means, weights)
+            self.exact = False
+        self.means, self.weights = means, weights
+
+    def _compress(self, means, weights):
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        # k1 scale function: about max_centroids / 2 buckets, narrow in the tails
+        k = (self.max_centroids / 2) * (np.arcsin(2 * q - 1) / np.pi + 0.5)
+        bucket = np.floor(k).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, np.diff(bucket) != 0])
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        return merged_means, merged_weights
+
+    def quantile(self, q):
+        """
+        Estimate a quantile with pandas' default linear interpolation.
+        Exact while the sketch has not been compressed.
+        :param q: float in [0, 1]
+        :return: float
+        """
+        total = self.count
+        if total == 0:
+            return np.nan
+        rank = q * (total - 1)
+        cumulative = np.cumsum(self.weights)
+        if self.exact:
+            lower = self.means[np.searchsorted(cumulative, np.floor(rank), side='right')]
+            upper = self.means[np.searchsorted(cumulative, np.ceil(rank), side='right')]
+            return float(lower + (upper - lower) * (rank - np.floor(rank)))
+        # Each centroid sits at the middle rank of the values it absorbed
+        centers = cumulative - self.weights + (self.weights - 1) / 2
+        return float(np.interp(rank, centers, self.means))
+
+
+class OnlineStats:
+    """
+    Streaming summary statistics and correlations for numeric columns.
+    Keeps pairwise counts, means, second moments and co-moments (merged
+    batch by batch with Chan et al.'s update of Welford's algorithm), so
+    correlations match pandas' pairwise-complete DataFrame.corr(). Also
+    keeps per-column min/max and quantile sketches for describe().
+    """
+
+    def __init__(self, columns, max_centroids=2048):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.shift = None
+        self.n = np.zeros((p, p))
+        self.mean = np.zeros((p, p))
+        self.m2 = np.zeros((p, p))
+        self.comoment = np.zeros((p, p))
+        self.min = np.full(p, np.nan)
+        self.max = np.full(p, np.nan)
+        self.sketches = [QuantileSketch(max_centroids) for _ in self.columns]
+
+    @classmethod
+    def from_dataframe(cls, df, max_centroids=2048):
+        """
+        Build statistics over the numeric columns of a DataFrame.
+        :param df: pd.DataFrame
+        :return: OnlineStats
+        """
+        stats = cls(df.select_dtypes(include='number').columns, max_centroids)
+        stats.update(df)
+        return stats
+
+    def update(self, df):
+        """
+        Fold a batch of rows into the statistics in O(rows * columns²).
+        :param df: pd.DataFrame containing at least self.columns
+        """
+        X = df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        if len(X) == 0:
+            return
+        present = ~np.isnan(X)
+        mask = present.astype(np.float64)
+        if self.shift is None:
+            # Centre on the first batch's means to avoid cancellation in the sums
+            counts = mask.sum(axis=0)
+            self.shift = np.where(counts > 0, np.where(present, X, 0.0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+        Xz = np.where(present, X - self.shift, 0.0)
+
+        n_b = mask.T @ mask
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.where(n_b > 0, (Xz.T @ mask) / n_b, 0.0)
+        m2_b = (Xz ** 2).T @ mask - n_b * mean_b ** 2
+        comoment_b = Xz.T @ Xz - n_b * mean_b * mean_b.T
+
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, self.n * n_b / n, 0.0)
+            self.mean = self.mean + delta * np.where(n > 0, n_b / n, 0.0)
+        self.m2 = self.m2 + m2_b + delta ** 2 * weight
+        self.comoment = self.comoment + comoment_b + delta * delta.T * weight
+        self.n = n
+
+        self.min = np.fmin(self.min, np.where(present, X, np.inf).min(axis=0))
+        self.max = np.fmax(self.max, np.where(present, X, -np.inf).max(axis=0))
+        self.min[np.isinf(self.min)] = np.nan
+        self.max[np.isinf(self.max)] = np.nan
+        for i, sketch in enumerate(self.sketches):
+            sketch.update(X[:, i])
+
+    def correlation(self, columns=None):
+        """
+        Pearson correlation matrix, as DataFrame.corr() would return.
+        :param columns: list of str, subset of columns (default: all)
+        :return: pd.DataFrame
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        corr[(self.n < 2) | ~np.isfinite(corr)] = np.nan
+        diagonal = np.diag_indices_from(corr)
+        corr[diagonal] = np.where(np.diag(self.m2) > 0, 1.0, np.nan)
+        corr = np.clip(corr, -1.0, 1.0)
+        result = pd.DataFrame(corr, index=self.columns, columns=self.columns)
+        if columns is not None:
+            result = result.loc[columns, columns]
+        return result
+
+    def describe(self):
+        """
+        Summary statistics laid out like DataFrame.describe().
+        :return: pd.DataFrame
+        """
+        count = np.diag(self.n)
+        mean = np.diag(self.mean) + (self.shift if self.shift is not None else 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(count > 1, np.sqrt(np.diag(self.m2) / (count - 1)), np.nan)
+        rows = {'count': count, 'mean': np.where(count > 0, mean, np.nan), 'std': std, 'min': self.min}
+        for q in DESCRIBE_PERCENTILES:
+            rows[f'{q:.0%}'] = [sketch.quantile(q) for sketch in self.sketches]
+        rows['max'] = self.max
+        return pd.DataFrame(rows, index=self.columns).T
+
+    def save(self, path, **metadata):
+        """
+        Persist the state to a .npz file.
+        :param path: str, destination file
+        :param metadata: extra scalar values to store, e.g. source file signature
+        """
+        offsets = np.cumsum([0] + [len(sketch.means) for sketch in self.sketches])
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(
+            tmp_path,
+            columns=np.array(self.columns),
+            shift=self.shift if self.shift is not None else np.zeros(len(self.columns)),
+            has_shift=np.array(self.shift is not None),
+            n=self.n, mean=self.mean, m2=self.m2, comoment=self.comoment,
+            min=self.min, max=self.max,
+            sketch_means=np.concatenate([sketch.means for sketch in self.sketches]),
+            sketch_weights=np.concatenate([sketch.weights for sketch in self.sketches]),
+            sketch_offsets=offsets,
+            sketch_exact=np.array([sketch.exact for sketch in self.sketches]),
+            max_centroids=np.array(self.sketches[0].max_centroids if self.sketches else 2048),
+            **{f'meta_{key}': np.array(value) for key, value in metadata.items()},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load state saved with save().
+        :param path: str, .npz file
+        :return: (OnlineStats, dict of metadata)
+        """
+        with np.load(path) as data:
+            stats = cls(data['columns'].tolist(), int(data['max_centroids']))
+            stats.shift = data['shift'] if bool(data['has_shift']) else None
+            stats.n, stats.mean, stats.m2, stats.comoment = data['n'], data['mean'], data['m2'], data['comoment']
+            stats.min, stats.max = data['min'], data['max']
+            offsets = data['sketch_offsets']
+            for i, sketch in enumerate(stats.sketches):
+                sketch.means = data['sketch_means'][offsets[i]:offsets[i + 1]]
+                sketch.weights = data['sketch_weights'][offsets[i]:offsets[i + 1]]
+                sketch.exact = bool(data['sketch_exact'][i])
+            metadata = {key[len('meta_'):]: data[key].item() for key in data.files if key.startswith('meta_')}
+        return stats, metadata
+
+
+def stats_path(name, directory=DATASET_DIR):
+    return os.path.join(directory, f'{name}.stats.npz')
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+
+def build_dataset_stats(name, directory=DATASET_DIR, chunksize=100_000):
+    """
+    Scan {name}.csv once in chunks and persist its statistics.
+    :param name: str, dataset name
+    :param directory: str, dataset directory
+    :param chunksize: int, rows per chunk
+    :return: OnlineStats
+    :raises ValueError: when the file has no rows, so which columns are numeric is unknown
+    """
+    csv_path = dataset_path(name, directory, 'csv')
+    stats = None
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        if stats is None:
+            if chunk.empty:
+                break
+            stats = OnlineStats(chunk.select_dtypes(include='number').columns)
+        stats.update(chunk)
+    if stats is None:
+        raise ValueError(f"{csv_path} has no rows to compute statistics from.")
+    stats.save(stats_path(name, directory), **_source_signature(csv_path))
+    return stats
+
+
+def append_to_dataset(name, new_rows, directory=DATASET_DIR):
+    """
+    Append rows to {name}.csv and update its persisted statistics with only
+    the new rows. Statistics are built from the full file first if missing
+    or out of date.
+    :param name: str, dataset name
+    :param new_rows: pd.DataFrame, rows with the dataset's columns
+    :param directory: str, dataset directory
+    :return: OnlineStats
+    """
+    csv_path = dataset_path(name, directory, 'csv')
+    stats = load_dataset_stats(name, directory)
+    if stats is None:
+        if pd.read_csv(csv_path, nrows=1).empty:
+            # Only a header, so the new rows tell which columns are numeric
+            stats = OnlineStats(new_rows.select_dtypes(include='number').columns)
+        else:
+            stats = build_dataset_stats(name, directory)
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    new_rows[columns].to_csv(csv_path, mode='a', header=False, index=False)
+    stats.update(new_rows)
+    stats.save(stats_path(name, directory), **_source_signature(csv_path))
+    return stats
+
+
+def load_dataset_stats(name, directory=DATASET_DIR):
+    """
+    Load a dataset's persisted statistics if they describe the current CSV.
+    :param name: str, dataset name
+    :param directory: str, dataset directory
+    :return: OnlineStats, or None when missing or stale
+    """
+    path = stats_path(name, directory)
+    csv_path = dataset_path(name, directory, 'csv')
+    if not os.path.exists(path) or not os.path.exists(csv_path):
+        return None
+    stats, metadata = OnlineStats.load(path)
+    if metadata != _source_signature(csv_path):
+        return None
+    return stats
+
+
+if __name__ == '__main__':
+    import sys
+
+    for dataset_name in sys.argv[1:] or ['HousePricing', 'HousePricing_cleaned']:
+        build_dataset_stats(dataset_name)
+        print(f"Wrote {stats_path(dataset_name)}")
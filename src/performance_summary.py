@@ -0,0 +1,134 @@
+# src/performance_summary.py
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.model_evaluation import load_model, regression_metrics
+
+METRICS = ['r2', 'mse', 'mae', 'rmse', 'mape']
+
+
+# path -> ((mtime_ns, size), digest), so an unchanged model file is not read again
+_hashes = {}
+
+
+def model_file_hash(model_name):
+    """
+    Hash a saved model file, identifying the model version. The file is
+    only rehashed when its mtime or size changes.
+    :param model_name: str, name of the model file
+    :return: str, sha256 hex digest
+    """
+    path = f'outputs/models/{model_name}.pkl'
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _hashes.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            digest.update(block)
+    _hashes[path] = (signature, digest.hexdigest())
+    return _hashes[path][1]
+
+
+def summary_path(model_name):
+    return f'outputs/models/{model_name}_performance.npz'
+
+
+def summarize_predictions(y_true, y_pred, bins=40):
+    """
+    Reduce actual and predicted values to metrics and plot-ready aggregates
+    whose size depends only on the number of bins.
+    :param y_true: array-like, actual values
+    :param y_pred: array-like, predicted values
+    :param bins: int, bins per axis for the histograms
+    :return: dict of numpy arrays
+    """
+    y_true = np.asarray(y_true, dtype=np.float64).ravel()
+    y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+    residuals = y_pred - y_true
+    metrics = regression_metrics(y_true, y_pred)
+
+    # Shared range so the density plot is square and the diagonal is meaningful
+    low = min(y_true.min(), y_pred.min())
+    high = max(y_true.max(), y_pred.max())
+    density, edges, _ = np.histogram2d(y_true, y_pred, bins=bins, range=[[low, high], [low, high]])
+    residual_counts, residual_edges = np.histogram(residuals, bins=bins)
+
+    # Error per decile of the actual sale price
+    decile_edges = np.quantile(y_true, np.linspace(0, 1, 11))
+    decile = np.clip(np.searchsorted(decile_edges, y_true, side='right') - 1, 0, 9)
+    counts = np.bincount(decile, minlength=10)
+    safe_counts = np.maximum(counts, 1)
+    decile_mae = np.bincount(decile, weights=np.abs(residuals), minlength=10) / safe_counts
+    decile_mape = np.bincount(decile, weights=np.abs(residuals / y_true), minlength=10) / safe_counts
+    decile_bias = np.bincount(decile, weights=residuals, minlength=10) / safe_counts
+
+    return {
+        'metrics': np.array([metrics[name] for name in METRICS]),
+        'n': np.array(len(y_true)),
+        'density': density.astype(np.int32),
+        'density_edges': edges,
+        'residual_counts': residual_counts.astype(np.int32),
+        'residual_edges': residual_edges,
+        'decile_edges': decile_edges,
+        'decile_counts': counts.astype(np.int32),
+        'decile_mae': decile_mae,
+        'decile_mape': decile_mape,
+        'decile_bias': decile_bias,
+    }
+
+
+def build_performance_summary(model_name='xgb_model', bins=40):
+    """
+    Evaluate a saved model on the saved train/test split and store the
+    compact summary next to the model as {model_name}_performance.npz.
+    :param model_name: str, name of the model file
+    :param bins: int, bins per axis for the histograms
+    :return: str, path of the written artifact
+    """
+    model = load_model(model_name)
+    arrays = {'model_hash': np.array(model_file_hash(model_name))}
+    for split in ('train', 'test'):
+        X = pd.read_csv(f'outputs/datasets/collection/X_{split}.csv')
+        y = pd.read_csv(f'outputs/datasets/collection/y_{split}.csv')['SalePrice']
+        summary = summarize_predictions(y, model.predict(X), bins)
+        arrays.update({f'{split}_{key}': value for key, value in summary.items()})
+
+    path = summary_path(model_name)
+    np.savez_compressed(path, **arrays)
+    return path
+
+
+def load_performance_summary(model_name='xgb_model'):
+    """
+    Load a model's performance summary, as saved by build_performance_summary.
+    :param model_name: str, name of the model file
+    :return: dict with 'train' and 'test' summaries, or None when the artifact
+        is missing or was built for a different version of the model
+    """
+    path = summary_path(model_name)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+    if str(arrays.pop('model_hash')) != model_file_hash(model_name):
+        return None
+
+    result = {}
+    for split in ('train', 'test'):
+        prefix = f'{split}_'
+        summary = {key[len(prefix):]: value for key, value in arrays.items() if key.startswith(prefix)}
+        summary['metrics'] = dict(zip(METRICS, summary['metrics'].tolist()))
+        summary['n'] = int(summary['n'])
+        result[split] = summary
+    return result
+
+
+if __name__ == '__main__':
+    print(f"Wrote {build_performance_summary()}")
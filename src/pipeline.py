@@ -0,0 +1,397 @@
+# src/pipeline.py
+
+import argparse
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from importlib import metadata, util
+
+from src.data_management import DATASET_DIR, dataset_path
+from src.model_evaluation import preprocessor_path
+from src.model_registry import PIN_FILE, model_dir
+from src.performance_summary import summary_path
+
+RAW_DIR = 'inputs/datasets/raw/house-price-20211124T154130Z-001/house-price'
+MODEL_DIR = 'outputs/models'
+PIPELINE_DIR = 'outputs/pipeline'
+STATE_FILE = 'state.json'
+# Outputs of every stage run, by stage key, so returning to earlier inputs restores rather than recomputes
+STORE_DIR = 'store'
+# Stored runs kept per stage; older ones are pruned after every run
+STORE_HISTORY = 5
+
+# Saved model name -> train function in src.model_evaluation, as trained in the model building notebook
+PIPELINE_MODELS = {
+    'lr_model': 'train_linear_regression',
+    'rf_model': 'train_random_forest',
+    'xgb_model': 'train_xgboost',
+}
+# The model the app serves: registered, pinned and summarized after every retrain
+SERVED_MODEL = 'xgb_model'
+
+
+def file_digest(path):
+    """
+    Content hash of a file.
+    :param path: str, file path
+    :return: str, hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _module_digest(dependency):
+    # 'package.module' hashes the module's file, 'package.module:name' only that function's or class's source
+    module_name, _, attribute = dependency.partition(':')
+    if not attribute:
+        return file_digest(util.find_spec(module_name).origin)
+    source = inspect.getsource(getattr(importlib.import_module(module_name), attribute))
+    return hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+
+
+def _package_version(package):
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+class Stage:
+    """
+    One step of the pipeline: a function from input files to output files.
+    A stage's key hashes its input files' contents, its own source, the
+    source of the modules it builds on and its parameters, so a stage only
+    reruns when one of them changes. A rerun that writes byte-identical
+    outputs leaves every downstream key unchanged, so nothing below it reruns.
+    """
+
+    def __init__(self, name, function, inputs, outputs, modules=(), params=None):
+        """
+        :param name: str, stage name
+        :param function: callable(inputs, outputs) writing every output path
+        :param inputs: list of str, files read
+        :param outputs: list of str, files written
+        :param modules: list of str, code the stage depends on: modules, e.g. 'src.data_management', or
+            single functions or classes, e.g. 'src.model_evaluation:save_model'
+        :param params: dict of JSON-serializable parameters that change the outputs
+        """
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.modules = list(modules)
+        self.params = params or {}
+
+    def key(self):
+        """
+        :return: str, hex digest of everything the outputs depend on
+        """
+        content = {
+            'name': self.name,
+            'inputs': {path: file_digest(path) for path in self.inputs},
+            'code': inspect.getsource(self.function),
+            'modules': {module: _module_digest(module) for module in self.modules},
+            'params': self.params,
+        }
+        return hashlib.blake2b(json.dumps(content, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def _write_csv(df, path):
+    # Write to a private file and rename, so a failed stage never leaves a partial output
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _collect(inputs, outputs):
+    from src.data_management import load_data
+
+    _write_csv(load_data(inputs[0]), outputs[0])
+
+
+def _clean(inputs, outputs):
+    from src.data_management import clean_data, load_data
+
+    _write_csv(clean_data(load_data(inputs[0])), outputs[0])
+
+
+def _split(inputs, outputs):
+    from src.data_management import get_training_and_test_data, load_data
+
+    for split, path in zip(get_training_and_test_data(load_data(inputs[0])), outputs):
+        _write_csv(split, path)
+
+
+def _train(inputs, outputs):
+    import pandas as pd
+
+    from src import model_evaluation
+    from src.data_management import Preprocessor, load_data
+
+    model_name = os.path.splitext(os.path.basename(outputs[0]))[0]
+    train_function = getattr(model_evaluation, PIPELINE_MODELS[model_name])
+    model = train_function(pd.read_csv(inputs[0]), pd.read_csv(inputs[1])['SalePrice'])
+    # Fitted on the raw file, as the cleaned dataset the splits come from was cleaned
+    model_evaluation.save_model(model, model_name, Preprocessor().fit(load_data(inputs[2])))
+
+
+def _register(inputs, outputs):
+    from src.model_registry import register_saved_model
+
+    # The registry's PINNED file is the output, so restoring an earlier run pins its version again
+    name = os.path.basename(os.path.dirname(outputs[0]))
+    register_saved_model(name, pin=True, compile_trees=True)
+
+
+def _summarize(inputs, outputs):
+    from src.performance_summary import build_performance_summary
+
+    build_performance_summary(os.path.splitext(os.path.basename(inputs[0]))[0])
+
+
+def _predict_inherited(inputs, outputs):
+    import joblib
+    import pandas as pd
+
+    inherited_houses = pd.read_csv(inputs[0])
+    features = inherited_houses[pd.read_csv(inputs[1], nrows=0).columns]
+    models = {os.path.splitext(os.path.basename(path))[0]: joblib.load(path) for path in inputs[2:]}
+    # Columns as the model building notebook wrote them
+    inherited_houses['Predicted_SalePrice'] = models['lr_model'].predict(features)
+    inherited_houses['Predicted_SalePrice_RF'] = models['rf_model'].predict(features)
+    inherited_houses['Predicted_SalePrice_XGB'] = models['xgb_model'].predict(features)
+    _write_csv(inherited_houses, outputs[0])
+
+
+def build_stages(raw_dir=RAW_DIR):
+    """
+    The chain from the raw Kaggle CSVs to the saved models and the inherited
+    houses' predictions, as the notebooks build it. The served model is also
+    registered and pinned, and its performance summary rebuilt, so the app
+    never serves one version while evaluating another.
+    :param raw_dir: str, directory of the downloaded raw CSVs
+    :return: list of Stage
+    """
+    def collected(name):
+        return dataset_path(name, DATASET_DIR, 'csv')
+
+    splits = [collected(name) for name in ('X_train', 'X_test', 'y_train', 'y_test')]
+    model_paths = {name: os.path.join(MODEL_DIR, f'{name}.pkl') for name in PIPELINE_MODELS}
+    training_versions = {package: _package_version(package) for package in ('scikit-learn', 'xgboost')}
+
+    stages = [
+        Stage('collect_house_pricing', _collect, [os.path.join(raw_dir, 'house_prices_records.csv')],
+              [collected('HousePricing')], ['src.data_management']),
+        Stage('collect_inherited_houses', _collect, [os.path.join(raw_dir, 'inherited_houses.csv')],
+              [collected('InheritedHouses')], ['src.data_management']),
+        Stage('clean_house_pricing', _clean, [collected('HousePricing')],
+              [collected('HousePricing_cleaned')], ['src.data_management']),
+        Stage('clean_inherited_houses', _clean, [collected('InheritedHouses')],
+              [collected('inherited_houses_cleaned')], ['src.data_management']),
+        Stage('split', _split, [collected('HousePricing_cleaned')], splits,
+              ['src.data_management'], {'scikit-learn': training_versions['scikit-learn']}),
+    ]
+    for name, path in model_paths.items():
+        stages.append(Stage(f'train_{name}', _train,
+                            [collected('X_train'), collected('y_train'), collected('HousePricing')],
+                            [path, preprocessor_path(name)],
+                            [f'src.model_evaluation:{PIPELINE_MODELS[name]}', 'src.model_evaluation:save_model',
+                             'src.model_evaluation:preprocessor_path', 'src.data_management'],
+                            {'train_function': PIPELINE_MODELS[name], **training_versions}))
+    served_inputs = [model_paths[SERVED_MODEL], preprocessor_path(SERVED_MODEL), *splits]
+    stages.append(Stage(f'register_{SERVED_MODEL}', _register, served_inputs,
+                        [os.path.join(model_dir(SERVED_MODEL), PIN_FILE)],
+                        ['src.model_registry', 'src.tree_compiler'], training_versions))
+    stages.append(Stage(f'summarize_{SERVED_MODEL}', _summarize, served_inputs, [summary_path(SERVED_MODEL)],
+                        ['src.performance_summary'], training_versions))
+    stages.append(Stage('predict_inherited_houses', _predict_inherited,
+                        [collected('inherited_houses_cleaned'), collected('X_train'), *model_paths.values()],
+                        [collected('inherited_houses_predictions')], params=training_versions))
+    return stages
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order, skipping those whose key and outputs
+    match the last run, restoring outputs from the store when the key has
+    been built before, and running independent stages concurrently.
+    """
+
+    def __init__(self, stages, directory=PIPELINE_DIR):
+        self.stages = {stage.name: stage for stage in stages}
+        self.directory = directory
+        producers = {path: stage.name for stage in stages for path in stage.outputs}
+        self.dependencies = {stage.name: sorted({producers[path] for path in stage.inputs if path in producers})
+                             for stage in stages}
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+
+    @property
+    def state_path(self):
+        return os.path.join(self.directory, STATE_FILE)
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def _save_state(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self.state_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def plan(self, targets=None):
+        """
+        :param targets: list of stage names (default: every stage)
+        :return: list of stage names needed for the targets, in dependency order
+        """
+        order, seen = [], set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            for dependency in self.dependencies[name]:
+                visit(dependency)
+            order.append(name)
+
+        for name in targets or self.stages:
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name}; stages are {', '.join(self.stages)}")
+            visit(name)
+        return order
+
+    def _outputs_match(self, stage, recorded):
+        return all(os.path.exists(path) and file_digest(path) == recorded['outputs'].get(path)
+                   for path in stage.outputs)
+
+    def _stored_path(self, key, path):
+        return os.path.join(self.directory, STORE_DIR, key, os.path.basename(path))
+
+    def _execute(self, name, force):
+        stage = self.stages[name]
+        start = time.perf_counter()
+        key = stage.key()
+        recorded = self.state.get(name)
+        if not force and recorded is not None and recorded['key'] == key and self._outputs_match(stage, recorded):
+            status = 'fresh'
+        elif not force and all(os.path.exists(self._stored_path(key, path)) for path in stage.outputs):
+            for path in stage.outputs:
+                tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                shutil.copyfile(self._stored_path(key, path), tmp_path)
+                os.replace(tmp_path, path)
+            status = 'restored'
+        else:
+            for path in stage.outputs:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            stage.function(stage.inputs, stage.outputs)
+            os.makedirs(os.path.join(self.directory, STORE_DIR, key), exist_ok=True)
+            for path in stage.outputs:
+                shutil.copyfile(path, self._stored_path(key, path))
+            status = 'ran'
+        if status != 'fresh':
+            with self._lock:
+                history = [key] + [old for old in self.state.get(name, {}).get('history', []) if old != key]
+                self.state[name] = {'key': key, 'outputs': {path: file_digest(path) for path in stage.outputs},
+                                    'history': history[:STORE_HISTORY]}
+                self._save_state()
+        return {'stage': name, 'status': status, 'seconds': time.perf_counter() - start}
+
+    def run(self, targets=None, n_jobs=None, force=False, verbose=True):
+        """
+        Bring the targets up to date. A stage starts as soon as every stage
+        it reads from has finished.
+        :param targets: list of stage names (default: every stage)
+        :param n_jobs: int, stages run at once (default: all cores)
+        :param force: bool, rerun every planned stage
+        :param verbose: bool, print each stage as it finishes
+        :return: list of dicts with stage, status ('fresh', 'restored' or 'ran') and seconds
+        """
+        pending = self.plan(targets)
+        done, results, running = set(), [], {}
+        with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count() or 1) as pool:
+            while pending or running:
+                for name in [name for name in pending if set(self.dependencies[name]) <= done]:
+                    pending.remove(name)
+                    running[pool.submit(self._execute, name, force)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    done.add(running.pop(future))
+                    results.append(result)
+                    if verbose:
+                        print(f"{result['stage']:<26} {result['status']:<9} {result['seconds']:.2f}s")
+        self.prune()
+        return results
+
+    def prune(self):
+        """
+        Delete stored runs no stage still references: each stage keeps its
+        last STORE_HISTORY keys, and stages no longer defined keep none.
+        :return: int, stored runs deleted
+        """
+        store = os.path.join(self.directory, STORE_DIR)
+        if not os.path.isdir(store):
+            return 0
+        referenced = {key for name, recorded in self.state.items() if name in self.stages
+                      for key in recorded.get('history', [recorded['key']])}
+        pruned = 0
+        for key in os.listdir(store):
+            if key not in referenced:
+                shutil.rmtree(os.path.join(store, key), ignore_errors=True)
+                pruned += 1
+        return pruned
+
+    def status(self, targets=None):
+        """
+        Which planned stages would rerun, without running anything.
+        :param targets: list of stage names (default: every stage)
+        :return: dict of stage name -> 'fresh', 'stale' or 'stale upstream'
+        """
+        statuses = {}
+        for name in self.plan(targets):
+            stage, recorded = self.stages[name], self.state.get(name)
+            if any(statuses[dependency] != 'fresh' for dependency in self.dependencies[name]):
+                statuses[name] = 'stale upstream'
+            elif recorded is not None and all(os.path.exists(path) for path in stage.inputs) \
+                    and recorded['key'] == stage.key() and self._outputs_match(stage, recorded):
+                statuses[name] = 'fresh'
+            else:
+                statuses[name] = 'stale'
+        return statuses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild datasets, models and predictions, rerunning only stale stages.')
+    parser.add_argument('targets', nargs='*', help='stages to bring up to date (default: all)')
+    parser.add_argument('--jobs', type=int, help='stages run at once (default: all cores)')
+    parser.add_argument('--force', action='store_true', help='rerun every stage')
+    parser.add_argument('--status', action='store_true', help='show which stages are stale and exit')
+    parser.add_argument('--raw-dir', default=RAW_DIR, help='directory of the raw Kaggle CSVs')
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline(build_stages(args.raw_dir))
+    if args.status:
+        for name, status in pipeline.status(args.targets).items():
+            print(f"{name:<26} {status}")
+        return
+    start = time.perf_counter()
+    results = pipeline.run(args.targets, n_jobs=args.jobs, force=args.force)
+    ran = sum(result['status'] == 'ran' for result in results)
+    print(f"{ran} of {len(results)} stages ran in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+# src/prediction.py
+
+import os
+import threading
+import time
+
+import pandas as pd
+
+from src.model_evaluation import load_model, load_preprocessor
+from src.model_registry import RegisteredModel, is_registered, load_registered_model, resolve_version
+
+# 'local' predicts in-process and falls back to the API, 'remote' always uses the API.
+# The API is the Flask app at API_BASE_URL (see api_client), kept as a fallback for deployments without xgboost.
+PREDICTION_BACKEND = os.environ.get('PREDICTION_BACKEND', 'local')
+
+DEFAULT_MODEL_NAME = 'xgb_model'
+
+
+class PredictionEngine:
+    """
+    In-process inference over a saved model.
+    The model's pinned (or latest) registry version is used when it has one,
+    and outputs/models/{model_name}.pkl otherwise.
+    Inputs are aligned to the model's training feature order, with missing
+    features filled with 0 as the Flask API does. When the model was saved
+    with a preprocessor, records are turned into feature vectors by its
+    fast path, imputing missing values with the training set's statistics.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME):
+        self.model_name = model_name
+        if is_registered(model_name):
+            self.model = load_registered_model(model_name)
+            self.version = self.model.version
+            self.model_version = f'{model_name}@{self.version}'
+        else:
+            from src.performance_summary import model_file_hash
+
+            self.model = load_model(model_name)
+            self.version = None
+            self.model_version = f'{model_name}.pkl@{model_file_hash(model_name)[:16]}'
+        self.feature_names = list(self.model.feature_names_in_)
+        preprocessor = self.model.preprocessor if self.version is not None else load_preprocessor(model_name)
+        # A preprocessor fitted for another feature order cannot feed this model
+        if preprocessor is not None and preprocessor.feature_names != self.feature_names:
+            preprocessor = None
+        self.preprocessor = preprocessor
+
+    def ensure_loaded(self):
+        """
+        Load a lazily loaded registry model now, so a missing library
+        surfaces here rather than on the first prediction.
+        """
+        if isinstance(self.model, RegisteredModel):
+            self.model.model
+        return self
+
+    def _align(self, records):
+        # Each record gets 0 for its own absent features, so a row does not depend on the rows batched with it
+        return pd.DataFrame([{name: record.get(name, 0) for name in self.feature_names} for record in records],
+                            columns=self.feature_names)
+
+    def _predict_array(self, X):
+        model = self.model.model if isinstance(self.model, RegisteredModel) else self.model
+        # scikit-learn warns when a model fitted on named columns gets an array
+        if type(model).__module__.startswith('sklearn'):
+            X = pd.DataFrame(X, columns=self.feature_names)
+        return model.predict(X)
+
+    def predict_one(self, record):
+        """
+        Predict the sale price of a single house.
+        :param record: dict, house attributes
+        :return: float, predicted sale price
+        """
+        if self.preprocessor is not None:
+            return float(self._predict_array(self.preprocessor.transform_record(record)[None, :])[0])
+        return float(self.model.predict(self._align([record]))[0])
+
+    def predict_many(self, records):
+        """
+        Predict the sale prices of several houses in one call.
+        :param records: list of dicts or pd.DataFrame, house attributes
+        :return: list of floats, predicted sale prices
+        """
+        if len(records) == 0:
+            return []
+        if isinstance(records, pd.DataFrame):
+            features = records.reindex(columns=self.feature_names, fill_value=0)
+        elif self.preprocessor is not None:
+            return [float(p) for p in self._predict_array(self.preprocessor.transform_records(records))]
+        else:
+            features = self._align(records)
+        return [float(p) for p in self.model.predict(features)]
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _model_signature(model_name):
+    """
+    What identifies the model a new engine would load: the registry version
+    served (pinned, else latest), else the saved file's mtime and size.
+    """
+    version = resolve_version(model_name)
+    if version is not None:
+        return 'registry', version
+    try:
+        stat = os.stat(f'outputs/models/{model_name}.pkl')
+    except FileNotFoundError:
+        return None
+    return 'pkl', stat.st_mtime_ns, stat.st_size
+
+
+def get_engine(model_name=DEFAULT_MODEL_NAME):
+    """
+    Return the process-wide engine for a model, loading it on first use.
+    The engine is shared by every Streamlit session in the process, and is
+    rebuilt when another registry version is pinned or the model file changes.
+    :param model_name: str, name of the model file
+    :return: PredictionEngine
+    """
+    signature = _model_signature(model_name)
+    cached = _engines.get(model_name)
+    if cached is None or cached[0] != signature:
+        with _engines_lock:
+            cached = _engines.get(model_name)
+            if cached is None or cached[0] != signature:
+                cached = (signature, PredictionEngine(model_name))
+                _engines[model_name] = cached
+    return cached[1]
+
+
+# A failed local load is retried once the model changes or after this many seconds
+LOCAL_RETRY_SECONDS = float(os.environ.get('LOCAL_RETRY_SECONDS', 60))
+
+# (model signature, time.monotonic(), exception) of the last failed local load, or None
+_local_error = None
+
+
+def _local_engine():
+    global _local_error
+    if PREDICTION_BACKEND != 'local':
+        return None
+    failure = _local_error
+    if failure is not None and (time.monotonic() - failure[1] < LOCAL_RETRY_SECONDS
+                                and _model_signature(DEFAULT_MODEL_NAME) == failure[0]):
+        return None
+    try:
+        engine = get_engine().ensure_loaded()
+    except (ImportError, OSError) as e:
+        # xgboost is not installed, or the model file is missing (e.g. while the pipeline rewrites it)
+        _local_error = (_model_signature(DEFAULT_MODEL_NAME), time.monotonic(), e)
+        return None
+    _local_error = None
+    return engine
+
+
+def _post(payload, key):
+    from src.api_client import api_url, get_client
+
+    # PREDICTION_API_URL overrides the endpoint alone
+    return get_client().post_json(os.environ.get('PREDICTION_API_URL') or api_url('/predict'), payload)[key]
+
+
+def predict_price(record):
+    """
+    Predict the sale price of a single house, in-process when possible.
+    :param record: dict, house attributes
+    :return: float, predicted sale price
+    """
+    engine = _local_engine()
+    if engine is not None:
+        return engine.predict_one(record)
+    return _post(record, 'prediction')
+
+
+def predict_prices(records):
+    """
+    Predict the sale prices of several houses, in-process when possible.
+    :param records: list of dicts, house attributes
+    :return: list of floats, predicted sale prices
+    """
+    engine = _local_engine()
+    if engine is not None:
+        return engine.predict_many(records)
+    return _post(records, 'predictions')
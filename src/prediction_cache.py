@@ -0,0 +1,215 @@
+# src/prediction_cache.py
+
+import argparse
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.prediction import DEFAULT_MODEL_NAME, _local_engine, get_engine, predict_price
+
+# The inputs of the Prediction page form, in key order
+FORM_FEATURES = ['GrLivArea', 'TotalSF', 'GarageArea', 'YearBuilt', 'OverallQual']
+
+# Grid over realistic ranges of the form inputs (see HousePricing.csv).
+# OverallQual is only looked up at whole values; the others are interpolated.
+FORM_GRID_AXES = {
+    'GrLivArea': np.arange(400, 4401, 200),
+    'TotalSF': np.arange(500, 8001, 500),
+    'GarageArea': np.arange(0, 1401, 100),
+    'YearBuilt': np.arange(1870, 2031, 10),
+    'OverallQual': np.arange(1, 11),
+}
+
+DEFAULT_MEMO_SIZE = int(os.environ.get('PREDICTION_MEMO_SIZE', 4096))
+
+
+def normalize_form(record):
+    """
+    The memo key of a form submission: its five inputs as floats, in
+    FORM_FEATURES order, so 1500 and 1500.0 hit the same entry.
+    :param record: dict with the FORM_FEATURES keys
+    :return: tuple of float
+    """
+    return tuple(float(record[feature]) for feature in FORM_FEATURES)
+
+
+class PredictionMemo:
+    """
+    Thread-safe LRU cache of predictions, keyed by model version and
+    normalized inputs.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MEMO_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        :return: dict with entries, max_entries, hits and misses
+        """
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class ResponseSurface:
+    """
+    A model's predictions precomputed on a grid of the form inputs, with
+    every other feature filled with 0 as the form does. Inputs on grid points
+    return the model's exact prediction; inputs between them are linearly
+    interpolated across the four area and year axes. As tree ensembles are
+    piecewise constant, interpolated values approximate the model, so the
+    grid is optional and only used inside its ranges.
+    """
+
+    def __init__(self, axes, values, model_version):
+        self.axes = {feature: np.asarray(axes[feature], dtype=np.float64) for feature in FORM_FEATURES}
+        self.values = np.asarray(values, dtype=np.float32)
+        self.model_version = model_version
+
+    @classmethod
+    def build(cls, engine, axes=None):
+        """
+        Predict every grid point in one batched call.
+        :param engine: PredictionEngine
+        :param axes: dict of feature -> grid values (default: FORM_GRID_AXES)
+        :return: ResponseSurface
+        """
+        axes = axes or FORM_GRID_AXES
+        mesh = np.meshgrid(*(axes[feature] for feature in FORM_FEATURES), indexing='ij')
+        grid = pd.DataFrame({feature: points.ravel() for feature, points in zip(FORM_FEATURES, mesh)})
+        values = np.asarray(engine.predict_many(grid), dtype=np.float32).reshape(mesh[0].shape)
+        return cls(axes, values, engine.model_version)
+
+    def lookup(self, key):
+        """
+        Interpolated prediction for a normalized form key.
+        :param key: tuple returned by normalize_form
+        :return: float, or None when the inputs fall outside the grid
+        """
+        corners = []
+        for feature, x in zip(FORM_FEATURES, key):
+            axis = self.axes[feature]
+            if x < axis[0] or x > axis[-1]:
+                return None
+            i = min(int(np.searchsorted(axis, x, side='right')) - 1, len(axis) - 2)
+            t = (x - axis[i]) / (axis[i + 1] - axis[i])
+            if feature == 'OverallQual':
+                if t not in (0.0, 1.0):
+                    return None
+                corners.append(((i + int(t), 1.0),))
+            elif t == 0.0:
+                corners.append(((i, 1.0),))
+            else:
+                corners.append(((i, 1.0 - t), (i + 1, t)))
+        prediction = 0.0
+        for corner in itertools.product(*corners):
+            index = tuple(position for position, _ in corner)
+            weight = np.prod([w for _, w in corner])
+            prediction += weight * float(self.values[index])
+        return prediction
+
+    def save(self, path):
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, values=self.values, model_version=np.array(self.model_version),
+                 **{f'axis_{feature}': self.axes[feature] for feature in FORM_FEATURES})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            axes = {feature: data[f'axis_{feature}'] for feature in FORM_FEATURES}
+            return cls(axes, data['values'], str(data['model_version']))
+
+
+def grid_path(model_name=DEFAULT_MODEL_NAME):
+    return f'outputs/models/{model_name}_form_grid.npz'
+
+
+_memo = PredictionMemo()
+_surfaces = {}
+_surfaces_lock = threading.Lock()
+
+
+def get_memo():
+    return _memo
+
+
+def _surface(engine):
+    """
+    The saved response surface of the engine's model, or None when there is
+    none or it was built for another model version.
+    """
+    with _surfaces_lock:
+        if engine.model_version not in _surfaces:
+            path = grid_path(engine.model_name)
+            surface = ResponseSurface.load(path) if os.path.exists(path) else None
+            if surface is not None and surface.model_version != engine.model_version:
+                surface = None
+            _surfaces[engine.model_version] = surface
+        return _surfaces[engine.model_version]
+
+
+def predict_form(record, use_grid=True):
+    """
+    Predict the sale price for the Prediction page form. Answers come from
+    the memo, else from the saved response surface, else from the model (or
+    the Flask API), and are memoized per model version.
+    :param record: dict with the FORM_FEATURES keys
+    :param use_grid: bool, answer from the response surface when one is saved
+    :return: float, predicted sale price
+    """
+    key = normalize_form(record)
+    engine = _local_engine()
+    model_version = engine.model_version if engine is not None else 'remote'
+
+    # Interpolated and exact answers are memoized separately
+    memo_key = (model_version, use_grid, key)
+    prediction = _memo.get(memo_key)
+    if prediction is not None:
+        return prediction
+    surface = _surface(engine) if engine is not None and use_grid else None
+    if surface is not None:
+        prediction = surface.lookup(key)
+    if prediction is None:
+        prediction = predict_price(dict(zip(FORM_FEATURES, key)))
+    _memo.put(memo_key, prediction)
+    return prediction
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute the Prediction page response surface.')
+    parser.add_argument('--model', default=DEFAULT_MODEL_NAME, help='model to precompute')
+    args = parser.parse_args()
+
+    engine = get_engine(args.model).ensure_loaded()
+    start = time.perf_counter()
+    surface = ResponseSurface.build(engine)
+    surface.save(grid_path(args.model))
+    print(f"Wrote {grid_path(args.model)}: {surface.values.size:,} grid points for {engine.model_version} "
+          f"in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,105 @@
+# src/range_index.py
+
+import numpy as np
+import pandas as pd
+
+
+class SortedRangeIndex:
+    """
+    Range index over one key column (e.g. YearBuilt or SalePrice) with one
+    value column carried along.
+    Rows are sorted by key, and randomly shuffled within equal keys, so:
+    - a key range is a contiguous slice found in O(log n) with searchsorted,
+    - per-key aggregates are precomputed once,
+    - the first rows of each key's block form a uniform random sample of that
+      key, which gives stratified samples without touching other rows.
+    """
+
+    def __init__(self, df, key, value, seed=42):
+        keys = df[key].to_numpy()
+        values = df[value].to_numpy()
+        tiebreak = np.random.default_rng(seed).random(len(keys))
+        order = np.lexsort((tiebreak, keys))
+
+        self.key = key
+        self.value = value
+        self.keys = keys[order]
+        self.values = values[order]
+        self.unique_keys, self.starts, self.counts = np.unique(self.keys, return_index=True, return_counts=True)
+        self.ends = self.starts + self.counts
+
+        grouped = pd.Series(self.values).groupby(self.keys)
+        self.per_key = pd.DataFrame({
+            'Houses': self.counts,
+            f'Mean {value}': grouped.mean().to_numpy(),
+            f'Median {value}': grouped.median().to_numpy(),
+            f'Min {value}': grouped.min().to_numpy(),
+            f'Max {value}': grouped.max().to_numpy(),
+        }, index=pd.Index(self.unique_keys, name=key))
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.values.nbytes + int(self.per_key.memory_usage(deep=True).sum())
+
+    @property
+    def min_key(self):
+        return self.unique_keys[0]
+
+    @property
+    def max_key(self):
+        return self.unique_keys[-1]
+
+    def bounds(self, low, high):
+        """
+        Positions of the rows with low <= key <= high.
+        :return: (start, stop) for slicing the sorted arrays
+        """
+        return np.searchsorted(self.keys, low, side='left'), np.searchsorted(self.keys, high, side='right')
+
+    def count(self, low, high):
+        start, stop = self.bounds(low, high)
+        return int(stop - start)
+
+    def select(self, low, high):
+        """
+        All rows with low <= key <= high, sorted by key.
+        :return: pd.DataFrame with the key and value columns
+        """
+        start, stop = self.bounds(low, high)
+        return pd.DataFrame({self.key: self.keys[start:stop], self.value: self.values[start:stop]})
+
+    def aggregates(self, low, high):
+        """
+        Precomputed per-key aggregates for keys in [low, high].
+        :return: pd.DataFrame indexed by key
+        """
+        start = np.searchsorted(self.unique_keys, low, side='left')
+        stop = np.searchsorted(self.unique_keys, high, side='right')
+        return self.per_key.iloc[start:stop]
+
+    def sample(self, low, high, budget):
+        """
+        At most `budget` rows with low <= key <= high, stratified by key:
+        every key in the range keeps the same fraction of its rows, rounded
+        down. Keys that would get none get one row while the budget lasts,
+        the largest keys first. Work is proportional to the number of
+        distinct keys and the budget, not to the range size.
+        :param low: lowest key
+        :param high: highest key
+        :param budget: int, maximum number of rows to return
+        :return: pd.DataFrame with the key and value columns
+        """
+        total = self.count(low, high)
+        if total <= budget:
+            return self.select(low, high)
+        first = np.searchsorted(self.unique_keys, low, side='left')
+        last = np.searchsorted(self.unique_keys, high, side='right')
+        starts = self.starts[first:last]
+        quotas = self.counts[first:last] * budget / total
+        takes = np.floor(quotas).astype(np.int64)
+        spare = budget - int(takes.sum())
+        if spare > 0:
+            empty = np.flatnonzero(takes == 0)
+            takes[empty[np.argsort(-quotas[empty], kind='stable')[:spare]]] = 1
+        positions = np.concatenate([np.arange(start, start + take) for start, take in zip(starts, takes)])
+        return pd.DataFrame({self.key: self.keys[positions], self.value: self.values[positions]})
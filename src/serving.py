@@ -0,0 +1,276 @@
+# src/serving.py
+
+import argparse
+import asyncio
+import json
+import numbers
+import random
+
+from src.prediction import DEFAULT_MODEL_NAME, get_engine
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row predictions into one vectorized predict call.
+    A batch is flushed when it reaches max_batch_size rows or when the first
+    row in it has waited max_wait seconds, whichever comes first.
+    """
+
+    def __init__(self, predict_many, max_batch_size=64, max_wait=0.005):
+        self.predict_many = predict_many
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        # Set whenever a record is queued, so collecting waits for arrivals without cancelling a get
+        self._arrived = asyncio.Event()
+        self.batches = 0
+        self.rows = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def predict(self, record):
+        """
+        Queue a single record and wait for its prediction.
+        :param record: dict, house attributes
+        :return: float, predicted sale price
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((record, future))
+        self._arrived.set()
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            # On Python 3.11, wait_for(queue.get(), timeout) can drop an item taken just as the timeout
+            # fires. Only the arrival signal is waited for; a record queued as it times out stays queued.
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), timeout)
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            records = [record for record, _ in batch]
+            try:
+                # Run the model off the event loop so new requests keep queueing
+                predictions = await loop.run_in_executor(None, self.predict_many, records)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+
+
+def _validate_record(record):
+    if not isinstance(record, dict):
+        raise ValueError("Each house must be a JSON object.")
+    for key, value in record.items():
+        if not isinstance(value, numbers.Number) or isinstance(value, bool):
+            raise ValueError(f"Feature '{key}' must be numeric.")
+
+
+class InferenceServer:
+    """
+    Asyncio HTTP server with the Flask API's contract, so the app can run
+    against it instead of the Heroku deployment:
+    - POST /predict: a JSON object returns {'prediction': float}, a JSON
+      list returns {'predictions': [float, ...]}.
+    - GET /model_performance: train and test R² and MSE, with the actual
+      and predicted sale prices of both splits.
+    latency (seconds) is added to every request and error_rate is the share
+    of requests answered 503, to rehearse a slow or failing upstream.
+    The engine is looked up on every call, so a newly pinned registry
+    version is served without a restart.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, max_batch_size=64, max_wait=0.005, latency=0.0,
+                 error_rate=0.0, seed=None):
+        self.model_name = model_name
+        self.batcher = MicroBatcher(self.predict_many, max_batch_size, max_wait)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.injected_errors = 0
+        self._performance = None
+        self.routes = {('POST', '/predict'): self.handle_predict,
+                       ('GET', '/model_performance'): self.handle_model_performance}
+
+    @property
+    def engine(self):
+        return get_engine(self.model_name)
+
+    def predict_many(self, records):
+        return self.engine.predict_many(records)
+
+    async def handle_predict(self, payload):
+        if isinstance(payload, list):
+            for record in payload:
+                _validate_record(record)
+            loop = asyncio.get_running_loop()
+            predictions = await loop.run_in_executor(None, self.predict_many, payload)
+            return 200, {'predictions': predictions}
+        _validate_record(payload)
+        return 200, {'prediction': await self.batcher.predict(payload)}
+
+    def model_performance(self, engine=None):
+        """
+        Evaluate the model on the saved train/test split.
+        :param engine: PredictionEngine (default: the one currently served)
+        :return: dict in the Flask API's /model_performance format
+        """
+        from src.data_management import load_dataset
+        from src.model_evaluation import regression_metrics
+
+        engine = engine or self.engine
+        result = {}
+        for split in ('train', 'test'):
+            y = load_dataset(f'y_{split}')['SalePrice'].tolist()
+            y_pred = engine.predict_many(load_dataset(f'X_{split}'))
+            metrics = regression_metrics(y, y_pred)
+            result.update({f'{split}_r2': float(metrics['r2']), f'{split}_mse': float(metrics['mse']),
+                           f'y_{split}_pred': [float(value) for value in y_pred], f'y_{split}': y})
+        return result
+
+    async def handle_model_performance(self, payload):
+        # The split never changes while serving, so each model version is evaluated once
+        engine = self.engine
+        if self._performance is None or self._performance[0] != engine.model_version:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, self.model_performance, engine)
+            self._performance = (engine.model_version, result)
+        return 200, self._performance[1]
+
+    async def _dispatch(self, method, path, body):
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                return 405, {'error': f"Method {method} not allowed."}
+            return 404, {'error': f"Unknown path {path}."}
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.injected_errors += 1
+            return 503, {'error': "Injected failure."}
+        try:
+            payload = json.loads(body) if body else None
+        except json.JSONDecodeError:
+            return 400, {'error': "Request body must be valid JSON."}
+        try:
+            return await handler(payload)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, response = 413, {'error': "Request body too large."}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, response = await self._dispatch(method, path.split('?', 1)[0], body)
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+                data = json.dumps(response).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        """
+        Start the batcher and serve requests until cancelled.
+        :param host: str, interface to bind
+        :param port: int, port to bind
+        """
+        self.batcher.start()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"Serving predictions on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve house price predictions over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default=DEFAULT_MODEL_NAME, help="model name in outputs/models")
+    parser.add_argument('--max-batch-size', type=int, default=64, help="rows per coalesced predict call")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help="longest a row waits for a batch to fill")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="delay added to every request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered 503")
+    args = parser.parse_args(argv)
+
+    server = InferenceServer(args.model, args.max_batch_size, args.max_wait_ms / 1000, args.latency_ms / 1000,
+                             args.error_rate)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
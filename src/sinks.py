@@ -0,0 +1,66 @@
+# src/sinks.py
+
+
+class CsvSink:
+    """
+    Write DataFrame chunks to one CSV file, with the header written once.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """
+    Write DataFrame chunks to one Parquet file, with the first chunk's schema.
+    Later chunks are cast to it only where no value changes.
+    """
+
+    def __init__(self, path):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.pq = pq
+        self.writer = None
+        self.schema = None
+
+    def write(self, df):
+        import pyarrow as pa
+
+        if self.writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self.schema = table.schema
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        else:
+            # Later chunks may infer different dtypes (e.g. float where a value is missing). Casting them
+            # to the first chunk's schema must not lose values, so a fractional float meeting an int column
+            # fails rather than being truncated.
+            try:
+                table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"A chunk does not fit the schema of {self.path} set by its first chunk ({e}); "
+                                 f"read the input with fixed dtypes.") from e
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_sink(path):
+    """
+    Open a chunked writer for a file, by its extension.
+    :param path: str, destination .csv or .parquet file
+    :return: CsvSink or ParquetSink, with write(df) and close()
+    """
+    if path.endswith('.parquet'):
+        return ParquetSink(path)
+    return CsvSink(path)
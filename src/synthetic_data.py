@@ -0,0 +1,177 @@
+# src/synthetic_data.py
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data_management import (BSMT_EXPOSURE_MAPPING, BSMT_FIN_TYPE_MAPPING, GARAGE_FINISH_MAPPING,
+                                 KITCHEN_QUAL_MAPPING)
+from src.sinks import open_sink
+
+RAW_RECORDS = 'inputs/datasets/raw/house-price-20211124T154130Z-001/house-price/house_prices_records.csv'
+
+# Categories in rank order, so the copula can correlate them with the numeric columns.
+# A missing value (no basement, no garage) ranks lowest.
+CATEGORY_ORDER = {
+    'BsmtExposure': [c for c in BSMT_EXPOSURE_MAPPING if c != 'No Exposure'],
+    'BsmtFinType1': [c for c in BSMT_FIN_TYPE_MAPPING if c != 'No Basement'],
+    'GarageFinish': [c for c in GARAGE_FINISH_MAPPING if c != 'No Garage'],
+    'KitchenQual': list(KITCHEN_QUAL_MAPPING),
+}
+
+# Columns with at most this many distinct values are sampled from their observed values only
+DISCRETE_MAX_VALUES = 50
+
+
+def _normal_scores(values):
+    """
+    Map values to standard normal scores through their ranks; NaN stays NaN.
+    """
+    from scipy.stats import norm
+
+    ranks = pd.Series(values).rank(method='average')
+    return norm.ppf(ranks.to_numpy() / (ranks.count() + 1))
+
+
+class SyntheticHousingGenerator:
+    """
+    Gaussian copula over the raw house records.
+    Each column keeps its own empirical distribution (including its share of
+    missing values), and a correlation matrix over normal scores ties the
+    columns together, so generated rows reproduce both the marginals and the
+    correlations of the source data. Missing values are modelled as separate
+    indicator variables, so they stay correlated with the rest of the row
+    (e.g. GarageFinish is missing mostly when GarageArea is 0).
+    """
+
+    def __init__(self, df):
+        """
+        :param df: pd.DataFrame, raw records laid out like house_prices_records.csv
+        """
+        self.columns = list(df.columns)
+        self.dtypes = {}
+        self.missing_rates = {}
+        self.marginals = {}
+        self.discrete = {}
+        scores = {}
+        for column in self.columns:
+            series = df[column]
+            self.missing_rates[column] = float(series.isna().mean())
+            if column in CATEGORY_ORDER or series.dtype == object:
+                order = CATEGORY_ORDER.get(column) or sorted(series.dropna().unique())
+                codes = series.map({category: code for code, category in enumerate(order)})
+                self.dtypes[column] = ('category', order)
+                values = codes.fillna(-1).to_numpy(dtype=np.float64)
+                self.marginals[column] = np.sort(values)
+                self.discrete[column] = True
+                scores[column] = _normal_scores(values)
+                continue
+
+            present = series.dropna().to_numpy(dtype=np.float64)
+            integral = bool(np.all(present == np.round(present)))
+            self.dtypes[column] = ('int' if integral else 'float', None)
+            self.marginals[column] = np.sort(present)
+            self.discrete[column] = len(np.unique(present)) <= DISCRETE_MAX_VALUES
+            scores[column] = _normal_scores(series.to_numpy(dtype=np.float64))
+            if self.missing_rates[column] > 0:
+                scores[f'{column} missing'] = _normal_scores(series.isna().to_numpy(dtype=np.float64))
+
+        # Pairwise-complete correlations, projected back onto a valid correlation matrix
+        self.latent_columns = list(scores)
+        correlation = pd.DataFrame(scores).corr().fillna(0).to_numpy()
+        np.fill_diagonal(correlation, 1.0)
+        eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+        correlation = eigenvectors @ np.diag(np.clip(eigenvalues, 1e-6, None)) @ eigenvectors.T
+        scale = np.sqrt(np.diag(correlation))
+        self.correlation = correlation / np.outer(scale, scale)
+        self._cholesky = np.linalg.cholesky(self.correlation)
+
+    @classmethod
+    def from_csv(cls, path=RAW_RECORDS):
+        return cls(pd.read_csv(path))
+
+    def _quantile(self, column, u):
+        values = self.marginals[column]
+        method = 'inverted_cdf' if self.discrete[column] else 'linear'
+        return np.quantile(values, u, method=method)
+
+    def sample(self, n_rows, rng):
+        """
+        Generate rows in the raw schema.
+        :param n_rows: int, number of rows
+        :param rng: np.random.Generator
+        :return: pd.DataFrame with the source columns, dtypes and missing values
+        """
+        from scipy.stats import norm
+
+        latent = rng.standard_normal((n_rows, len(self.latent_columns))) @ self._cholesky.T
+        uniform = pd.DataFrame(norm.cdf(latent), columns=self.latent_columns)
+        data = {}
+        for column in self.columns:
+            kind, order = self.dtypes[column]
+            u = uniform[column].to_numpy()
+            if kind == 'category':
+                codes = self._quantile(column, u).astype(np.int64)
+                labels = np.array([np.nan] + list(order), dtype=object)
+                data[column] = labels[codes + 1]
+                continue
+            values = self._quantile(column, u)
+            if kind == 'int':
+                values = np.round(values)
+            rate = self.missing_rates[column]
+            if rate > 0:
+                # Flag the rows whose indicator falls in the top `rate` share as missing
+                values[uniform[f'{column} missing'].to_numpy() > 1 - rate] = np.nan
+            elif kind == 'int':
+                values = values.astype(np.int64)
+            data[column] = values
+        return pd.DataFrame(data, columns=self.columns)
+
+    def generate(self, n_rows, output_path, chunksize=100_000, seed=42, verbose=True):
+        """
+        Write n_rows synthetic records to a .csv or .parquet file, chunk by
+        chunk, so memory stays bounded regardless of n_rows. The same seed
+        and chunksize always produce the same file.
+        :param n_rows: int, number of rows
+        :param output_path: str, destination .csv or .parquet file
+        :param chunksize: int, rows generated and written at a time
+        :param seed: int, random seed
+        :param verbose: bool, print progress
+        :return: dict with rows, seconds and rows_per_second
+        """
+        rng = np.random.default_rng(seed)
+        sink = open_sink(output_path)
+        start = time.perf_counter()
+        written = 0
+        try:
+            while written < n_rows:
+                chunk = self.sample(min(chunksize, n_rows - written), rng)
+                sink.write(chunk)
+                written += len(chunk)
+                if verbose:
+                    print(f"{written:,} / {n_rows:,} rows")
+        finally:
+            sink.close()
+        seconds = time.perf_counter() - start
+        return {'rows': written, 'seconds': seconds, 'rows_per_second': written / seconds if seconds else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic house records in the raw schema.')
+    parser.add_argument('rows', type=int, help='number of rows to generate')
+    parser.add_argument('output', help='destination .csv or .parquet file')
+    parser.add_argument('--source', default=RAW_RECORDS, help='raw records to learn from')
+    parser.add_argument('--chunksize', type=int, default=100_000, help='rows per chunk')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    args = parser.parse_args(argv)
+
+    generator = SyntheticHousingGenerator.from_csv(args.source)
+    stats = generator.generate(args.rows, args.output, args.chunksize, args.seed)
+    print(f"Wrote {stats['rows']:,} rows to {args.output} in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+# src/tree_compiler.py
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+# Objectives whose prediction is the raw sum of leaf values plus the base score
+IDENTITY_OBJECTIVES = {'reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:quantileerror'}
+
+COMPILED_FILE = 'trees.npz'
+
+# Rows traversed at a time, bounding the (rows x trees) node index matrix
+DEFAULT_BATCH_SIZE = 4096
+
+
+class CompiledEnsemble:
+    """
+    A tree ensemble flattened into contiguous NumPy arrays, predicting with
+    nothing but NumPy. All trees share one node table; each internal node
+    stores its split feature, threshold, children and the branch taken for
+    missing values, and each leaf points at itself with its leaf value.
+    A batch is predicted by moving every (row, tree) pair one level down all
+    trees at once, max_depth times.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, max_depth,
+                 feature_names, base_score=0.0, scale=1.0, inclusive=False):
+        """
+        :param feature: int32 array, split feature per node
+        :param threshold: float32 (XGBoost) or float64 (scikit-learn) array, split threshold per node
+        :param left: int32 array, left child per node (the node itself for leaves)
+        :param right: int32 array, right child per node (the node itself for leaves)
+        :param default_left: bool array, whether missing values go left
+        :param value: float64 array, leaf value per node (0 for internal nodes)
+        :param roots: int32 array, root node of each tree
+        :param max_depth: int, deepest leaf of any tree
+        :param feature_names: list of str, features in model order
+        :param base_score: float, added to every prediction
+        :param scale: float, multiplies the sum of leaf values (1 / n_trees for averaging ensembles)
+        :param inclusive: bool, go left when x <= threshold (scikit-learn) rather than x < threshold (XGBoost)
+        """
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        threshold = np.asarray(threshold)
+        # Thresholds keep their library's precision, so a value between a float64 threshold and its float32
+        # rounding takes the same branch as in the library
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32 if threshold.dtype == np.float32
+                                              else np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.feature_names_in_ = np.array(feature_names, dtype=object)
+        self.base_score = float(base_score)
+        self.scale = float(scale)
+        self.inclusive = bool(inclusive)
+        # Left and right child of node i at 2i and 2i + 1, so one lookup picks the branch
+        self._children = np.column_stack([self.left, self.right]).ravel()
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.left, self.right,
+                                              self.default_left, self.value, self.roots))
+
+    def _features(self, X):
+        if hasattr(X, 'columns'):
+            X = X[list(self.feature_names_in_)].to_numpy(dtype=np.float32, na_value=np.nan)
+        # Both libraries read inputs as float32. XGBoost compares them with float32 thresholds, and
+        # scikit-learn with float64 ones.
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        return np.ascontiguousarray(X, dtype=self.threshold.dtype)
+
+    def predict(self, X, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        :param X: pd.DataFrame with the model's features, or an array in feature order
+        :param batch_size: int, rows traversed at a time
+        :return: np.ndarray of float32 predictions
+        """
+        X = self._features(X)
+        predictions = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), batch_size):
+            predictions[start:start + batch_size] = self._predict_batch(X[start:start + batch_size])
+        return predictions
+
+    def _predict_batch(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        has_missing = bool(np.isnan(flat).any())
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees))
+        for _ in range(self.max_depth):
+            values = flat.take(row_offsets + self.feature.take(nodes))
+            thresholds = self.threshold.take(nodes)
+            go_left = values <= thresholds if self.inclusive else values < thresholds
+            if has_missing:
+                # NaN compares False, so only missing values routed left need setting
+                go_left |= np.isnan(values) & self.default_left.take(nodes)
+            nodes = self._children.take(2 * nodes + 1 - go_left)
+        return self.base_score + self.scale * self.value.take(nodes).sum(axis=1)
+
+    def save(self, path):
+        """
+        Persist the arrays to an uncompressed .npz file.
+        :param path: str, destination file
+        """
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                 default_left=self.default_left, value=self.value, roots=self.roots,
+                 max_depth=np.array(self.max_depth), feature_names=np.array(self.feature_names_in_, dtype=str),
+                 base_score=np.array(self.base_score), scale=np.array(self.scale),
+                 inclusive=np.array(self.inclusive))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: str, file written by save()
+        :return: CompiledEnsemble
+        """
+        with np.load(path) as data:
+            return cls(data['feature'], data['threshold'], data['left'], data['right'], data['default_left'],
+                       data['value'], data['roots'], int(data['max_depth']), data['feature_names'].tolist(),
+                       float(data['base_score']), float(data['scale']), bool(data['inclusive']))
+
+
+def _tree_depth(left, right, root=0):
+    depth, frontier = 0, np.array([root])
+    while True:
+        children = np.concatenate([left[frontier], right[frontier]])
+        children = children[children >= 0]
+        if len(children) == 0:
+            return depth
+        depth, frontier = depth + 1, children
+
+
+def _flatten(trees, feature_names, base_score, scale, inclusive):
+    """
+    Concatenate per-tree node arrays into one table with global node indices.
+    Each tree is a dict of feature, threshold, left, right (-1 at leaves),
+    default_left and value arrays.
+    """
+    offset, parts, roots, max_depth = 0, {key: [] for key in trees[0]}, [], 0
+    for tree in trees:
+        left, right = np.asarray(tree['left']), np.asarray(tree['right'])
+        max_depth = max(max_depth, _tree_depth(left, right))
+        leaf = left < 0
+        own = np.arange(len(left)) + offset
+        for key in tree:
+            parts[key].append(np.asarray(tree[key]))
+        parts['left'][-1] = np.where(leaf, own, left + offset)
+        parts['right'][-1] = np.where(leaf, own, right + offset)
+        parts['feature'][-1] = np.where(leaf, 0, parts['feature'][-1])
+        parts['value'][-1] = np.where(leaf, parts['value'][-1], 0.0)
+        roots.append(offset)
+        offset += len(left)
+    arrays = {key: np.concatenate(value) for key, value in parts.items()}
+    return CompiledEnsemble(arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'],
+                            arrays['default_left'], arrays['value'], roots, max_depth, feature_names,
+                            base_score, scale, inclusive)
+
+
+def compile_xgboost(model):
+    """
+    Flatten a trained XGBRegressor (or Booster) with numeric splits.
+    Only trees up to the best iteration are kept when the model was trained
+    with early stopping, as XGBRegressor.predict does.
+    :return: CompiledEnsemble
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in IDENTITY_OBJECTIVES:
+        raise ValueError(f"Cannot compile objective {objective}: only identity-link regression is supported")
+
+    gbtree = learner['gradient_booster']
+    if gbtree.get('name') == 'dart' or 'model' not in gbtree:
+        raise ValueError(f"Cannot compile booster {gbtree.get('name')}: only gbtree is supported")
+    trees = gbtree['model']['trees']
+    best_iteration = booster.attributes().get('best_iteration')
+    if best_iteration is not None:
+        per_iteration = int(gbtree['model']['gbtree_model_param']['num_parallel_tree'])
+        trees = trees[:(int(best_iteration) + 1) * per_iteration]
+
+    flat = []
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError('Cannot compile categorical splits')
+        flat.append({
+            'feature': tree['split_indices'],
+            'threshold': np.asarray(tree['split_conditions'], dtype=np.float32),
+            'left': tree['left_children'],
+            'right': tree['right_children'],
+            'default_left': np.asarray(tree['default_left'], dtype=bool),
+            # Leaves keep their value in split_conditions
+            'value': np.asarray(tree['split_conditions'], dtype=np.float64),
+        })
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    feature_names = learner.get('feature_names') or [f'f{i}' for i in range(
+        int(learner['learner_model_param']['num_feature']))]
+    return _flatten(flat, feature_names, base_score, 1.0, inclusive=False)
+
+
+def compile_random_forest(model):
+    """
+    Flatten a trained scikit-learn RandomForestRegressor (or any forest of
+    single-output regression trees whose prediction is the mean of its trees).
+    :return: CompiledEnsemble
+    """
+    flat = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        flat.append({
+            'feature': tree.feature,
+            'threshold': tree.threshold,
+            'left': tree.children_left,
+            'right': tree.children_right,
+            # scikit-learn sends missing values right unless the split learned otherwise
+            'default_left': getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8)).astype(bool),
+            'value': tree.value[:, 0, 0],
+        })
+    feature_names = getattr(model, 'feature_names_in_', [f'x{i}' for i in range(model.n_features_in_)])
+    return _flatten(flat, list(feature_names), 0.0, 1.0 / len(flat), inclusive=True)
+
+
+def compile_model(model):
+    """
+    Flatten a trained XGBoost or random forest regressor.
+    :return: CompiledEnsemble
+    """
+    if type(model).__module__.startswith('xgboost'):
+        return compile_xgboost(model)
+    if hasattr(model, 'estimators_'):
+        return compile_random_forest(model)
+    raise ValueError(f"Cannot compile {type(model).__name__}")
+
+
+def _percentiles(timings):
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000
+
+
+if __name__ == '__main__':
+    import pandas as pd
+
+    from src.model_registry import read_manifest, load_registered_model, version_dir
+
+    parser = argparse.ArgumentParser(description="Compile a registered model's trees into NumPy arrays.")
+    parser.add_argument('name', help='registered model name')
+    parser.add_argument('--version', type=int, help='registry version (default: pinned or latest)')
+    args = parser.parse_args()
+
+    manifest = read_manifest(args.name, args.version)
+    registered = load_registered_model(args.name, manifest['version'])
+    native = registered.native_model
+    compiled = compile_model(native)
+    path = os.path.join(version_dir(args.name, manifest['version']), COMPILED_FILE)
+    compiled.save(path)
+
+    X_test = pd.read_csv('outputs/datasets/collection/X_test.csv')[list(compiled.feature_names_in_)]
+    difference = np.abs(compiled.predict(X_test) - native.predict(X_test))
+    print(f"Wrote {path}: {compiled.n_trees} trees, depth {compiled.max_depth}, {compiled.nbytes / 1024:.0f} KiB")
+    print(f"Largest difference from {type(native).__name__}.predict on X_test: {difference.max():.6g}")
+
+    rows = [X_test.iloc[[i % len(X_test)]] for i in range(200)]
+    batch = pd.concat([X_test] * 70, ignore_index=True)
+    for label, predictor in (('native', native), ('compiled', compiled)):
+        single = []
+        for row in rows:
+            start = time.perf_counter()
+            predictor.predict(row)
+            single.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        predictor.predict(batch)
+        batch_seconds = time.perf_counter() - start
+        p50, p99 = _percentiles(single)
+        print(f"{label:<9} single row p50 {p50:.3f} ms, p99 {p99:.3f} ms; "
+              f"{len(batch):,} rows in {batch_seconds * 1000:.1f} ms")
@@ -0,0 +1,96 @@
+# tests/test_api_client.py
+
+import time
+
+import pytest
+import requests
+
+from src.api_client import ApiClient, ApiError, CircuitBreaker, CircuitOpenError
+
+URL = 'http://api.test/predict'
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """Answers each request with the next outcome: a FakeResponse, or an exception to raise."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = 0
+
+    def request(self, method, url, json=None, timeout=None):
+        self.requests += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def make_client(outcomes, reset_timeout=30.0):
+    client = ApiClient(retries=0, backoff=0, failure_threshold=2, reset_timeout=reset_timeout)
+    client.session = FakeSession(outcomes)
+    return client
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == 'half-open'
+    # Only one trial call is let through
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_open_circuit_fails_fast():
+    client = make_client([requests.ConnectionError(), requests.ConnectionError()])
+    for _ in range(2):
+        with pytest.raises(ApiError):
+            client._request('POST', URL, {})
+    with pytest.raises(CircuitOpenError):
+        client._request('POST', URL, {})
+    assert client.session.requests == 2
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    client = make_client([FakeResponse(400), FakeResponse(400), FakeResponse(200, {'prediction': 1.0})])
+    for _ in range(2):
+        with pytest.raises(ApiError):
+            client._request('POST', URL, {})
+    assert client._request('POST', URL, {}) == {'prediction': 1.0}
+    assert client.breaker(URL).state == 'closed'
+
+
+@pytest.mark.parametrize('exception', [requests.exceptions.ChunkedEncodingError(),
+                                       requests.exceptions.TooManyRedirects(),
+                                       requests.exceptions.InvalidURL()])
+def test_half_open_trial_always_ends(exception):
+    client = make_client([requests.ConnectionError(), requests.ConnectionError(), exception,
+                          FakeResponse(200, {'prediction': 1.0})], reset_timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(ApiError):
+            client._request('POST', URL, {})
+    time.sleep(0.06)
+    with pytest.raises(ApiError):
+        client._request('POST', URL, {})
+    # The failed trial opened the circuit again rather than leaving it waiting on a trial forever
+    assert client.breaker(URL).state == 'open'
+    time.sleep(0.06)
+    assert client._request('POST', URL, {}) == {'prediction': 1.0}
+    assert client.breaker(URL).state == 'closed'
@@ -0,0 +1,38 @@
+# tests/test_benchmark.py
+
+import pytest
+
+from src.benchmark import compare_to_baseline
+
+ENVIRONMENT = {'python': '3.11.7', 'machine': 'x86_64', 'cpu_count': 4}
+
+
+def run(benchmarks, **environment):
+    return {'environment': {**ENVIRONMENT, **environment}, 'benchmarks': benchmarks}
+
+
+def timing(seconds, repeat=3):
+    return {'seconds': seconds, 'p99_seconds': seconds * 2, 'repeat': repeat}
+
+
+def test_short_benchmarks_use_the_absolute_tolerance():
+    baseline = run({'fast': timing(10e-6, 200), 'slow': timing(1.0)})
+    # Five times slower, but by microseconds: jitter, not a regression
+    results = run({'fast': timing(50e-6, 200), 'slow': timing(1.2)})
+    assert not compare_to_baseline(results, baseline)['regression'].any()
+    results = run({'fast': timing(5e-3, 200), 'slow': timing(1.3)})
+    flagged = compare_to_baseline(results, baseline).query('regression')
+    assert set(flagged['benchmark']) == {'fast', 'slow'}
+
+
+def test_rarely_sampled_benchmarks_use_the_absolute_tolerance():
+    baseline = run({'once': timing(0.1, repeat=1)})
+    results = run({'once': timing(0.1015, repeat=1)})
+    comparison = compare_to_baseline(results, baseline)
+    assert list(comparison['stat']) == ['seconds'] and not comparison['regression'].any()
+
+
+def test_other_environments_are_not_compared():
+    baseline = run({'slow': timing(1.0)}, cpu_count=1)
+    with pytest.raises(ValueError, match='cpu_count 1 -> 4'):
+        compare_to_baseline(run({'slow': timing(1.0)}), baseline)
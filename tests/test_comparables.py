@@ -0,0 +1,66 @@
+# tests/test_comparables.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import comparables
+from src.comparables import COMPARABLE_FEATURES, ComparablesIndex, comparable_sales
+
+
+def _sales(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'GrLivArea': rng.normal(1500, 500, n),
+        'TotalSF': rng.normal(2500, 800, n),
+        'GarageArea': rng.normal(470, 210, n),
+        'YearBuilt': rng.normal(1970, 30, n),
+        'OverallQual': rng.normal(6, 1.4, n),
+    })
+
+
+def _brute_force(index, X, k):
+    distances = np.sqrt(((index.standardize(X)[:, None, :] - index.data[None, :, :]) ** 2).sum(axis=2))
+    positions = np.argsort(distances, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(distances, positions, axis=1), positions
+
+
+@pytest.mark.parametrize('appended', [0, 30, 300])
+def test_query_matches_brute_force_search(monkeypatch, appended):
+    # Keep the appended rows in the brute-force buffer, except for the largest append
+    monkeypatch.setattr(comparables, 'REBUILD_MIN_ROWS', 100)
+    sales = _sales(2000 + appended, seed=0)
+    index = ComparablesIndex(sales[:2000], leaf_size=8)
+    if appended:
+        index.append(sales[2000:])
+    assert index.rows == len(sales)
+    assert index.pending_rows == (appended if appended <= 200 else 0)
+
+    queries = _sales(50, seed=1)
+    distances, positions = index.query(queries, k=7)
+    expected_distances, expected_positions = _brute_force(index, queries, k=7)
+    np.testing.assert_array_equal(positions, expected_positions)
+    np.testing.assert_allclose(distances, expected_distances)
+
+
+def test_comparable_sales_returns_the_nearest_rows():
+    sales = _sales(500, seed=2)
+    index = ComparablesIndex(sales)
+    records = sales.iloc[[10, 20]][COMPARABLE_FEATURES].to_dict('records')
+    results = comparable_sales(index, sales, records, k=3)
+    assert [len(result) for result in results] == [3, 3]
+    # Every sale is its own nearest neighbour
+    pd.testing.assert_series_equal(results[0].iloc[0][COMPARABLE_FEATURES], sales.iloc[10][COMPARABLE_FEATURES],
+                                   check_names=False)
+    assert results[1]['Distance'].iloc[0] == pytest.approx(0)
+    assert results[1]['Distance'].is_monotonic_increasing
+
+
+def test_save_and_load_keep_the_tree(tmp_path):
+    sales = _sales(300, seed=3)
+    index = ComparablesIndex(sales)
+    index.save(str(tmp_path / 'index.joblib'), source='test')
+    loaded, metadata = ComparablesIndex.load(str(tmp_path / 'index.joblib'))
+    assert metadata == {'source': 'test'}
+    assert loaded.matches_prefix(sales)
+    np.testing.assert_array_equal(loaded.query(sales[:5])[1], index.query(sales[:5])[1])
@@ -0,0 +1,79 @@
+# tests/test_hyperparameter_search.py
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import hyperparameter_search
+from src.hyperparameter_search import TrialLog, hyperband_brackets, hyperband_search
+
+SEARCH = {'max_rounds': 27, 'min_rounds': 3, 'eta': 3, 'n_jobs': 1, 'early_stopping_rounds': 5}
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 4)), columns=['a', 'b', 'c', 'd'])
+    y = pd.Series(3 * X['a'] - 2 * X['b'] ** 2 + rng.normal(scale=0.1, size=300), name='SalePrice')
+    return X, y
+
+
+@pytest.fixture
+def fit_calls(monkeypatch):
+    calls = []
+    fit_trial = hyperparameter_search._fit_trial
+
+    def counting_fit_trial(config, rounds, *args):
+        calls.append((hyperparameter_search.config_key(config), rounds))
+        return fit_trial(config, rounds, *args)
+
+    monkeypatch.setattr(hyperparameter_search, '_fit_trial', counting_fit_trial)
+    return calls
+
+
+def _comparable(trials):
+    return trials.drop(columns='fit_seconds').to_dict('records')
+
+
+def test_brackets_follow_hyperband():
+    assert hyperband_brackets(27, 3, eta=3) == [(9, [3, 9, 27]), (5, [9, 27]), (3, [27])]
+
+
+def test_rerun_replays_the_trial_log(tmp_path, data, fit_calls):
+    log_path = str(tmp_path / 'trials.jsonl')
+    best, trials = hyperband_search(*data, log_path=log_path, **SEARCH)
+    assert len(fit_calls) == len(trials)
+
+    fit_calls.clear()
+    replayed_best, replayed_trials = hyperband_search(*data, log_path=log_path, **SEARCH)
+    assert fit_calls == []
+    assert replayed_best == best
+    assert _comparable(replayed_trials) == _comparable(trials)
+
+
+def test_interrupted_search_resumes_from_the_trial_log(tmp_path, data, fit_calls):
+    best, trials = hyperband_search(*data, log_path=None, **SEARCH)
+
+    # A search killed after some trials, halfway through writing the next one
+    log_path = tmp_path / 'trials.jsonl'
+    logged = [{key: value for key, value in trial.items() if key not in ('bracket', 'rung')}
+              for trial in trials.to_dict('records')[:7]]
+    log_path.write_text(''.join(json.dumps(trial) + '\n' for trial in logged) + '{"data": "')
+    assert len(TrialLog(str(log_path))._trials) == 7
+
+    fit_calls.clear()
+    resumed_best, resumed_trials = hyperband_search(*data, log_path=str(log_path), **SEARCH)
+    assert len(fit_calls) == len(trials) - 7
+    assert resumed_best == best
+    assert _comparable(resumed_trials) == _comparable(trials)
+
+
+def test_changed_data_does_not_reuse_the_trial_log(tmp_path, data, fit_calls):
+    X, y = data
+    log_path = str(tmp_path / 'trials.jsonl')
+    hyperband_search(X, y, log_path=log_path, **SEARCH)
+    fit_calls.clear()
+    _, trials = hyperband_search(X, y * 2, log_path=log_path, **SEARCH)
+    assert len(fit_calls) == len(trials)
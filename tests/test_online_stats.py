@@ -0,0 +1,61 @@
+# tests/test_online_stats.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.online_stats import OnlineStats, QuantileSketch, append_to_dataset, build_dataset_stats
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    x = rng.normal(1000, 50, size=1000)
+    df = pd.DataFrame({'x': x, 'y': 2 * x + rng.normal(0, 30, size=1000), 'z': rng.integers(0, 5, size=1000),
+                       'label': rng.choice(['a', 'b'], size=1000)})
+    # Missing values in different rows per column, so correlations are pairwise-complete
+    df.loc[rng.random(1000) < 0.1, 'x'] = np.nan
+    df.loc[rng.random(1000) < 0.2, 'y'] = np.nan
+    return df
+
+
+def test_chunked_statistics_match_pandas(df):
+    stats = OnlineStats(['x', 'y', 'z'])
+    for start in range(0, len(df), 97):
+        stats.update(df.iloc[start:start + 97])
+    numeric = df[['x', 'y', 'z']]
+    pd.testing.assert_frame_equal(stats.correlation(), numeric.corr(), rtol=1e-9)
+    pd.testing.assert_frame_equal(stats.describe(), numeric.describe(), rtol=1e-9)
+
+
+def test_exact_sketch_matches_quantile(df):
+    whole, merged = QuantileSketch(), QuantileSketch()
+    whole.update(df['y'])
+    for start in range(0, len(df), 300):
+        part = QuantileSketch()
+        part.update(df['y'].iloc[start:start + 300])
+        merged.merge(part)
+    for q in (0, 0.01, 0.25, 0.5, 0.75, 0.99, 1):
+        assert whole.quantile(q) == pytest.approx(df['y'].quantile(q), rel=1e-12)
+        assert merged.quantile(q) == pytest.approx(df['y'].quantile(q), rel=1e-12)
+
+
+def test_compressed_sketch_stays_close_to_quantile():
+    values = pd.Series(np.random.default_rng(1).lognormal(12, 0.4, size=200_000))
+    sketch = QuantileSketch(max_centroids=256)
+    for start in range(0, len(values), 10_000):
+        sketch.update(values.iloc[start:start + 10_000])
+    assert not sketch.exact
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        # Off by less than half a percentile in rank
+        assert abs((values < sketch.quantile(q)).mean() - q) < 0.005
+
+
+def test_empty_dataset(tmp_path):
+    path = tmp_path / 'houses.csv'
+    path.write_text('GrLivArea,TotalSF\n')
+    with pytest.raises(ValueError, match='no rows'):
+        build_dataset_stats('houses', str(tmp_path))
+    stats = append_to_dataset('houses', pd.DataFrame({'GrLivArea': [1500, 900], 'TotalSF': [2000, 1200]}),
+                              str(tmp_path))
+    assert list(stats.describe().loc['mean']) == [1200, 1600]
@@ -0,0 +1,117 @@
+# tests/test_pipeline.py
+
+import os
+
+import pytest
+
+from src import pipeline
+from src.pipeline import Pipeline, Stage
+
+calls = []
+
+
+def double(inputs, outputs):
+    calls.append('double')
+    with open(inputs[0]) as f:
+        value = int(f.read())
+    with open(outputs[0], 'w') as f:
+        f.write(str(value * 2))
+
+
+def parity(inputs, outputs):
+    calls.append('parity')
+    with open(inputs[0]) as f:
+        value = int(f.read())
+    with open(outputs[0], 'w') as f:
+        f.write('even' if value % 4 == 0 else 'odd')
+
+
+@pytest.fixture
+def paths(tmp_path):
+    del calls[:]
+    return {name: str(tmp_path / name) for name in ('number', 'doubled', 'parity', 'pipeline')}
+
+
+def make_pipeline(paths):
+    return Pipeline([Stage('double', double, [paths['number']], [paths['doubled']]),
+                     Stage('parity', parity, [paths['doubled']], [paths['parity']])], paths['pipeline'])
+
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def statuses(results):
+    return {result['stage']: result['status'] for result in results}
+
+
+def test_stages_rerun_only_when_their_key_changes(paths):
+    write(paths['number'], '2')
+    assert statuses(make_pipeline(paths).run(verbose=False)) == {'double': 'ran', 'parity': 'ran'}
+    # The state is read back from disk
+    assert statuses(make_pipeline(paths).run(verbose=False)) == {'double': 'fresh', 'parity': 'fresh'}
+    assert make_pipeline(paths).status() == {'double': 'fresh', 'parity': 'fresh'}
+
+    write(paths['number'], '3')
+    assert make_pipeline(paths).status() == {'double': 'stale', 'parity': 'stale upstream'}
+    assert statuses(make_pipeline(paths).run(verbose=False)) == {'double': 'ran', 'parity': 'ran'}
+    assert read(paths['parity']) == 'odd'
+
+    # A deleted output is rebuilt, from the store as the key is unchanged
+    os.remove(paths['parity'])
+    assert statuses(make_pipeline(paths).run(verbose=False))['parity'] == 'restored'
+    assert read(paths['parity']) == 'odd'
+
+
+def test_reverted_inputs_restore_stored_outputs(paths):
+    write(paths['number'], '2')
+    make_pipeline(paths).run(verbose=False)
+    write(paths['number'], '5')
+    make_pipeline(paths).run(verbose=False)
+    del calls[:]
+    write(paths['number'], '2')
+    assert statuses(make_pipeline(paths).run(verbose=False)) == {'double': 'restored', 'parity': 'restored'}
+    assert calls == []
+    assert (read(paths['doubled']), read(paths['parity'])) == ('4', 'even')
+
+
+def test_identical_outputs_leave_downstream_fresh(paths):
+    write(paths['number'], '2')
+    make_pipeline(paths).run(verbose=False)
+    del calls[:]
+    # Forced, double writes the same output, so parity's key does not change
+    results = make_pipeline(paths).run(['double'], force=True, verbose=False)
+    assert statuses(results) == {'double': 'ran'}
+    assert statuses(make_pipeline(paths).run(verbose=False)) == {'double': 'fresh', 'parity': 'fresh'}
+    assert calls == ['double']
+
+
+def test_prune_keeps_the_last_keys_per_stage(paths, monkeypatch):
+    monkeypatch.setattr(pipeline, 'STORE_HISTORY', 2)
+    store = os.path.join(paths['pipeline'], pipeline.STORE_DIR)
+    for number in ('1', '2', '3'):
+        write(paths['number'], number)
+        make_pipeline(paths).run(verbose=False)
+    # Two keys per stage are kept, the first number's runs are gone
+    assert len(os.listdir(store)) == 4
+    write(paths['number'], '1')
+    assert statuses(make_pipeline(paths).run(verbose=False))['double'] == 'ran'
+
+    # Stages no longer defined keep nothing
+    only_double = Pipeline([Stage('double', double, [paths['number']], [paths['doubled']])], paths['pipeline'])
+    assert only_double.prune() == 2
+    assert len(os.listdir(store)) == 2
+
+
+def test_module_attribute_dependencies_hash_only_that_source():
+    whole = pipeline._module_digest('src.pipeline')
+    function = pipeline._module_digest('src.pipeline:file_digest')
+    assert function != whole
+    assert function == pipeline._module_digest('src.pipeline:file_digest')
+    assert function != pipeline._module_digest('src.pipeline:_module_digest')
@@ -0,0 +1,67 @@
+# tests/test_prediction.py
+
+import pytest
+
+from src.prediction import PredictionEngine
+
+# Records with different key sets, as concurrent requests coalesced into one micro-batch arrive
+MIXED_RECORDS = [
+    {'GrLivArea': 1500, 'TotalSF': 2000, 'GarageArea': 500, 'YearBuilt': 2000, 'OverallQual': 5},
+    {'GrLivArea': 1800, 'TotalSF': 2600, 'OverallQual': 7, 'LotArea': 9000, 'KitchenQual': 2},
+    {'GrLivArea': 900, 'TotalSF': 1200, 'YearBuilt': 1950, 'BedroomAbvGr': 2},
+]
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return PredictionEngine()
+
+
+@pytest.mark.parametrize('preprocessed', [True, False])
+def test_batched_predictions_match_unbatched(engine, preprocessed, monkeypatch):
+    if not preprocessed:
+        monkeypatch.setattr(engine, 'preprocessor', None)
+    batched = engine.predict_many(MIXED_RECORDS)
+    assert batched == [engine.predict_one(record) for record in MIXED_RECORDS]
+    # Each record is filled on its own, whatever it is batched with
+    assert engine.predict_many(MIXED_RECORDS[1:2]) == batched[1:2]
+
+
+def test_engine_is_rebuilt_when_another_version_is_served(monkeypatch):
+    import src.prediction as prediction
+
+    served = {'version': 1}
+    monkeypatch.setattr(prediction, '_engines', {})
+    monkeypatch.setattr(prediction, 'resolve_version', lambda model_name: served['version'])
+    monkeypatch.setattr(prediction, 'PredictionEngine', lambda model_name: object())
+    first = prediction.get_engine()
+    assert prediction.get_engine() is first
+    served['version'] = 2
+    second = prediction.get_engine()
+    assert second is not first
+    assert prediction.get_engine() is second
+
+
+def test_failed_local_load_is_retried_when_the_model_changes(monkeypatch):
+    import src.prediction as prediction
+
+    served = {'version': 1}
+    loads = []
+
+    def get_engine():
+        loads.append(served['version'])
+        raise OSError("model file is missing")
+
+    monkeypatch.setattr(prediction, 'PREDICTION_BACKEND', 'local')
+    monkeypatch.setattr(prediction, '_local_error', None)
+    monkeypatch.setattr(prediction, 'resolve_version', lambda model_name: served['version'])
+    monkeypatch.setattr(prediction, 'get_engine', get_engine)
+    assert prediction._local_engine() is None
+    assert prediction._local_engine() is None
+    assert loads == [1]
+    served['version'] = 2
+    assert prediction._local_engine() is None
+    assert loads == [1, 2]
+    monkeypatch.setattr(prediction, 'LOCAL_RETRY_SECONDS', 0)
+    prediction._local_engine()
+    assert loads == [1, 2, 2]
@@ -0,0 +1,67 @@
+# tests/test_serving.py
+
+import asyncio
+import random
+
+from src.serving import MicroBatcher
+
+
+def run_requests(batcher, records, spacing):
+    async def request(record, delay):
+        await asyncio.sleep(delay)
+        return await batcher.predict(record)
+
+    async def main():
+        batcher.start()
+        try:
+            delays = [random.Random(i).uniform(0, spacing) for i in range(len(records))]
+            # A dropped record never resolves, so bound the wait rather than hang
+            return await asyncio.wait_for(asyncio.gather(*map(request, records, delays)), 10)
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(main())
+
+
+def test_every_request_is_answered_in_order():
+    batch_sizes = []
+
+    def predict_many(records):
+        batch_sizes.append(len(records))
+        return [record['x'] * 2.0 for record in records]
+
+    # Arrivals spread around max_wait, so timeouts keep firing as records arrive
+    batcher = MicroBatcher(predict_many, max_batch_size=8, max_wait=0.0005)
+    records = [{'x': i} for i in range(2000)]
+    assert run_requests(batcher, records, spacing=0.2) == [i * 2.0 for i in range(2000)]
+    assert sum(batch_sizes) == 2000 and max(batch_sizes) <= 8
+    assert batcher.rows == 2000 and batcher.batches == len(batch_sizes)
+
+
+def test_concurrent_requests_are_coalesced():
+    batch_sizes = []
+
+    def predict_many(records):
+        batch_sizes.append(len(records))
+        return [0.0] * len(records)
+
+    batcher = MicroBatcher(predict_many, max_batch_size=64, max_wait=0.05)
+    run_requests(batcher, [{'x': i} for i in range(64)], spacing=0)
+    assert batch_sizes == [64]
+
+
+def test_failed_batches_fail_their_requests():
+    def predict_many(records):
+        raise ValueError("bad batch")
+
+    batcher = MicroBatcher(predict_many, max_batch_size=4, max_wait=0.001)
+
+    async def main():
+        batcher.start()
+        try:
+            return await asyncio.gather(batcher.predict({'x': 1}), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    [result] = asyncio.run(main())
+    assert isinstance(result, ValueError)
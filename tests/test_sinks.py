@@ -0,0 +1,37 @@
+# tests/test_sinks.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.sinks import open_sink
+
+
+def write_chunks(path, chunks):
+    sink = open_sink(path)
+    try:
+        for chunk in chunks:
+            sink.write(chunk)
+    finally:
+        sink.close()
+
+
+@pytest.mark.parametrize('extension', ['csv', 'parquet'])
+def test_round_trip(tmp_path, extension):
+    if extension == 'parquet':
+        pytest.importorskip('pyarrow')
+    df = pd.DataFrame({'YearBuilt': np.arange(2000, 2010), 'LotFrontage': np.linspace(60, 80, 10),
+                       'KitchenQual': list('abcdeabcde')})
+    # The second chunk has a missing value, so it parses as float
+    df.loc[7, 'YearBuilt'] = np.nan
+    path = str(tmp_path / f'houses.{extension}')
+    write_chunks(path, [df.iloc[:5], df.iloc[5:]])
+    result = pd.read_csv(path) if extension == 'csv' else pd.read_parquet(path)
+    pd.testing.assert_frame_equal(result.astype({'YearBuilt': 'float64'}), df.astype({'YearBuilt': 'float64'}))
+
+
+def test_parquet_never_truncates(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'houses.parquet')
+    with pytest.raises(ValueError, match='does not fit the schema'):
+        write_chunks(path, [pd.DataFrame({'LotFrontage': [60, 70]}), pd.DataFrame({'LotFrontage': [1.5, np.nan]})])
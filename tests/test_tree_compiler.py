@@ -0,0 +1,74 @@
+# tests/test_tree_compiler.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tree_compiler import CompiledEnsemble, compile_model
+
+
+def make_data(n_rows=400, n_features=5, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n_rows, n_features)) * [1, 10, 100, 1000, 0.01],
+                     columns=[f'feature_{i}' for i in range(n_features)])
+    y = X['feature_0'] * 3 + np.sin(X['feature_1']) + X['feature_2'] / 50 + rng.normal(scale=0.1, size=n_rows)
+    return X, y
+
+
+def on_thresholds(compiled, X, seed=0):
+    """
+    Rows whose values sit exactly on split thresholds, and one float32 step
+    either side, where a precision mismatch would change the branch taken.
+    """
+    rng = np.random.default_rng(seed)
+    internal = np.flatnonzero(compiled.left != np.arange(len(compiled.left)))
+    nodes = rng.choice(internal, size=300)
+    rows = X.sample(len(nodes), replace=True, random_state=seed).to_numpy(dtype=np.float64)
+    thresholds = compiled.threshold[nodes].astype(np.float64)
+    step = rng.choice([-1, 0, 1], size=len(nodes))
+    as_float32 = thresholds.astype(np.float32)
+    values = np.where(step == 0, thresholds,
+                      np.nextafter(as_float32, np.where(step > 0, np.inf, -np.inf).astype(np.float32)))
+    rows[np.arange(len(nodes)), compiled.feature[nodes]] = values
+    return pd.DataFrame(rows, columns=X.columns)
+
+
+def test_random_forest_matches_predict():
+    from sklearn.ensemble import RandomForestRegressor
+
+    X, y = make_data()
+    model = RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(X, y)
+    compiled = compile_model(model)
+    assert compiled.threshold.dtype == np.float64
+    for rows in (X, on_thresholds(compiled, X)):
+        np.testing.assert_allclose(compiled.predict(rows), model.predict(rows), rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize('early_stopping', [False, True])
+def test_xgboost_matches_predict(early_stopping):
+    xgboost = pytest.importorskip('xgboost')
+
+    X, y = make_data()
+    X = X.mask(np.random.default_rng(1).random(X.shape) < 0.1)
+    params = {'n_estimators': 200, 'max_depth': 4, 'learning_rate': 0.3}
+    if early_stopping:
+        model = xgboost.XGBRegressor(**params, early_stopping_rounds=5)
+        model.fit(X[:300], y[:300], eval_set=[(X[300:], y[300:])], verbose=False)
+        assert model.best_iteration < params['n_estimators'] - 1
+    else:
+        model = xgboost.XGBRegressor(**params).fit(X, y)
+    compiled = compile_model(model)
+    assert compiled.threshold.dtype == np.float32
+    for rows in (X, on_thresholds(compiled, X.fillna(0))):
+        np.testing.assert_allclose(compiled.predict(rows), model.predict(rows), rtol=1e-5, atol=1e-4)
+
+
+def test_save_load_keeps_threshold_precision(tmp_path):
+    from sklearn.ensemble import RandomForestRegressor
+
+    X, y = make_data(n_rows=100)
+    compiled = compile_model(RandomForestRegressor(n_estimators=3, random_state=0).fit(X, y))
+    compiled.save(str(tmp_path / 'trees.npz'))
+    loaded = CompiledEnsemble.load(str(tmp_path / 'trees.npz'))
+    assert loaded.threshold.dtype == np.float64
+    np.testing.assert_array_equal(loaded.predict(X), compiled.predict(X))